@@ -0,0 +1,107 @@
+import re
+import threading
+import time
+
+
+# last known results of aggregate queries (dashboard figures and the like).
+# an entry goes stale when its TTL runs out, when a write through Database
+# touches one of its tables (invalidate), or when the table_versions counters
+# show some other connection changed them. stale values are still handed out
+# by peek() so the UI can draw straight away and refresh in the background.
+
+DEFAULT_TTL = 60
+
+# the table a single INSERT / UPDATE / DELETE / REPLACE statement writes to
+WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"'`\[]?(\w+)",
+    re.IGNORECASE
+)
+
+
+def written_table(q):
+    match = WRITE_TARGET.match(q)
+    return match.group(1).lower() if match else None
+
+
+class CacheEntry:
+    def __init__(self, compute, tables, ttl):
+        self.compute = compute   # compute(db) -> value
+        self.tables = tables
+        self.ttl = ttl
+
+        self.value = None
+        self.computed_at = None  # time.monotonic() of the last compute, None if never
+        self.versions = None     # table_versions of self.tables when it was computed
+        self.dirty = True
+
+
+class AggregateCache:
+    def __init__(self, db, default_ttl=DEFAULT_TTL):
+        self.db = db
+        self.default_ttl = default_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, compute, tables, ttl=None):
+        # registering the same name again keeps the cached value
+        with self.lock:
+            if name not in self.entries:
+                self.entries[name] = CacheEntry(compute, tuple(tables), ttl or self.default_ttl)
+
+    # reading
+
+    def peek(self, name):
+        # last known value (None if never computed), whether or not it's stale
+        return self.entries[name].value
+
+    def is_fresh(self, name):
+        # reads table_versions, call it (and stale / get) from a worker
+        entry = self.entries[name]
+        with self.lock:
+            if entry.dirty or entry.computed_at is None:
+                return False
+            if time.monotonic() - entry.computed_at > entry.ttl:
+                return False
+            versions = entry.versions
+        return self.db.table_versions(entry.tables) == versions
+
+    def stale(self, names=None):
+        return [name for name in (self.entries if names is None else names) if not self.is_fresh(name)]
+
+    def get(self, name):
+        # cached value if fresh, otherwise computed on the calling thread
+        if self.is_fresh(name):
+            return self.peek(name)
+        return self.refresh(name)
+
+    def refresh(self, name):
+        # recompute on the calling thread (meant for a worker), returns the new value
+        entry = self.entries[name]
+        with self.lock:
+            entry.dirty = False
+
+        # versions are read before computing, a write during the compute
+        # leaves the entry stale rather than wrongly fresh
+        versions = self.db.table_versions(entry.tables)
+        value = entry.compute(self.db)
+
+        with self.lock:
+            entry.value = value
+            entry.versions = versions
+            entry.computed_at = time.monotonic()
+        return value
+
+    # invalidation
+
+    def invalidate(self, *tables):
+        # marks every entry that reads any of these tables (all entries if none given) as stale
+        tables = {t.lower() for t in tables}
+        with self.lock:
+            for entry in self.entries.values():
+                if not tables or tables.intersection(entry.tables):
+                    entry.dirty = True
+
+    def invalidate_for(self, q):
+        table = written_table(q)
+        if table:
+            self.invalidate(table)
@@ -0,0 +1,80 @@
+import datetime
+
+# stylist availability. the database refuses overlapping bookings itself (see
+# migrations.NO_DOUBLE_BOOKING), this module works out where the gaps are.
+
+# opening hours used when looking for free slots
+OPEN_HOUR = 9
+CLOSE_HOUR = 18
+SLOT_MINUTES = 15
+
+# statuses that don't take up the stylist's time
+FREE_STATUSES = ("cancelled", "no-show")
+
+
+def parse_datetime(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def round_up(when, step_minutes):
+    # next slot boundary at or after when
+    when = when.replace(second=0, microsecond=0)
+    extra = when.minute % step_minutes
+    if extra:
+        when += datetime.timedelta(minutes=step_minutes - extra)
+    return when
+
+
+def overlaps(busy, start, end):
+    # first busy (start, end, ...) interval overlapping [start, end), or None
+    for interval in busy:
+        if interval[0] < end and interval[1] > start:
+            return interval
+    return None
+
+
+def free_slots(busy, start, duration_minutes, count, horizon_days=365,
+               open_hour=OPEN_HOUR, close_hour=CLOSE_HOUR, step_minutes=SLOT_MINUTES):
+    # busy is a list of (start, end, ...) tuples sorted by start. one sweep
+    # over the days and the busy list together, so the cost is
+    # O(busy + slots looked at) whatever the horizon.
+    duration = datetime.timedelta(minutes=duration_minutes)
+    step = datetime.timedelta(minutes=step_minutes)
+    start = round_up(start, step_minutes)
+
+    slots = []
+    i = 0
+    day = start.date()
+    last_day = day + datetime.timedelta(days=horizon_days)
+
+    while day <= last_day and len(slots) < count:
+        t = max(datetime.datetime.combine(day, datetime.time(open_hour)), start)
+        close = datetime.datetime.combine(day, datetime.time(close_hour))
+
+        while t + duration <= close and len(slots) < count:
+            # everything before i has finished by t, t only ever moves forward
+            while i < len(busy) and busy[i][1] <= t:
+                i += 1
+
+            conflict = None
+            j = i
+            while j < len(busy) and busy[j][0] < t + duration:
+                if busy[j][1] > t:
+                    conflict = busy[j]
+                    break
+                j += 1
+
+            if conflict:
+                t = round_up(conflict[1], step_minutes)
+            else:
+                slots.append(t)
+                t += step
+
+        day += datetime.timedelta(days=1)
+
+    return slots
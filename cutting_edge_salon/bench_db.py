@@ -0,0 +1,350 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import datagen
+from database import Database, REVENUE_GROUPS
+from query_stats import one_line
+
+# Database benchmark: times every fetch, lookup, reporting, insert, update and
+# delete method, and searches with typical terms, against generated databases
+# of each size. results are written as JSON, and --compare reports how each
+# one moved against an earlier results file.
+#
+#   python bench_db.py --sizes 10000,100000,1000000
+#   python bench_db.py --compare db_bench_results.json --output after.json
+#
+# generating the bigger sizes takes minutes, --cache-dir keeps them between
+# runs (each run works on a copy, so the writes never change the cached file).
+
+SEARCH_TERMS = ["smith", "oli", "olivia smith", "balayage", "allergic", "customer123", "zzz"]
+
+# rows per page, as the views' VirtualTable asks for them
+PAGE_SIZE = 100
+
+# pages walked to find the key of a deep page
+PAGE_DEPTH = 20
+
+# slower than this ratio (and by more than this many ms) counts as a regression
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_MS = 0.5
+
+UPDATE_APPOINTMENT = "UPDATE appointments SET notes = ?, status = ? WHERE appointment_id = ?"
+
+# appointments booked per round by the batch cases, one commit each vs one transaction
+BATCH_SIZE = 20
+
+
+def ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def summarise(samples):
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def time_call(call, repeat):
+    # one untimed call first so every sample runs with a warm cache
+    call()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(ms_since(start))
+    return summarise(samples)
+
+
+# what the cases run against: ids and keys picked (untimed) from the data
+
+def context(db, today):
+    ctx = {"today": today}
+    read = lambda q, params=(): db.read(q, params).fetchone()
+    ctx["stylist_id"] = read("""
+        SELECT stylist_id FROM appointments GROUP BY stylist_id ORDER BY COUNT(*) DESC LIMIT 1
+    """)[0]
+    ctx["customer_id"], ctx["customer_name"] = read("""
+        SELECT u.user_id, u.first_name || ' ' || u.last_name FROM users u
+        WHERE u.role = 'customer' ORDER BY u.user_id LIMIT 1
+    """)
+    ctx["service_id"] = read("SELECT service_id FROM services ORDER BY service_id LIMIT 1")[0]
+    ctx["appointment_id"] = read("SELECT MAX(appointment_id) FROM payments")[0]
+    ctx["payment_id"] = read("SELECT MAX(payment_id) FROM payments")[0]
+    ctx["username"] = read("SELECT username FROM users WHERE role = 'stylist' LIMIT 1")[0]
+
+    for kind in ("customers", "staff", "appointments", "payments"):
+        fetch = getattr(db, f"fetch_{kind}_page")
+        page = fetch(limit=PAGE_SIZE)
+        for _ in range(PAGE_DEPTH - 1):
+            if not page:
+                break
+            following = fetch(after=page[-1][0], limit=PAGE_SIZE)
+            if not following:
+                break
+            page = following
+        ctx[f"{kind}_deep_key"] = page[-1][0] if page else None
+    return ctx
+
+
+def read_cases(db, ctx):
+    today = ctx["today"]
+    day_start = datetime.datetime.combine(today, datetime.time())
+    cases = {}
+
+    for kind in ("customers", "staff", "appointments", "payments"):
+        fetch = getattr(db, f"fetch_{kind}_page")
+        fetch_all = getattr(db, f"fetch_all_{kind}")
+        cases[f"fetch_{kind}_page:first"] = lambda fetch=fetch: fetch(limit=PAGE_SIZE)
+        if ctx[f"{kind}_deep_key"] is not None:
+            cases[f"fetch_{kind}_page:page{PAGE_DEPTH}"] = (
+                lambda fetch=fetch, key=ctx[f"{kind}_deep_key"]: fetch(after=key, limit=PAGE_SIZE)
+            )
+        cases[f"fetch_all_{kind}:smith"] = lambda fetch_all=fetch_all: fetch_all("smith")
+        for term in SEARCH_TERMS:
+            cases[f"search_{kind}:{term}"] = lambda fetch=fetch, term=term: fetch(term, limit=PAGE_SIZE)
+
+    # type-ahead and single row reads
+    prefix = ctx["customer_name"][:3]
+    cases.update({
+        "users.get": lambda: db.users.get(ctx["customer_id"]),
+        "users.by_username": lambda: db.users.by_username(ctx["username"]),
+        "users.customers": lambda: db.users.customers(),
+        "users.stylists": lambda: db.users.stylists(),
+        "users.lookup_customers:empty": lambda: db.users.lookup_customers(""),
+        f"users.lookup_customers:{prefix.lower()}": lambda: db.users.lookup_customers(prefix),
+        "users.lookup_stylists:s": lambda: db.users.lookup_stylists("s"),
+        "services.all": lambda: db.services.all(),
+        "services.lookup:b": lambda: db.services.lookup("b"),
+        "appointments.get": lambda: db.appointments.get(ctx["appointment_id"]),
+        "appointments.payable:empty": lambda: db.appointments.payable("", now=day_start),
+        f"appointments.payable:{prefix.lower()}": lambda: db.appointments.payable(prefix, now=day_start),
+        "appointments.payable:#id": lambda: db.appointments.payable(f"#{ctx['appointment_id']}", now=day_start),
+        "payments.details": lambda: db.payments.details(ctx["payment_id"]),
+    })
+
+    # reporting, availability and the dashboard figures
+    for group_by in REVENUE_GROUPS:
+        cases[f"revenue_summary:{group_by}"] = lambda group_by=group_by: db.revenue_summary(group_by)
+    month_start = today.replace(day=1).isoformat()
+    cases.update({
+        "revenue_summary:day:this_month": lambda: db.revenue_summary("day", month_start, None),
+        "revenue_year_over_year": lambda: db.revenue_year_over_year(today.year),
+        "bookings_on": lambda: db.bookings_on(today),
+        "takings_on": lambda: db.takings_on(today),
+        "stylist_load_on": lambda: db.stylist_load_on(today),
+        "stylist_bookings:week": lambda: db.stylist_bookings(ctx["stylist_id"], day_start,
+                                                             day_start + datetime.timedelta(days=7)),
+        "find_conflict": lambda: db.find_conflict(ctx["stylist_id"], ctx["service_id"],
+                                                  day_start + datetime.timedelta(hours=10)),
+        "next_free_slots": lambda: db.next_free_slots(ctx["stylist_id"], ctx["service_id"], start=day_start),
+        "table_versions": lambda: db.table_versions(),
+    })
+    return cases
+
+
+def bench_writes(db, ctx, repeat):
+    # each round books a free slot, pays for it, then takes it all back out
+    # again, so the data is the same size at the end
+    stylist_id, service_id = ctx["stylist_id"], ctx["service_id"]
+    far_ahead = datetime.datetime.combine(ctx["today"] + datetime.timedelta(days=300), datetime.time())
+    slots = db.next_free_slots(stylist_id, service_id, count=repeat + 1, start=far_ahead)
+    # booked and deleted again every round, later than any of the single bookings.
+    # free slots can overlap each other, so these are taken a whole booking apart
+    duration = datetime.timedelta(minutes=db.service_duration(service_id))
+    batch_slots = []
+    for slot in db.next_free_slots(stylist_id, service_id, count=BATCH_SIZE * 20,
+                                   start=slots[-1] + datetime.timedelta(days=1)):
+        if len(batch_slots) < BATCH_SIZE and (not batch_slots or slot >= batch_slots[-1] + duration):
+            batch_slots.append(slot)
+
+    samples = {}
+
+    def timed(name, call):
+        start = time.perf_counter()
+        result = call()
+        samples.setdefault(name, []).append(ms_since(start))
+        return result
+
+    def book(slot):
+        return db.add_appointment(ctx["customer_id"], stylist_id, service_id, slot, "bench")
+
+    def book_separately(batch):
+        return [book(slot) for slot in batch]
+
+    def book_in_transaction(batch):
+        with db.transaction():
+            return [book(slot) for slot in batch]
+
+    for i, slot in enumerate(slots):
+        appointment_id = timed("insert_appointment", lambda: book(slot))
+        timed("update_appointment", lambda: db.write(UPDATE_APPOINTMENT, ("bench again", "Completed", appointment_id)))
+
+        payment_id = timed("insert_payment", lambda: db.insert_payment(appointment_id, 45.0, "Card", "paid", "4242"))
+        timed("update_payment", lambda: db.update_payment(payment_id, "Cash", "refunded"))
+        timed("delete_payment", lambda: db.delete_payment(payment_id))
+        timed("delete_appointment", lambda: db.delete_appointment(appointment_id))
+
+        user_id = timed("insert_customer", lambda: db.add_user(
+            "customer", f"bench_{i}_{time.time_ns()}", "x", f"bench_{i}_{time.time_ns()}@example.com",
+            "Bench", "Customer", "07000000000"
+        ))
+        timed("delete_user", lambda: db.delete_user(user_id))
+
+        # the same bookings as one commit each and as one unit of work
+        for name, call in ((f"book_{BATCH_SIZE}_separately", book_separately),
+                           (f"book_{BATCH_SIZE}_in_transaction", book_in_transaction)):
+            ids = timed(name, lambda: call(batch_slots))
+            with db.transaction():
+                for booked_id in ids:
+                    db.delete_appointment(booked_id)
+        ids = book_in_transaction(batch_slots)
+        timed(f"cancel_{BATCH_SIZE}_batched", lambda: db.set_appointment_statuses(ids, "Cancelled"))
+        with db.transaction():
+            for booked_id in ids:
+                db.delete_appointment(booked_id)
+
+    # the first round warms up like time_call's untimed call
+    return {name: summarise(values[1:] or values) for name, values in samples.items()}
+
+
+def bench_size(size, args, work_dir):
+    today = args.today
+    name = f"bench_{size}_{args.seed}_{today.isoformat()}.db"
+    source = os.path.join(args.cache_dir or work_dir, name)
+
+    result = {}
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        result["counts"] = datagen.generate(source, appointments=size, seed=args.seed, today=today)
+        result["generate_s"] = round(time.perf_counter() - start, 2)
+        print(f"DEBUG: generated {result['counts']} in {result['generate_s']}s")
+
+    # the cached file stays untouched, the writes go to a copy
+    path = os.path.join(work_dir, f"work_{size}.db")
+    shutil.copyfile(source, path)
+    result["db_bytes"] = os.path.getsize(path)
+
+    db = Database(path)
+    try:
+        if "counts" not in result:
+            result["counts"] = {table: db.read(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                                for table in ("users", "services", "appointments", "payments")}
+        ctx = context(db, today)
+        db.query_stats.reset()
+
+        cases = {}
+        for case, call in read_cases(db, ctx).items():
+            if args.only and not any(part in case for part in args.only):
+                continue
+            cases[case] = time_call(call, args.repeat)
+        if not args.only or "writes" in args.only:
+            cases.update(bench_writes(db, ctx, args.repeat))
+        result["cases"] = cases
+
+        # where the time went, by statement
+        result["top_statements"] = [
+            {"sql": one_line(s["sql"], 160), "origin": s["origin"], "calls": s["calls"],
+             "total_ms": round(s["total_ms"] + s["fetch_ms"], 2), "max_ms": round(s["max_ms"], 2)}
+            for s in db.query_stats.snapshot()[:10]
+        ]
+    finally:
+        db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return result
+
+
+# comparing runs
+
+def compare(report, previous):
+    lines = []
+    regressions = []
+    for size, result in report["sizes"].items():
+        before = previous.get("sizes", {}).get(size)
+        if not before:
+            continue
+        lines.append(f"--- {size} appointments, against {previous.get('run_at', 'the previous run')}")
+        for case, now in sorted(result["cases"].items()):
+            old = before.get("cases", {}).get(case)
+            if not old:
+                continue
+            ratio = now["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+            flag = ""
+            if ratio > REGRESSION_RATIO and now["median_ms"] - old["median_ms"] > REGRESSION_MIN_MS:
+                flag = "SLOWER"
+                regressions.append(f"{case} @ {size}: {old['median_ms']:.2f} -> {now['median_ms']:.2f} ms")
+            elif ratio < 1 / REGRESSION_RATIO and old["median_ms"] - now["median_ms"] > REGRESSION_MIN_MS:
+                flag = "faster"
+            lines.append(f"{case:<45} {old['median_ms']:9.2f} {now['median_ms']:9.2f} ms  x{ratio:5.2f}  {flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database method benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated appointment counts")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per case (median is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", help="anchor date of the generated data, YYYY-MM-DD, default today")
+    parser.add_argument("--cache-dir", help="keep generated databases here and reuse them")
+    parser.add_argument("--only", help="comma separated parts of case names to run, 'writes' for the write cases")
+    parser.add_argument("--output", default="db_bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    args.today = datetime.date.fromisoformat(args.today) if args.today else datetime.date.today()
+    args.only = [part for part in (args.only or "").split(",") if part]
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+
+    report = {
+        "run_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "today": args.today.isoformat(),
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            report["sizes"][str(size)] = bench_size(size, args, work_dir)
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+
+    for size, result in report["sizes"].items():
+        print(f"--- {size} appointments {result['counts']}")
+        for case, value in sorted(result["cases"].items()):
+            print(f"{case:<45} {value['median_ms']:9.2f} ms  (min {value['min_ms']:.2f}, max {value['max_ms']:.2f})")
+    print(f"DEBUG: results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        lines, regressions = compare(report, previous)
+        for line in lines:
+            print(line)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import datagen
+
+# startup benchmark: how long each piece of getting to the Welcome screen
+# (and opening every view for the first time) takes, against generated
+# databases of different sizes. results are written as JSON and compared
+# against the budgets in bench_budgets.json.
+#
+#   python bench_startup.py --sizes 1000,20000 --repeat 3
+#   python bench_startup.py --write-budgets      (after an intended change)
+#
+# every phase has a budget and a measured phase without one fails the run.
+# the startup:*, view_build:* and first_refresh:* phases need a display: their
+# budgets are the UI monitor's stall threshold (ui_monitor.SLOW_MS, 100 ms)
+# per Tk callback (two for startup: the window, then the Welcome view) until
+# --write-budgets is run on a desk that can measure them.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGET_FILE = os.path.join(BASE_DIR, "bench_budgets.json")
+
+IMPORT_MODULES = [
+    "database",
+    "views.welcome_view",
+    "views.login_view",
+    "views.dashboard_view",
+    "views.staff_view",
+    "views.customer_view",
+    "views.booking_view",
+    "views.payment_view",
+    "main",
+]
+
+
+def ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+# phases
+
+def bench_imports(repeat):
+    # every import runs in a fresh interpreter so nothing is already cached
+    results = {}
+    code = "import time; t = time.perf_counter(); import {0}; print(time.perf_counter() - t)"
+    for module in IMPORT_MODULES:
+        samples = []
+        for _ in range(repeat):
+            out = subprocess.run(
+                [sys.executable, "-c", code.format(module)],
+                cwd=BASE_DIR, capture_output=True, text=True
+            )
+            if out.returncode != 0:
+                print(f"DEBUG: import {module} failed: {out.stderr.strip().splitlines()[-1]}")
+                break
+            samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+        if samples:
+            results[f"import:{module}"] = statistics.median(samples)
+    return results
+
+
+def bench_db_init(path, repeat):
+    from database import Database
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db = Database(path)
+        samples.append(ms_since(start))
+        db.close()
+    return {"db_init": statistics.median(samples)}
+
+
+def wait_for_queries(app, timeout=60):
+    start = time.perf_counter()
+    while not app.executor.is_idle():
+        app.update()
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("queries did not finish")
+        time.sleep(0.001)
+    app.update()
+
+
+def bench_views(path):
+    # needs a display, skipped (and reported as such) when there isn't one
+    import tkinter
+
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError as e:
+        return {}, f"views skipped: {e}"
+
+    import importlib
+    import main
+
+    # imports are measured separately, keep them out of the build times
+    for module in main.VIEW_MODULES.values():
+        importlib.import_module(module)
+
+    results = {}
+    start = time.perf_counter()
+    app = main.MainApp(db_path=path)
+    app.update()
+    results["startup:welcome"] = ms_since(start)
+
+    app.current_user = app.db.login("admin", "admin123")
+
+    for page_name in main.VIEW_MODULES:
+        if page_name in app.frames:
+            continue
+
+        start = time.perf_counter()
+        frame = app.get_view(page_name)
+        app.update_idletasks()
+        results[f"view_build:{page_name}"] = ms_since(start)
+
+        if hasattr(frame, "refresh_data"):
+            start = time.perf_counter()
+            frame.refresh_data()
+            wait_for_queries(app)
+            results[f"first_refresh:{page_name}"] = ms_since(start)
+
+    app.on_close()
+    return results, None
+
+
+# budgets
+
+def load_budgets():
+    if not os.path.exists(BUDGET_FILE):
+        return {}
+    with open(BUDGET_FILE) as file:
+        return json.load(file)
+
+
+def check_budgets(report, budgets):
+    # every size has to stay inside the same budget, startup isn't meant to grow
+    # with the data. a phase with no budget fails too, so nothing goes unchecked
+    regressions = []
+    for size, metrics in report["sizes"].items():
+        for name, value in {**report["imports"], **metrics}.items():
+            budget = budgets.get(name)
+            if budget is None:
+                regressions.append(f"{name} @ {size} appointments: {value:.1f} ms has no budget "
+                                   f"(add one with --write-budgets)")
+            elif value > budget:
+                regressions.append(f"{name} @ {size} appointments: {value:.1f} ms > budget {budget:.1f} ms")
+    return sorted(set(regressions))
+
+
+def unmeasured(report, budgets):
+    # budgeted phases this run couldn't measure (the views, without a display)
+    measured = set(report["imports"])
+    for metrics in report["sizes"].values():
+        measured.update(metrics)
+    return sorted(set(budgets) - measured)
+
+
+def write_budgets(report, headroom):
+    worst = dict(report["imports"])
+    for metrics in report["sizes"].values():
+        for name, value in metrics.items():
+            worst[name] = max(worst.get(name, 0), value)
+
+    # metrics this run couldn't measure (the views, without a display) keep their budgets
+    budgets = load_budgets()
+    budgets.update({name: round(value * headroom + 5, 1) for name, value in worst.items()})
+    budgets = dict(sorted(budgets.items()))
+    with open(BUDGET_FILE, "w") as file:
+        json.dump(budgets, file, indent=4)
+        file.write("\n")
+    print(f"DEBUG: wrote {len(budgets)} budgets to {BUDGET_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and import-time benchmark")
+    parser.add_argument("--sizes", default="1000,20000", help="comma separated appointment counts")
+    parser.add_argument("--repeat", type=int, default=3, help="samples per measurement (median is kept)")
+    parser.add_argument("--output", default="startup_bench_results.json")
+    parser.add_argument("--write-budgets", action="store_true", help="store these results as the new budgets")
+    parser.add_argument("--headroom", type=float, default=2.0, help="budget = worst result * headroom + 5 ms")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "imports": bench_imports(args.repeat),
+        "sizes": {},
+        "notes": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"bench_{size}.db")
+            counts = datagen.generate(path, appointments=size)
+            print(f"DEBUG: generated {counts}")
+
+            metrics = bench_db_init(path, args.repeat)
+            view_metrics, note = bench_views(path)
+            metrics.update(view_metrics)
+            if note and note not in report["notes"]:
+                report["notes"].append(note)
+
+            report["sizes"][str(size)] = metrics
+
+    budgets = load_budgets()
+    report["regressions"] = check_budgets(report, budgets)
+    report["unmeasured"] = unmeasured(report, budgets)
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+
+    for name, value in sorted(report["imports"].items()):
+        print(f"{name:<40} {value:9.1f} ms")
+    for size, metrics in report["sizes"].items():
+        print(f"--- {size} appointments")
+        for name, value in sorted(metrics.items()):
+            print(f"{name:<40} {value:9.1f} ms")
+    for note in report["notes"]:
+        print(f"NOTE: {note}")
+    if report["unmeasured"]:
+        print(f"WARNING: not checked this run: {', '.join(report['unmeasured'])}")
+    print(f"DEBUG: results written to {args.output}")
+
+    if args.write_budgets:
+        write_budgets(report, args.headroom)
+        return 0
+
+    if report["regressions"]:
+        for line in report["regressions"]:
+            print(f"REGRESSION: {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
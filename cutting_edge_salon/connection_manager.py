@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from query_stats import InstrumentedConnection, QueryStats
+
+
+# connection settings applied to every connection we open
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",    # safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size = -8000",      # ~8 MB page cache per connection
+    "PRAGMA mmap_size = 67108864",    # read through a 64 MB memory map
+    "PRAGMA busy_timeout = 5000",     # wait for locks instead of failing straight away
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+# owns every sqlite connection to one database file. the file runs in WAL mode
+# so readers never block on the writer (or each other): each thread gets its
+# own read connection, and all writes go through a single writer connection
+# guarded by a lock. every connection records its statements in self.stats
+# (see query_stats.py).
+class ConnectionManager:
+    def __init__(self, path, stats=None):
+        self.path = path
+        self.stats = stats or QueryStats()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.readers = []
+        # read connections handed back by threads that finished with them
+        self.idle_readers = []
+        self.closed = False
+
+        self.writer = self.connect()
+        # WAL is a property of the file, it only has to be switched on once
+        self.journal_mode = self.writer.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+
+        # serialises writers across threads, re-entrant so a write block can call other writes
+        self.write_lock = threading.RLock()
+        # nesting of write() blocks, and the thread that holds the writer while depth > 0
+        self.depth = 0
+        self.owner = None
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False,
+            # the repositories and page queries use a few dozen distinct statements
+            cached_statements=256,
+            factory=InstrumentedConnection
+        )
+        conn.stats = self.stats
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def reader(self):
+        # read connection for the calling thread, a released one if there is
+        # one, otherwise opened on first use
+        conn = getattr(self.local, "reader", None)
+        if conn is None:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            with self.lock:
+                conn = self.idle_readers.pop() if self.idle_readers else None
+            if conn is None:
+                conn = self.connect()
+                conn.execute("PRAGMA query_only = ON")
+                with self.lock:
+                    self.readers.append(conn)
+            self.local.reader = conn
+        return conn
+
+    def release_reader(self):
+        # hands the calling thread's reader back for the next thread to reuse.
+        # for short-lived threads (a thread per client in salon_service.py),
+        # which would otherwise leave a connection open each
+        conn = getattr(self.local, "reader", None)
+        if conn is None:
+            return
+        self.local.reader = None
+        if conn.in_transaction:
+            conn.rollback()
+        with self.lock:
+            if not self.closed:
+                self.idle_readers.append(conn)
+
+    @contextmanager
+    def write(self):
+        # one writer at a time. the outermost block is one transaction, committed
+        # when it finishes and rolled back if it raises. blocks nested inside it
+        # (on the same thread) are savepoints: if one raises only its own writes
+        # are undone, and the exception carries on out to the caller.
+        with self.write_lock:
+            depth = self.depth
+            if depth == 0:
+                self.owner = threading.get_ident()
+                # take the write lock now rather than on the first write, so a
+                # busy database is waited for here instead of failing mid-way
+                if not self.writer.in_transaction:
+                    self.writer.execute("BEGIN IMMEDIATE")
+            else:
+                self.writer.execute(f"SAVEPOINT write_{depth}")
+            self.depth += 1
+            try:
+                yield self.writer
+            except BaseException:
+                if depth == 0:
+                    self.writer.rollback()
+                else:
+                    self.writer.execute(f"ROLLBACK TO write_{depth}")
+                    self.writer.execute(f"RELEASE write_{depth}")
+                raise
+            else:
+                if depth == 0:
+                    self.writer.commit()
+                else:
+                    self.writer.execute(f"RELEASE write_{depth}")
+            finally:
+                self.depth = depth
+                if depth == 0:
+                    self.owner = None
+
+    def writing(self):
+        # whether the calling thread is inside a write() block
+        return self.owner == threading.get_ident()
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers.clear()
+            self.idle_readers.clear()
+        self.writer.close()
@@ -1,18 +1,27 @@
 import hashlib
+import re
 import sqlite3
 import datetime
-from enum import Enum
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+
+import availability
+import migrations
+import repositories
+import timestamps
+from aggregate_cache import AggregateCache, written_table
+from connection_manager import ConnectionManager
+from models import (User, UserRole, UserStatus, AppointmentStatus, Person, AppointmentRow,
+                    PaymentRow)
 
 # --- adapters ---
 def adapt_date_iso(val):
     return val.isoformat()
 
-def adapt_datetime_iso(val):
-    return val.replace(tzinfo=None).isoformat()
-
 sqlite3.register_adapter(datetime.date, adapt_date_iso)
-sqlite3.register_adapter(datetime.datetime, adapt_datetime_iso)
+# datetimes are bound as epoch seconds, the storage of appointment and payment times
+sqlite3.register_adapter(datetime.datetime, timestamps.to_epoch)
 
 
 # --- Converters (SAFE) ---
@@ -30,10 +39,9 @@ def convert_datetime(val):
     if val is None:
         return None
 
-    s = val.decode()
-
+    # text DATETIME columns (users), with or without seconds
     try:
-        return datetime.datetime.strptime(s, "%Y-%m-%d %H:%M")
+        return datetime.datetime.fromisoformat(val.decode())
     except ValueError:
         return None
 
@@ -41,81 +49,199 @@ def convert_datetime(val):
 
 sqlite3.register_converter("date", convert_date)
 sqlite3.register_converter("datetime", convert_datetime)
+sqlite3.register_converter("unixtime", timestamps.convert_unixtime)
+
+
+# turn whatever was typed into a search box into an FTS5 query where every
+# word has to prefix-match some token, e.g. "ali rob" -> "ali"* "rob"*
+def fts_query(search_term):
+    words = re.findall(r"\w+", search_term or "")
+    return " ".join(f'"{w}"*' for w in words)
 
-# enums
-class UserRole(Enum):
-    customer = "customer"
-    staff = "staff"
-    stylist = "stylist"
-    admin = "admin"
-
-class UserStatus(Enum):
-    active = "active"
-    inactive = "inactive"
-
-class AppointmentStatus(Enum):
-    booked = "booked"
-    completed = "completed"
-    cancelled = "cancelled"
-
-# data models
-class User:
-    def __init__(self, user_id, username, password, email, birth_date,
-                 joined_date, last_login, role: UserRole, status: UserStatus,
-                 first_name=None, last_name=None, phone_number=None):
-        self.user_id = user_id
-        self.username = username
-        self.password = password
-        self.email = email
-        self.birth_date = birth_date
-        self.joined_date = joined_date
-        self.last_login = last_login
-        self.role = role
-        self.status = status
-        #  specific fields
-        self.first_name = first_name
-        self.last_name = last_name
-        self.phone_number = phone_number
 
 def get_role_by_id(self, user_id):
-    self.cur.execute("SELECT role FROM users WHERE user_id=?", (user_id,))
-    row = self.cur.fetchone()
+    row = self.read("SELECT role FROM users WHERE user_id=?", (user_id,)).fetchone()
     return row[0] if row else "Unknown"
 
 
+# revenue_summary groupings: label, what to group on, extra join, and the
+# summary tables that can answer it by day and for whole months.
+# {period} is the day or month column of the table that is read.
+REVENUE_GROUPS = {
+    "day": ("r.day", "r.day", "", "daily_totals", None),
+    "month": ("substr(r.{period}, 1, 7)", "1", "", "daily_totals", "monthly_revenue"),
+    "year": ("substr(r.{period}, 1, 4)", "1", "", "daily_totals", "monthly_revenue"),
+    "method": ("r.payment_method", "r.payment_method", "", "daily_totals", "monthly_revenue"),
+    "service": ("IFNULL(s.service_name, 'Service #' || r.service_id)", "r.service_id",
+                "LEFT JOIN services s ON s.service_id = r.service_id", "daily_revenue", "monthly_service_revenue"),
+    "stylist": ("IFNULL(u.first_name || ' ' || u.last_name, 'Stylist #' || r.stylist_id)", "r.stylist_id",
+                "LEFT JOIN users u ON u.user_id = r.stylist_id", "daily_revenue", "monthly_stylist_revenue"),
+}
+
+
+# users columns update_user() may change
+USER_FIELDS = ("first_name", "last_name", "email", "phone_number", "status")
+
+
+# handed out by Database.transaction(). statements run on the writer inside
+# the open transaction, and the tables they write are remembered so cached
+# aggregates are only invalidated once the whole transaction has committed.
+class UnitOfWork:
+    def __init__(self, db, conn):
+        self.db = db
+        self.conn = conn
+        self.tables = set()
+
+    def touch(self, q):
+        table = written_table(q)
+        if table:
+            self.tables.add(table)
+
+    def execute(self, q, params=()):
+        self.touch(q)
+        return self.conn.execute(q, params)
+
+    def executemany(self, q, seq_of_params):
+        self.touch(q)
+        return self.conn.executemany(q, seq_of_params)
+
+    def savepoint(self):
+        # a nested step: if it raises, only its own writes are undone
+        return self.db.transaction()
+
+
 #database class
 class Database:
-    def __init__(self):
-        # set up the connection first
-        self.conn = sqlite3.connect(
-            "salon_database.db",
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
-            check_same_thread=False
-        )
-        # create the cursor second
-        self.cur = self.conn.cursor()
+    # the file is on this machine, so raw SQL (the CSV import and the exports) works.
+    # RemoteDatabase says otherwise and the views leave those buttons out
+    remote = False
+
+    def __init__(self, path="salon_database.db", init=True, query_stats=None):
+        self.path = path
+
+        # WAL mode, per-thread read connections and the single writer
+        self.connections = ConnectionManager(self.path, query_stats)
+        self.conn = self.connections.writer
+
+        # latency, rows and slow queries of every statement on those connections,
+        # db.query_stats.dump() prints a summary
+        self.query_stats = self.connections.stats
+        self.local = threading.local()
+
+        # last known dashboard figures and other aggregates, see aggregate_cache.py
+        self.aggregates = AggregateCache(self)
+
+        # typed reads, see repositories.py
+        self.users = repositories.UserRepository(self)
+        self.services = repositories.ServiceRepository(self)
+        self.appointments = repositories.AppointmentRepository(self)
+        self.payments = repositories.PaymentRepository(self)
 
         # call the initialization methods
-        self.init_db()
+        if init:
+            self.init_db()
+
+    def read(self, q, params=()):
+        # runs on the calling thread's read connection, with its own cursor
+        return self.connections.reader().execute(q, params)
+
+    def write(self, q, params=()):
+        # runs on the writer connection. inside a transaction() it becomes part
+        # of it, otherwise it commits straight away
+        with self.transaction() as work:
+            return work.execute(q, params)
+
+    @contextmanager
+    def transaction(self):
+        # unit of work: every write in the block is committed together when it
+        # finishes, or none of them if it raises. write() and the other write
+        # methods called inside the block join it. a transaction() opened
+        # inside another one is a savepoint, so a step that fails can be caught
+        # and the rest still committed:
+        #
+        #   with db.transaction() as work:
+        #       appointment_id = db.add_appointment(...)
+        #       try:
+        #           with work.savepoint():
+        #               db.insert_payment(appointment_id, ...)
+        #       except sqlite3.IntegrityError:
+        #           ...  # booked, not paid
+        work = getattr(self.local, "work", None)
+        nested = work is not None
+        with self.connections.write() as conn:
+            if not nested:
+                work = self.local.work = UnitOfWork(self, conn)
+            try:
+                yield work
+            finally:
+                if not nested:
+                    self.local.work = None
+        # only reached once committed. invalidate() with no tables means all of them
+        if not nested and work.tables:
+            self.aggregates.invalidate(*work.tables)
+
+    def batch(self, calls):
+        # [(method, args), (method, args, kwargs), ...] run in order in one
+        # transaction, all or none, and their results returned. "users.get"
+        # and the like reach the repositories. it's how a RemoteDatabase
+        # writes several things together, the service runs it the same way
+        results = []
+        with self.transaction():
+            for call in calls:
+                target = self
+                for name in call[0].split("."):
+                    target = getattr(target, name)
+                results.append(target(*call[1], **(call[2] if len(call) > 2 else {})))
+        return results
+
+    def release_thread(self):
+        # the calling thread is done with the database: its reader goes back
+        # to the pool and its cached table versions are dropped
+        vars(self.local).clear()
+        self.connections.release_reader()
+
+    def close(self):
+        self.connections.close()
+
+    # change tracking
+    def table_versions(self, tables=None):
+        # per-table write counters kept by triggers (see migrations.CHANGE_TRACKING).
+        # PRAGMA data_version on this thread's reader only moves when some other
+        # connection commits, so while it stays put the last counters are reused.
+        reader = self.connections.reader()
+        data_version = reader.execute("PRAGMA data_version").fetchone()[0]
+
+        cached = getattr(self.local, "versions", None)
+        if cached is None or cached[0] != data_version:
+            versions = dict(reader.execute("SELECT table_name, version FROM table_versions").fetchall())
+            cached = (data_version, versions)
+            self.local.versions = cached
+
+        if tables is None:
+            return dict(cached[1])
+        return tuple(cached[1].get(t, 0) for t in tables)
 
     def init_db(self):
+        # bring the schema up to date, a current database only costs a PRAGMA read
+        start = time.perf_counter()
         try:
-            with open("database.sql", "r") as file:
-                script = file.read()
-                self.cur.executescript(script)
-            
-            # updated force sync
-            #add dummy values for email and names to satisfy the database constraints
-            admin_pw = self.hash_password("admin123")
-            self.cur.execute("""
-                INSERT OR REPLACE INTO users (user_id, username, password, email, role, status, first_name, last_name)
-                VALUES (1, 'admin', ?, 'admin@salon.com', 'admin', 'active', 'Salon', 'Manager')
-            """, (admin_pw,))
-            
-            self.conn.commit()
-            print(f"DEBUG: Database initialized and admin synced with email.")
+            with self.connections.write_lock:
+                applied = migrations.migrate(self.conn)
         except Exception as e:
             print(f"DEBUG: SQL Error: {e}")
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        version = migrations.current_version(self.conn)
+
+        if applied:
+            for step_version, description, duration in applied:
+                print(f"DEBUG: Applied migration {step_version} ({description}) in {duration * 1000:.1f} ms")
+            print(f"DEBUG: Database migrated to v{version} in {elapsed_ms:.1f} ms")
+        else:
+            saved_ms = max(migrations.migration_cost_ms(self.conn) - elapsed_ms, 0)
+            print(f"DEBUG: Database schema current (v{version}), init took {elapsed_ms:.2f} ms, "
+                  f"{saved_ms:.1f} ms saved by skipping the schema script")
 
     # password hashing
     def hash_password(self, password: str):
@@ -127,178 +253,367 @@ class Database:
         print(f"DEBUG: Attempting login for: {username}")
         print(f"DEBUG: Input Password Hash: {hashed_input}")
 
-        q = "SELECT password FROM users WHERE username=?"
-        self.cur.execute(q, (username,))
-        result = self.cur.fetchone()
-        
-        if result:
-            print(f"DEBUG: DB Stored Hash:    {result[0]}")
-            if result[0] == hashed_input:
-                # if they match, fetch the full user
-                q_full = """SELECT user_id, username, password, email, birth_date, 
-                                  joined_date, last_login, role, status 
-                           FROM users WHERE username=?"""
-                self.cur.execute(q_full, (username,))
-                row = self.cur.fetchone()
-                return User(row[0], row[1], row[2], row[3], row[4], row[5], row[6],
-                            UserRole(row[7]), UserStatus(row[8]))
-        
+        user = self.users.by_username(username)
+
+        if user:
+            print(f"DEBUG: DB Stored Hash:    {user.password}")
+            if user.password == hashed_input:
+                return user
+
         print("DEBUG: Mismatch or User not found.")
         return None
 
+    # keyset pagination
+    # every paged fetch returns a list of (key, row) pairs. pass the key of the
+    # last row as `after` for the next page, or the key of the first row as
+    # `before` for the previous one. seeking on an indexed key instead of using
+    # OFFSET keeps every page the same cost however deep into the table it is.
+    def fetch_page(self, columns, from_clause, conditions, params, key_exprs,
+                   descending=False, after=None, before=None, limit=None, model=None):
+        conditions = list(conditions)
+        params = list(params)
+
+        keys = ", ".join(key_exprs)
+        marks = ", ".join("?" for _ in key_exprs)
+
+        if after is not None:
+            conditions.append(f"({keys}) {'<' if descending else '>'} ({marks})")
+            params.extend(after)
+        if before is not None:
+            conditions.append(f"({keys}) {'>' if descending else '<'} ({marks})")
+            params.extend(before)
+
+        # walking backwards from `before` reads in reverse and flips the page after
+        backwards = before is not None and after is None
+        order = "DESC" if descending != backwards else "ASC"
+
+        # the key columns are selected with a unary + so the datetime converter
+        # leaves them as the raw stored values that the WHERE clause compares against
+        q = f"SELECT {columns}, {', '.join('+' + k for k in key_exprs)} {from_clause}"
+        if conditions:
+            q += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+        q += " ORDER BY " + ", ".join(f"{k} {order}" for k in key_exprs)
+        q += " LIMIT ?"
+        params.append(limit if limit is not None else -1)
+
+        n = len(key_exprs)
+        # rows come back as `model` (a models NamedTuple) without the key columns
+        make = model._make if model else tuple
+        page = [(r[-n:], make(r[:-n])) for r in self.read(q, params).fetchall()]
+
+        if backwards:
+            page.reverse()
+        return page
+
+    # searches go through the FTS5 indexes (see migrations.SEARCH_INDEX). results
+    # are ranked best match first and paged on (rank, id) instead of the usual order.
+    def fetch_people_page(self, role_condition, search_term="", after=None, before=None, limit=None):
+        columns = "u.user_id, u.first_name, u.last_name, u.email, u.phone_number"
+        match = fts_query(search_term)
+
+        if match:
+            return self.fetch_page(
+                columns,
+                """
+                    FROM (SELECT rowid AS id, rank AS score FROM people_fts WHERE people_fts MATCH ?) m
+                    JOIN users u ON u.user_id = m.id
+                """,
+                [role_condition], [match], ["m.score", "u.user_id"],
+                after=after, before=before, limit=limit, model=Person
+            )
+
+        return self.fetch_page(
+            columns, "FROM users u",
+            [role_condition], [], ["u.user_id"],
+            after=after, before=before, limit=limit, model=Person
+        )
+
+    def fetch_staff_page(self, search_term="", after=None, before=None, limit=None):
+        return self.fetch_people_page("u.role != 'customer'", search_term, after, before, limit)
+
+    def fetch_customers_page(self, search_term="", after=None, before=None, limit=None):
+        return self.fetch_people_page("u.role = 'customer'", search_term, after, before, limit)
+
     def fetch_all_staff(self, search_term=""):
-        if search_term:
-            q = """SELECT user_id, first_name, last_name, email, phone_number 
-                   FROM users WHERE role != 'customer' 
-                   AND (first_name LIKE ? OR last_name LIKE ?)"""
-            self.cur.execute(q, ('%' + search_term + '%', '%' + search_term + '%'))
-        else:
-            q = "SELECT user_id, first_name, last_name, email, phone_number FROM users WHERE role != 'customer'"
-            self.cur.execute(q)
-        return self.cur.fetchall()
+        return [row for _, row in self.fetch_staff_page(search_term)]
 
     def fetch_all_customers(self, search_term=""):
-        if search_term:
-            q = """SELECT user_id, first_name, last_name, email, phone_number 
-                   FROM users WHERE role = 'customer' 
-                   AND (first_name LIKE ? OR last_name LIKE ?)"""
-            self.cur.execute(q, ('%' + search_term + '%', '%' + search_term + '%'))
-        else:
-            q = "SELECT user_id, first_name, last_name, email, phone_number FROM users WHERE role = 'customer'"
-            self.cur.execute(q)
-        return self.cur.fetchall()
+        return [row for _, row in self.fetch_customers_page(search_term)]
+
+    def unique_username(self, base_username):
+        # base_username, or base_username1, 2, ... if taken. read on the writer,
+        # so inside a transaction() nobody can take it before the insert
+        with self.transaction() as work:
+            username = base_username
+            counter = 1
+            while work.execute("SELECT 1 FROM users WHERE username=?", (username,)).fetchone():
+                username = f"{base_username}{counter}"
+                counter += 1
+            return username
+
+    def add_user(self, role, username, password_hash, email, first_name, last_name, phone_number=None):
+        # returns the new user_id
+        return self.write("""
+            INSERT INTO users (username, password, email, first_name, last_name, phone_number, role)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (username, password_hash, email, first_name, last_name, phone_number, role)).lastrowid
+
+    def create_user(self, role, base_username, password_hash, first_name, last_name, email=None, phone_number=None):
+        # picks a free username from base_username and adds the user in one
+        # transaction, so it can't be taken in between. email defaults to
+        # username@salon.com. returns (user_id, username)
+        with self.transaction():
+            username = self.unique_username(base_username)
+            user_id = self.add_user(role, username, password_hash, email or f"{username}@salon.com",
+                                    first_name, last_name, phone_number)
+            return user_id, username
+
+    def update_user(self, user_id, **fields):
+        # update_user(5, first_name="Ann", phone_number="07...") for any of USER_FIELDS
+        unknown = set(fields) - set(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update users column(s): {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{column}=?" for column in fields)
+        self.write(f"UPDATE users SET {assignments} WHERE user_id=?", (*fields.values(), user_id))
 
     def delete_user(self, user_id):
-        self.cur.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-        self.conn.commit()
+        self.write("DELETE FROM users WHERE user_id = ?", (user_id,))
 
-    def fetch_customers(self):
-        q = """
-            SELECT user_id, first_name || ' ' || last_name AS full_name
-            FROM users
-            WHERE role = 'customer'
-            ORDER BY first_name
-        """
-        self.cur.execute(q)
-        return self.cur.fetchall()
     
-    def fetch_appointments_with_prices(self):
-        q = """
-        SELECT 
-            a.appointment_id,
-            a.appointment_datetime,
+    def fetch_payments_page(self, search_term="", after=None, before=None, limit=None):
+        columns = """
+            p.payment_id,
+            p.appointment_id,
             u.first_name || ' ' || u.last_name AS customer_name,
-            s.service_name,
-            s.price
-        FROM appointments a
-        JOIN users u ON a.customer_id = u.user_id
-        JOIN services s ON a.service_id = s.service_id
-        ORDER BY a.appointment_datetime DESC
-    """
-        self.cur.execute(q)
-        return self.cur.fetchall()
+            p.amount,
+            p.payment_date,
+            p.payment_method,
+            p.status
+        """
+        joins = """
+            JOIN appointments a ON p.appointment_id = a.appointment_id
+            JOIN users u ON a.customer_id = u.user_id
+        """
+        match = fts_query(search_term)
+
+        # search matches the appointment a payment is for (customer, stylist, service, notes)
+        if match:
+            return self.fetch_page(
+                columns,
+                """
+                    FROM (SELECT rowid AS id, rank AS score FROM appointments_fts WHERE appointments_fts MATCH ?) m
+                    JOIN payments p ON p.appointment_id = m.id
+                """ + joins,
+                [], [match], ["m.score", "p.payment_id"],
+                after=after, before=before, limit=limit, model=PaymentRow
+            )
+
+        # newest first, IFNULL so rows without a date still have a place in the order
+        return self.fetch_page(
+            columns, "FROM payments p" + joins,
+            [], [], ["IFNULL(p.payment_date, 0)", "p.payment_id"],
+            descending=True, after=after, before=before, limit=limit, model=PaymentRow
+        )
 
-    
     def fetch_all_payments(self, search_term=""):
-        if search_term:
-            q = """
-                SELECT 
-                    p.payment_id,
-                    p.appointment_id,
-                    u.first_name || ' ' || u.last_name AS customer_name,
-                    p.amount,
-                    p.payment_date,
-                    p.payment_method,
-                    p.status
-                FROM payments p
-                JOIN appointments a ON p.appointment_id = a.appointment_id
-                JOIN users u ON a.customer_id = u.user_id
-                WHERE u.first_name LIKE ? OR u.last_name LIKE ?
-                ORDER BY p.payment_date DESC
-            """
-            self.cur.execute(q, ('%' + search_term + '%', '%' + search_term + '%'))
+        return [row for _, row in self.fetch_payments_page(search_term)]
+
+
+
+
+
+    # reporting
+    # revenue comes from the summary tables the payment triggers keep up to date
+    # (see migrations.REVENUE_SUMMARY), never from the payments themselves.
+    # ranges are half open dates, start <= day < end.
+    def revenue_summary(self, group_by="month", start=None, end=None, status="paid"):
+        # [(label, payment count, total)] in label order
+        if group_by not in REVENUE_GROUPS:
+            raise ValueError(f"Unknown revenue grouping '{group_by}'")
+        label, group, join, daily_table, monthly_table = REVENUE_GROUPS[group_by]
+
+        # the monthly rollup is enough unless the range cuts through a month
+        whole_months = all(d is None or str(d)[8:10] in ("", "01") for d in (start, end))
+        if monthly_table and whole_months:
+            table, period, width = monthly_table, "month", 7
         else:
-            q = """
-                SELECT 
-                    p.payment_id,
-                    p.appointment_id,
-                    u.first_name || ' ' || u.last_name AS customer_name,
-                    p.amount,
-                    p.payment_date,
-                    p.payment_method,
-                    p.status
-                FROM payments p
-                JOIN appointments a ON p.appointment_id = a.appointment_id
-                JOIN users u ON a.customer_id = u.user_id
-                ORDER BY p.payment_date DESC
-            """
-            self.cur.execute(q)
-
-        return self.cur.fetchall()
-
-
-    def fetch_stylists(self):
+            table, period, width = daily_table, "day", 10
+
+        conditions, params = ["r.status = ?"], [status]
+        if start:
+            conditions.append(f"r.{period} >= ?")
+            params.append(str(start)[:width])
+        if end:
+            conditions.append(f"r.{period} < ?")
+            params.append(str(end)[:width])
+
+        q = f"""
+            SELECT {label.format(period=period)} AS label, SUM(r.payment_count), ROUND(SUM(r.amount_total), 2)
+            FROM {table} r
+            {join}
+            WHERE {" AND ".join(conditions)}
+            GROUP BY {group}
+            ORDER BY label
+        """
+        return self.read(q, params).fetchall()
+
+    def revenue_year_over_year(self, year=None, status="paid"):
+        # [(month 1-12, this year's total, last year's total)]
+        year = year or datetime.date.today().year
+        totals = dict(self.read("""
+            SELECT month, ROUND(SUM(amount_total), 2)
+            FROM monthly_revenue
+            WHERE status = ? AND month >= ? AND month < ?
+            GROUP BY month
+        """, (status, f"{year - 1}-01", f"{year + 1}-01")).fetchall())
+
+        return [(m, totals.get(f"{year}-{m:02d}", 0.0), totals.get(f"{year - 1}-{m:02d}", 0.0))
+                for m in range(1, 13)]
+
+    # day figures for the dashboard
+    def bookings_on(self, day):
+        # {status: count} for the appointments on that day
+        start = datetime.datetime.combine(day, datetime.time())
+        end = start + datetime.timedelta(days=1)
         q = """
-            SELECT user_id, first_name || ' ' || last_name AS full_name
-            FROM users
-            WHERE role IN ('staff', 'stylist')
-            ORDER BY first_name
+            SELECT lower(status), COUNT(*)
+            FROM appointments
+            WHERE appointment_datetime >= ? AND appointment_datetime < ?
+            GROUP BY lower(status)
         """
-        self.cur.execute(q)
-        return self.cur.fetchall()
+        return dict(self.read(q, (start, end)).fetchall())
 
+    def takings_on(self, day):
+        # (payment count, total) of paid payments that day, from the revenue summary
+        q = "SELECT IFNULL(SUM(payment_count), 0), IFNULL(ROUND(SUM(amount_total), 2), 0) FROM daily_totals WHERE day = ? AND status = 'paid'"
+        return self.read(q, (day.isoformat(),)).fetchone()
 
-    def fetch_services(self):
+    def stylist_load_on(self, day):
+        # [(stylist name, appointments, booked minutes)] busiest first, cancellations and no-shows left out
+        start = datetime.datetime.combine(day, datetime.time())
+        end = start + datetime.timedelta(days=1)
         q = """
-            SELECT service_id, service_name
-            FROM services
-            ORDER BY service_name
+            SELECT u.first_name || ' ' || u.last_name, COUNT(*), SUM(s.duration_minutes)
+            FROM appointments a
+            JOIN users u ON u.user_id = a.stylist_id
+            JOIN services s ON s.service_id = a.service_id
+            WHERE a.appointment_datetime >= ? AND a.appointment_datetime < ?
+              AND lower(a.status) NOT IN ('cancelled', 'no-show')
+            GROUP BY a.stylist_id
+            ORDER BY 3 DESC, 1
         """
-        self.cur.execute(q)
-        return self.cur.fetchall()
+        return self.read(q, (start, end)).fetchall()
+
+    # availability
+    def stylist_bookings(self, stylist_id, start, end, exclude_id=None):
+        # live appointments for one stylist that overlap [start, end), as
+        # (start, end, appointment_id) sorted by start. the range is widened by
+        # the longest service so it stays an index search on (stylist_id, appointment_datetime).
+        longest = self.read("SELECT IFNULL(MAX(duration_minutes), 0) FROM services").fetchone()[0]
+        lower = start - datetime.timedelta(minutes=longest)
+
+        q = """
+            SELECT a.appointment_id, a.appointment_datetime, s.duration_minutes
+            FROM appointments a
+            JOIN services s ON s.service_id = a.service_id
+            WHERE a.stylist_id = ?
+              AND a.appointment_datetime >= ?
+              AND a.appointment_datetime < ?
+              AND lower(a.status) NOT IN ('cancelled', 'no-show')
+            ORDER BY a.appointment_datetime
+        """
+        rows = self.read(q, (stylist_id, lower, end))
+
+        bookings = []
+        for appointment_id, booked_start, duration in rows:
+            if appointment_id == exclude_id:
+                continue
+            booked_end = booked_start + datetime.timedelta(minutes=duration)
+            if booked_end > start:
+                bookings.append((booked_start, booked_end, appointment_id))
+        return bookings
+
+    def service_duration(self, service_id):
+        row = self.read("SELECT duration_minutes FROM services WHERE service_id=?", (service_id,)).fetchone()
+        return row[0] if row else availability.SLOT_MINUTES
+
+    def find_conflict(self, stylist_id, service_id, start, exclude_id=None):
+        # appointment_id of a booking that clashes with this one, or None
+        start = availability.parse_datetime(start)
+        end = start + datetime.timedelta(minutes=self.service_duration(service_id))
+        clash = availability.overlaps(self.stylist_bookings(stylist_id, start, end, exclude_id), start, end)
+        return clash[2] if clash else None
+
+    def next_free_slots(self, stylist_id, service_id, count=5, start=None, horizon_days=365):
+        # the next `count` start times the stylist can fit this service in,
+        # within opening hours, looking up to horizon_days ahead
+        start = availability.parse_datetime(start) or datetime.datetime.now()
+        end = start + datetime.timedelta(days=horizon_days + 1)
+        busy = self.stylist_bookings(stylist_id, start, end)
+        return availability.free_slots(busy, start, self.service_duration(service_id), count, horizon_days)
+
+    def fetch_appointments_page(self, search_term="", after=None, before=None, limit=None):
+        columns = """
+            a.appointment_id,
+            a.appointment_datetime,
+            a.notes,
+            a.status,
+            c.first_name || ' ' || c.last_name AS customer_name,
+            s.first_name || ' ' || s.last_name AS stylist_name,
+            sv.service_name
+        """
+        joins = """
+            JOIN users c ON a.customer_id = c.user_id
+            JOIN users s ON a.stylist_id = s.user_id
+            JOIN services sv ON a.service_id = sv.service_id
+        """
+        match = fts_query(search_term)
+
+        if match:
+            return self.fetch_page(
+                columns,
+                """
+                    FROM (SELECT rowid AS id, rank AS score FROM appointments_fts WHERE appointments_fts MATCH ?) m
+                    JOIN appointments a ON a.appointment_id = m.id
+                """ + joins,
+                [], [match], ["m.score", "a.appointment_id"],
+                after=after, before=before, limit=limit, model=AppointmentRow
+            )
+
+        return self.fetch_page(
+            columns, "FROM appointments a" + joins,
+            [], [], ["a.appointment_datetime", "a.appointment_id"],
+            after=after, before=before, limit=limit, model=AppointmentRow
+        )
 
     def fetch_all_appointments(self, search_term=""):
-        if search_term:
-            q = """
-                SELECT 
-                    a.appointment_id,
-                    a.appointment_datetime,
-                    a.notes,
-                    a.status,
-                    c.first_name || ' ' || c.last_name AS customer_name,
-                    s.first_name || ' ' || s.last_name AS stylist_name,
-                    sv.service_name
-                FROM appointments a
-                JOIN users c ON a.customer_id = c.user_id
-                JOIN users s ON a.stylist_id = s.user_id
-                JOIN services sv ON a.service_id = sv.service_id
-                WHERE c.first_name LIKE ? OR c.last_name LIKE ?
-                ORDER BY a.appointment_datetime
-            """
-            self.cur.execute(q, ('%' + search_term + '%', '%' + search_term + '%'))
-        else:
-            q = """
-                SELECT 
-                    a.appointment_id,
-                    a.appointment_datetime,
-                    a.notes,
-                    a.status,
-                    c.first_name || ' ' || c.last_name AS customer_name,
-                    s.first_name || ' ' || s.last_name AS stylist_name,
-                    sv.service_name
-                FROM appointments a
-                JOIN users c ON a.customer_id = c.user_id
-                JOIN users s ON a.stylist_id = s.user_id
-                JOIN services sv ON a.service_id = sv.service_id
-                ORDER BY a.appointment_datetime
-            """
-            self.cur.execute(q)
-
-        return self.cur.fetchall()
+        return [row for _, row in self.fetch_appointments_page(search_term)]
+
+    def add_appointment(self, customer_id, stylist_id, service_id, appointment_dt, notes="", status="Booked"):
+        # returns the new appointment_id. a double booking raises sqlite3.IntegrityError
+        return self.write("""
+            INSERT INTO appointments (customer_id, stylist_id, service_id, appointment_datetime, notes, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (customer_id, stylist_id, service_id, appointment_dt, notes, status)).lastrowid
+
+    def update_appointment(self, appointment_id, customer_id, stylist_id, service_id, appointment_dt,
+                           notes, status):
+        self.write("""
+            UPDATE appointments
+            SET customer_id=?, stylist_id=?, service_id=?, appointment_datetime=?, notes=?, status=?
+            WHERE appointment_id=?
+        """, (customer_id, stylist_id, service_id, appointment_dt, notes, status, appointment_id))
+
+    def set_appointment_statuses(self, appointment_ids, status):
+        # one executemany in one transaction, rather than a commit per appointment
+        with self.transaction() as work:
+            work.executemany("UPDATE appointments SET status=? WHERE appointment_id=?",
+                             [(status, appointment_id) for appointment_id in appointment_ids])
 
     def delete_appointment(self, appointment_id):
-        self.cur.execute("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
-        self.conn.commit()
+        self.write("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
 
 
     def insert_payment(self, appointment_id, amount, method, status,
@@ -312,11 +627,10 @@ class Database:
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """
 
-        self.cur.execute(q, (
+        return self.write(q, (
             appointment_id, amount, method, status,
             card_last4, card_expiry, card_holder
-        ))
-        self.conn.commit()
+        )).lastrowid
 
     def update_payment(self, payment_id, method, status,
                     card_last4=None, card_expiry=None, card_holder=None):
@@ -327,19 +641,10 @@ class Database:
             WHERE payment_id=?
         """
 
-        self.cur.execute(q, (
+        self.write(q, (
             method, status, card_last4, card_expiry, card_holder, payment_id
         ))
-        self.conn.commit()
 
 
     def delete_payment(self, payment_id):
-        self.cur.execute("DELETE FROM payments WHERE payment_id=?", (payment_id,))
-        self.conn.commit()
-
-
-
-
-
-
-db = Database()
\ No newline at end of file
+        self.write("DELETE FROM payments WHERE payment_id=?", (payment_id,))
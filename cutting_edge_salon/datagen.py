@@ -0,0 +1,260 @@
+import argparse
+import datetime
+import hashlib
+import itertools
+import os
+import random
+import sys
+import time
+
+from database import Database
+
+
+# deterministic fake salon data for benchmarks and load testing.
+# the same seed, size and anchor date always produce the same rows. dates are
+# laid out a year either side of the anchor (today unless given), so there
+# are always past and upcoming bookings. volumes go from a few thousand rows
+# to millions: rows are made and written a chunk at a time, in one
+# transaction, so memory stays flat.
+#
+#   python datagen.py bench.db --appointments 1000000
+#   python datagen.py demo.db --appointments 20000 --seed 7 --today 2026-01-15
+
+CHUNK_SIZE = 50000
+
+FIRST_NAMES = ["Alice", "Amelia", "Ava", "Ben", "Charlie", "Chloe", "Daniel", "Ella", "Emily",
+               "Finn", "Grace", "Harry", "Isla", "Jack", "James", "Leo", "Lily", "Mia",
+               "Noah", "Oliver", "Olivia", "Oscar", "Ruby", "Sophie", "Thomas", "Zara"]
+
+LAST_NAMES = ["Adams", "Baker", "Brown", "Clarke", "Davies", "Evans", "Green", "Hall", "Hughes",
+              "Jones", "King", "Lewis", "Martin", "Moore", "Patel", "Robinson", "Smith",
+              "Taylor", "Thomas", "Walker", "White", "Williams", "Wilson", "Wright"]
+
+SERVICES = [
+    ("Women's Cut", 45.0, 45), ("Men's Cut", 25.0, 30), ("Blow Dry", 30.0, 30),
+    ("Full Colour", 85.0, 90), ("Root Touch Up", 55.0, 60), ("Highlights", 95.0, 120),
+    ("Balayage", 120.0, 150), ("Toner", 35.0, 30), ("Beard Trim", 15.0, 15),
+    ("Kids Cut", 18.0, 30), ("Keratin Treatment", 150.0, 120), ("Updo", 60.0, 60),
+]
+
+# how often each service is booked, relative to each other
+SERVICE_POPULARITY = {
+    "Women's Cut": 22, "Men's Cut": 20, "Blow Dry": 12, "Full Colour": 8, "Root Touch Up": 9,
+    "Highlights": 6, "Balayage": 3, "Toner": 4, "Beard Trim": 7, "Kids Cut": 6,
+    "Keratin Treatment": 1, "Updo": 2,
+}
+
+NOTES = ["", "", "", "Bringing own products", "Allergic to ammonia", "Running late",
+         "First visit", "Prefers quiet appointment", "Patch test done"]
+
+# busiest at the end of the week, closed on Sundays, and at Christmas
+WEEKDAY_WEIGHTS = (0.6, 0.8, 0.9, 1.1, 1.3, 1.6, 0.0)
+MONTH_WEIGHTS = (0.8, 0.85, 0.95, 1.0, 1.0, 1.05, 1.0, 0.9, 1.0, 1.0, 1.1, 1.4)
+
+# opening hours (start of the hour) and how busy each one is
+HOURS = (9, 10, 11, 12, 13, 14, 15, 16, 17)
+HOUR_WEIGHTS = (6, 9, 10, 8, 7, 8, 9, 10, 7)
+
+# the diary fills up closer to the day, bookings thin out over this many days ahead
+BOOKING_HORIZON_DAYS = 120
+
+
+def weighted(rng, values, weights):
+    # picks from values with cum_weights, so each pick is a bisect
+    cum_weights = list(itertools.accumulate(weights))
+    return lambda: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def generate(path, appointments=1000, seed=42, customers=None, stylists=8, today=None,
+             chunk_size=CHUNK_SIZE, progress=None):
+    # builds a fresh database at path, returns a dict of row counts.
+    # progress(stage, done, total) is called after every chunk.
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    customers = customers or max(appointments // 5, 10)
+    # bookings can't overlap per stylist, keep each one well under a full diary
+    stylists = max(stylists, appointments // 2000)
+
+    # a year either side of the anchor, in opening hours on the quarter hour
+    today = datetime.datetime.combine(today or datetime.date.today(), datetime.time())
+    start = today - datetime.timedelta(days=365)
+
+    def joined(days_back):
+        # users columns are text DATETIMEs, a datetime would bind as epoch seconds
+        at = start - datetime.timedelta(days=rng.randrange(days_back), seconds=rng.randrange(86400))
+        return at.strftime("%Y-%m-%d %H:%M:%S")
+
+    db = Database(path)
+    password = hashlib.sha256("password123".encode()).hexdigest()
+
+    with db.connections.write() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO services (service_name, price, duration_minutes) VALUES (?, ?, ?)",
+            SERVICES
+        )
+        service_rows = conn.execute(
+            "SELECT service_id, service_name, price, duration_minutes FROM services ORDER BY service_id"
+        ).fetchall()
+        pick_service = weighted(rng, service_rows, [SERVICE_POPULARITY.get(r[1], 1) for r in service_rows])
+
+        # the schema's seeded admin is stamped with the time it was made
+        conn.execute("UPDATE users SET joined_date = ?, last_login = ? WHERE role = 'admin'",
+                     (joined(1), today.strftime("%Y-%m-%d %H:%M:%S")))
+
+        conn.executemany("""
+            INSERT INTO users (username, password, email, first_name, last_name, phone_number, role,
+                               joined_date, last_login)
+            VALUES (?, ?, ?, ?, ?, ?, 'stylist', ?, ?)
+        """, [
+            (f"stylist{i}", password, f"stylist{i}@salon.com",
+             rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"07{rng.randrange(10 ** 9):09d}",
+             joined(1000), today.strftime("%Y-%m-%d %H:%M:%S"))
+            for i in range(stylists)
+        ])
+        stylist_ids = [r[0] for r in conn.execute("SELECT user_id FROM users WHERE role = 'stylist' ORDER BY user_id")]
+        # some stylists are busier than others
+        pick_stylist = weighted(rng, stylist_ids, [rng.uniform(0.6, 1.4) for _ in stylist_ids])
+
+        for first in range(0, customers, chunk_size):
+            conn.executemany("""
+                INSERT INTO users (username, password, email, first_name, last_name, phone_number, role,
+                                   joined_date, last_login)
+                VALUES (?, ?, ?, ?, ?, ?, 'customer', ?, NULL)
+            """, [
+                (f"customer{i}_user", password, f"customer{i}@example.com",
+                 rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"07{rng.randrange(10 ** 9):09d}",
+                 joined(1500))
+                for i in range(first, min(first + chunk_size, customers))
+            ])
+            if progress:
+                progress("customers", min(first + chunk_size, customers), customers)
+        customer_ids = [r[0] for r in conn.execute("SELECT user_id FROM users WHERE role = 'customer' ORDER BY user_id")]
+        # a few regulars make most of the visits, most people come now and then
+        pick_customer = weighted(rng, customer_ids, [min(rng.paretovariate(1.5), 25) for _ in customer_ids])
+
+        pick_hour = weighted(rng, HOURS, HOUR_WEIGHTS)
+        best_day = max(WEEKDAY_WEIGHTS) * max(MONTH_WEIGHTS)
+
+        def pick_day():
+            # rejection sampling on how busy that weekday, month and distance ahead are
+            while True:
+                offset = rng.randrange(730)
+                day = start + datetime.timedelta(days=offset)
+                weight = WEEKDAY_WEIGHTS[day.weekday()] * MONTH_WEIGHTS[day.month - 1]
+                if day >= today:
+                    weight *= max(0.05, 1 - (day - today).days / BOOKING_HORIZON_DAYS)
+                if rng.random() * best_day < weight:
+                    return day
+
+        made = 0
+        booked = {}  # (stylist_id, day) -> [(start, end)], the database rejects double bookings
+        while made < appointments:
+            chunk = []
+            while len(chunk) < min(chunk_size, appointments - made):
+                when = pick_day() + datetime.timedelta(hours=pick_hour(), minutes=15 * rng.randrange(4))
+                service = pick_service()
+                stylist_id = pick_stylist()
+                if when < today:
+                    status = rng.choices(["Completed", "Cancelled", "No-Show"], [85, 9, 6])[0]
+                else:
+                    status = rng.choices(["Booked", "Cancelled"], [95, 5])[0]
+
+                if status in ("Completed", "Booked"):
+                    end = when + datetime.timedelta(minutes=service[3])
+                    day = booked.setdefault((stylist_id, when.date()), [])
+                    if any(s < end and e > when for s, e in day):
+                        continue
+                    day.append((when, end))
+
+                chunk.append((pick_customer(), stylist_id, service[0], when, rng.choice(NOTES), status))
+
+            conn.executemany("""
+                INSERT INTO appointments (customer_id, stylist_id, service_id, appointment_datetime, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, chunk)
+            made += len(chunk)
+            if progress:
+                progress("appointments", made, appointments)
+        booked = None
+
+        # completed appointments are paid for as they finish: mostly one payment,
+        # sometimes a deposit and the balance, now and then refunded. the last
+        # couple of days still have some payments pending.
+        services = {r[0]: r for r in service_rows}
+        recent = today - datetime.timedelta(days=2)
+        paid = 0
+        chunk = []
+
+        def flush():
+            conn.executemany("""
+                INSERT INTO payments (appointment_id, amount, payment_date, payment_method, status, card_last4)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, chunk)
+
+        for appt_id, service_id, dt, status in conn.execute(
+                "SELECT appointment_id, service_id, appointment_datetime, status FROM appointments ORDER BY appointment_id"):
+            if status != "Completed":
+                continue
+            _, _, price, duration = services[service_id]
+            paid_at = dt + datetime.timedelta(minutes=duration + rng.randrange(15))
+            method = rng.choices(["Card", "Cash"], [80, 20])[0]
+            card = f"{rng.randrange(10000):04d}" if method == "Card" else None
+            outcome = rng.random()
+
+            if outcome < 0.04:
+                deposit = round(price * 0.2, 2)
+                chunk.append((appt_id, deposit, dt - datetime.timedelta(days=rng.randrange(1, 21)), method, "paid", card))
+                chunk.append((appt_id, price - deposit, paid_at, method, "paid", card))
+            elif outcome < 0.05:
+                chunk.append((appt_id, price, paid_at, method, "refunded", card))
+            else:
+                status = "pending" if dt >= recent and rng.random() < 0.3 else "paid"
+                chunk.append((appt_id, price, paid_at, method, status, card))
+
+            if len(chunk) >= chunk_size:
+                flush()
+                paid += len(chunk)
+                chunk = []
+                if progress:
+                    progress("payments", paid, None)
+        flush()
+        paid += len(chunk)
+
+    counts = {
+        "services": len(service_rows),
+        "stylists": len(stylist_ids),
+        "customers": len(customer_ids),
+        "appointments": made,
+        "payments": paid,
+    }
+    db.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a fake salon database")
+    parser.add_argument("path", help="database file, replaced if it exists")
+    parser.add_argument("--appointments", type=int, default=10000)
+    parser.add_argument("--customers", type=int, help="default: one per five appointments")
+    parser.add_argument("--stylists", type=int, default=8, help="at least one per 2000 appointments")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", help="anchor date YYYY-MM-DD, default today")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    today = datetime.date.fromisoformat(args.today) if args.today else None
+
+    def progress(stage, done, total):
+        print(f"DEBUG: {stage}: {done:,}" + (f" of {total:,}" if total else ""))
+
+    started = time.perf_counter()
+    counts = generate(args.path, args.appointments, args.seed, args.customers, args.stylists, today,
+                      args.chunk_size, progress)
+    print(f"{counts} written to {args.path} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
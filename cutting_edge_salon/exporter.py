@@ -0,0 +1,235 @@
+import argparse
+import csv
+import datetime
+import gzip
+import json
+import os
+import sys
+import time
+
+import timestamps
+
+
+# streaming exports of payments and appointments for accounting. rows are
+# read from a single cursor with fetchmany and written out as they arrive,
+# so memory stays the same whether the range holds ten rows or ten million.
+# the export runs inside one read transaction, so it's a consistent snapshot
+# even while the app keeps writing (WAL readers never block the writer).
+#
+#   python exporter.py payments payments-2025.csv.gz --year 2025
+#   python exporter.py appointments march.jsonl --month 2025-03 --status Completed
+
+CHUNK_SIZE = 1000
+FORMATS = ("csv", "jsonl")
+
+# each export: the SELECT, the column its date range applies to, and the
+# filters it accepts (name -> SQL it compares against). times are stored as
+# epoch seconds and written out as text by SQLite, no per-row Python parsing.
+EXPORTS = {
+    "payments": {
+        "select": """
+            SELECT p.payment_id, strftime('%Y-%m-%d %H:%M:%S', p.payment_date, 'unixepoch') AS payment_date,
+                   p.amount, p.payment_method, p.status, p.card_last4, p.appointment_id,
+                   strftime('%Y-%m-%d %H:%M', a.appointment_datetime, 'unixepoch') AS appointment_datetime,
+                   a.customer_id, c.first_name || ' ' || c.last_name AS customer_name, c.email AS customer_email,
+                   st.first_name || ' ' || st.last_name AS stylist_name, sv.service_name
+            FROM payments p
+            JOIN appointments a ON a.appointment_id = p.appointment_id
+            LEFT JOIN users c ON c.user_id = a.customer_id
+            LEFT JOIN users st ON st.user_id = a.stylist_id
+            LEFT JOIN services sv ON sv.service_id = a.service_id
+        """,
+        "date_column": "p.payment_date",
+        "order": "p.payment_date, p.payment_id",
+        "filters": {
+            "method": "p.payment_method",
+            "status": "p.status",
+            "customer_id": "a.customer_id",
+            "stylist_id": "a.stylist_id",
+            "service_id": "a.service_id",
+        },
+    },
+    "appointments": {
+        "select": """
+            SELECT a.appointment_id, strftime('%Y-%m-%d %H:%M', a.appointment_datetime, 'unixepoch') AS appointment_datetime,
+                   a.status,
+                   a.customer_id, c.first_name || ' ' || c.last_name AS customer_name,
+                   a.stylist_id, st.first_name || ' ' || st.last_name AS stylist_name,
+                   a.service_id, sv.service_name, sv.price, sv.duration_minutes, a.notes
+            FROM appointments a
+            LEFT JOIN users c ON c.user_id = a.customer_id
+            LEFT JOIN users st ON st.user_id = a.stylist_id
+            LEFT JOIN services sv ON sv.service_id = a.service_id
+        """,
+        "date_column": "a.appointment_datetime",
+        "order": "a.appointment_datetime, a.appointment_id",
+        "filters": {
+            "status": "a.status",
+            "customer_id": "a.customer_id",
+            "stylist_id": "a.stylist_id",
+            "service_id": "a.service_id",
+        },
+    },
+}
+
+
+# date ranges, always half open: start <= date < end
+
+def month_range(year, month):
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def year_range(year):
+    return f"{year}-01-01", f"{year + 1}-01-01"
+
+
+def build_query(kind, start=None, end=None, filters=None):
+    export = EXPORTS[kind]
+    conditions = []
+    params = []
+
+    if start:
+        conditions.append(f"{export['date_column']} >= ?")
+        params.append(timestamps.to_epoch(start))
+    if end:
+        conditions.append(f"{export['date_column']} < ?")
+        params.append(timestamps.to_epoch(end))
+
+    for name, value in (filters or {}).items():
+        if value in (None, ""):
+            continue
+        if name not in export["filters"]:
+            raise ValueError(f"Unknown filter '{name}' for {kind}")
+        conditions.append(f"{export['filters'][name]} = ?")
+        params.append(value)
+
+    q = export["select"]
+    if conditions:
+        q += " WHERE " + " AND ".join(conditions)
+    return q, params
+
+
+# writers, both take rows one chunk at a time
+
+class CsvWriter:
+    def __init__(self, file, columns):
+        self.writer = csv.writer(file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+
+class JsonLinesWriter:
+    def __init__(self, file, columns):
+        self.file = file
+        self.columns = columns
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(dict(zip(self.columns, row)), default=str))
+            self.file.write("\n")
+
+
+def open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export(db, kind, path, start=None, end=None, filters=None, fmt=None, compress=None,
+           chunk_size=CHUNK_SIZE, progress=None):
+    # writes the export to path and returns a summary dict. the format and
+    # compression default from the file name (.csv / .jsonl, .gz). progress, if
+    # given, is called with (rows written, total rows) after every chunk.
+    started = time.perf_counter()
+    name = path[:-3] if path.endswith(".gz") else path
+    compress = path.endswith(".gz") if compress is None else compress
+    fmt = fmt or ("jsonl" if name.endswith((".jsonl", ".json")) else "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+    q, params = build_query(kind, start, end, filters)
+    export_order = EXPORTS[kind]["order"]
+
+    conn = db.connections.reader()
+    # one read transaction for the count and the rows, so they agree
+    conn.execute("BEGIN")
+    try:
+        total = None
+        if progress:
+            total = conn.execute(f"SELECT COUNT(*) FROM ({q})", params).fetchone()[0]
+            progress((0, total))
+
+        cursor = conn.execute(q + " ORDER BY " + export_order, params)
+        columns = [c[0] for c in cursor.description]
+
+        # written to a .part file first, so a failed or cancelled export never
+        # leaves a half-written file behind under the real name
+        part = path + ".part"
+        written = 0
+        try:
+            with open_output(part, compress) as file:
+                writer = (JsonLinesWriter if fmt == "jsonl" else CsvWriter)(file, columns)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write(rows)
+                    written += len(rows)
+                    if progress:
+                        progress((written, total))
+            os.replace(part, path)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+    finally:
+        conn.rollback()
+
+    seconds = time.perf_counter() - started
+    print(f"DEBUG: exported {written} {kind} to {path} in {seconds:.2f}s")
+    return {"kind": kind, "path": path, "rows": written, "seconds": seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export payments or appointments")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("path", help="output file, .csv or .jsonl, add .gz to compress")
+    parser.add_argument("--db", default="salon_database.db")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", help="YYYY-MM")
+    parser.add_argument("--start", help="first date included, YYYY-MM-DD")
+    parser.add_argument("--end", help="first date not included, YYYY-MM-DD")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    for name in sorted({f for e in EXPORTS.values() for f in e["filters"]}):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    args = parser.parse_args()
+
+    start, end = args.start, args.end
+    if args.month:
+        year, month = args.month.split("-")
+        start, end = month_range(int(year), int(month))
+    elif args.year:
+        start, end = year_range(args.year)
+
+    filters = {name: getattr(args, name) for name in EXPORTS[args.kind]["filters"]}
+
+    from database import Database
+
+    db = Database(args.db)
+    try:
+        report = export(db, args.kind, args.path, start, end, filters, args.format,
+                        chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    print(f"{report['rows']} {args.kind} written to {report['path']} in {report['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
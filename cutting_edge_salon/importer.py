@@ -0,0 +1,356 @@
+import argparse
+import csv
+import datetime
+import re
+import sqlite3
+import sys
+import time
+
+
+# bulk CSV import for customers, staff, services and appointments.
+# the file is streamed a row at a time and every row is checked with the same
+# rules as the forms. everything needed to check a row (taken usernames and
+# emails, names to look up) is loaded once up front, so nothing is queried per
+# row. good rows are written with executemany, one transaction per chunk, and
+# a bad row is reported with its line number instead of stopping the import.
+# committing each chunk lets the desks' own writes (a booking, a payment) in
+# between chunks instead of queueing behind the whole file, so an import that
+# fails part way keeps the chunks already committed.
+#
+#   python importer.py customers clients.csv
+#   python importer.py appointments diary.csv --chunk-size 2000
+
+# rows per transaction. 1000 customers, search index included, take well under
+# the UI monitor's 100 ms stall threshold, so a desk saving a booking during
+# an import waits at most about that long for the writer
+CHUNK_SIZE = 1000
+DEFAULT_PASSWORD = "password123"
+
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+PHONE_PATTERN = re.compile(r"^\+?\d{7,15}$")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# how statuses are written in the booking form
+STATUSES = {"booked": "Booked", "completed": "Completed", "cancelled": "Cancelled", "no-show": "No-Show"}
+
+
+class UsernameAllocator:
+    # hands out base, base1, base2... like the forms do, but against an
+    # in-memory set of taken names instead of a SELECT per candidate
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self.next_suffix = {}
+
+    def allocate(self, base):
+        if base not in self.taken:
+            self.taken.add(base)
+            return base
+
+        counter = self.next_suffix.get(base, 1)
+        while f"{base}{counter}" in self.taken:
+            counter += 1
+        self.next_suffix[base] = counter + 1
+
+        username = f"{base}{counter}"
+        self.taken.add(username)
+        return username
+
+
+def check_name(value, label):
+    if not value.isalpha():
+        raise ValueError(f"{label} must contain letters only.")
+
+
+# one class per kind of row. prepare() turns a CSV row (a dict keyed by
+# lower-case header) into insert parameters, or raises ValueError saying why not.
+
+class CustomerImport:
+    required = ("first_name", "last_name", "email")
+    insert_sql = """
+        INSERT INTO users (username, password, email, first_name, last_name, role)
+        VALUES (?, ?, ?, ?, ?, 'customer')
+    """
+
+    def __init__(self, db):
+        self.usernames = UsernameAllocator(r[0] for r in db.read("SELECT username FROM users"))
+        self.emails = {r[0].lower() for r in db.read("SELECT email FROM users")}
+        self.password = db.hash_password(DEFAULT_PASSWORD)
+
+    def prepare(self, row):
+        fn, ln, em = row["first_name"], row["last_name"], row["email"]
+
+        # same rules as CustomerView.validate_inputs
+        if not fn or not ln or not em:
+            raise ValueError("All fields are required.")
+        check_name(fn, "First name")
+        check_name(ln, "Last name")
+        if not EMAIL_PATTERN.match(em):
+            raise ValueError("Please enter a valid email address.")
+        if em.lower() in self.emails:
+            raise ValueError(f"Email {em} is already registered.")
+
+        self.emails.add(em.lower())
+        username = self.usernames.allocate(em.split('@')[0] + "_user")
+        return (username, self.password, em, fn, ln)
+
+
+class StaffImport:
+    # email, password and role are optional, they default like StaffView.add_staff
+    required = ("first_name", "last_name", "phone_number")
+    insert_sql = """
+        INSERT INTO users (username, password, email, first_name, last_name, phone_number, role, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'active')
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.usernames = UsernameAllocator(r[0] for r in db.read("SELECT username FROM users"))
+        self.emails = {r[0].lower() for r in db.read("SELECT email FROM users")}
+        self.hashes = {}
+
+    def hash_password(self, password):
+        # unsalted, so the same password always hashes the same
+        if password not in self.hashes:
+            self.hashes[password] = self.db.hash_password(password)
+        return self.hashes[password]
+
+    def prepare(self, row):
+        fn, ln, ph = row["first_name"], row["last_name"], row["phone_number"]
+        em = row.get("email", "")
+        password = row.get("password", "") or DEFAULT_PASSWORD
+        role = (row.get("role", "") or "staff").lower()
+
+        # same rules as StaffView.validate_inputs
+        if not fn or not ln or not ph:
+            raise ValueError("All fields are required.")
+        check_name(fn, "First name")
+        check_name(ln, "Last name")
+        if not PHONE_PATTERN.match(ph):
+            raise ValueError("Phone must be 7–15 digits.")
+        if role not in ("staff", "stylist"):
+            raise ValueError("Role must be staff or stylist.")
+        if len(password) < 6:
+            raise ValueError("Password must be at least 6 characters long.")
+        if em and not EMAIL_PATTERN.match(em):
+            raise ValueError("Please enter a valid email address.")
+
+        username = self.usernames.allocate((fn + ln).lower())
+        em = em or f"{username}@salon.com"
+        if em.lower() in self.emails:
+            raise ValueError(f"Email {em} is already registered.")
+
+        self.emails.add(em.lower())
+        return (username, self.hash_password(password), em, fn, ln, ph, role)
+
+
+class ServiceImport:
+    required = ("service_name", "price")
+    insert_sql = """
+        INSERT INTO services (service_name, description, price, duration_minutes)
+        VALUES (?, ?, ?, ?)
+    """
+
+    def __init__(self, db):
+        self.names = {r[0].lower() for r in db.read("SELECT service_name FROM services")}
+
+    def prepare(self, row):
+        name = row["service_name"]
+        if not name:
+            raise ValueError("Service name is required.")
+        if name.lower() in self.names:
+            raise ValueError(f"Service {name} already exists.")
+
+        try:
+            price = float(row["price"])
+        except ValueError:
+            raise ValueError("Price must be a number.")
+        if price < 0:
+            raise ValueError("Price cannot be negative.")
+
+        try:
+            duration = int(row.get("duration_minutes", "") or 30)
+        except ValueError:
+            raise ValueError("Duration must be a whole number of minutes.")
+        if duration <= 0:
+            raise ValueError("Duration must be more than 0 minutes.")
+
+        self.names.add(name.lower())
+        return (name, row.get("description", "") or None, price, duration)
+
+
+class AppointmentImport:
+    # customer and stylist can be a username, an email or "First Last",
+    # service is the service name. overlapping bookings are refused by the
+    # database trigger and reported against their line.
+    required = ("customer", "stylist", "service", "appointment_datetime")
+    insert_sql = """
+        INSERT INTO appointments (customer_id, stylist_id, service_id, appointment_datetime, notes, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, db):
+        self.customers = self.people(db, "role = 'customer'")
+        self.stylists = self.people(db, "role IN ('staff', 'stylist')")
+        self.services = {r[1].lower(): r[0] for r in db.read("SELECT service_id, service_name FROM services")}
+
+        today = datetime.datetime.now()
+        self.min_date = today - datetime.timedelta(days=1)
+        self.max_date = today + datetime.timedelta(days=365)
+
+    @staticmethod
+    def people(db, condition):
+        # lower-case username / email / full name -> user_id, None where a name is shared
+        lookup = {}
+        for user_id, username, email, first, last in db.read(
+                f"SELECT user_id, username, email, first_name, last_name FROM users WHERE {condition}"):
+            lookup[username.lower()] = user_id
+            lookup[email.lower()] = user_id
+            full_name = f"{first or ''} {last or ''}".strip().lower()
+            if full_name:
+                lookup[full_name] = None if full_name in lookup else user_id
+        return lookup
+
+    @staticmethod
+    def resolve(lookup, value, label):
+        key = " ".join(value.lower().split())
+        if key not in lookup:
+            raise ValueError(f"Unknown {label} '{value}'.")
+        if lookup[key] is None:
+            raise ValueError(f"More than one {label} is called '{value}', use their username.")
+        return lookup[key]
+
+    def prepare(self, row):
+        dt = row["appointment_datetime"]
+        status = STATUSES.get((row.get("status", "") or "booked").lower())
+        if status is None:
+            raise ValueError("Status must be Booked, Completed, Cancelled or No-Show.")
+
+        # same rules as BookingView.validate_inputs, except that past
+        # appointments can be imported as history once they're no longer Booked
+        if not dt:
+            raise ValueError("Date and time cannot be empty.")
+        try:
+            appointment_dt = datetime.datetime.strptime(dt, DATETIME_FORMAT)
+        except ValueError:
+            raise ValueError("Please use YYYY-MM-DD HH:MM format.")
+        if status == "Booked" and appointment_dt < self.min_date:
+            raise ValueError("You cannot book an appointment in the past.")
+        if appointment_dt > self.max_date:
+            raise ValueError("Appointments can only be booked up to 1 year ahead.")
+
+        customer_id = self.resolve(self.customers, row["customer"], "customer")
+        stylist_id = self.resolve(self.stylists, row["stylist"], "stylist")
+        service_id = self.services.get(row["service"].lower())
+        if service_id is None:
+            raise ValueError(f"Unknown service '{row['service']}'.")
+
+        return (customer_id, stylist_id, service_id, appointment_dt,
+                row.get("notes", ""), status)
+
+
+IMPORTERS = {
+    "customers": CustomerImport,
+    "staff": StaffImport,
+    "services": ServiceImport,
+    "appointments": AppointmentImport,
+}
+
+
+# writing
+
+def insert_chunk(db, importer, chunk, errors):
+    # the whole chunk in one executemany, and only if the database refuses a
+    # row (a double booking, a duplicate that slipped past the checks) is the
+    # chunk redone a row at a time so just that row is skipped. a refused
+    # chunk is rolled back first, so nothing is left half written
+    try:
+        with db.transaction() as work:
+            work.executemany(importer.insert_sql, [params for _, params in chunk])
+        return len(chunk)
+    except sqlite3.IntegrityError:
+        pass
+
+    imported = 0
+    with db.transaction() as work:
+        for line, params in chunk:
+            try:
+                work.execute(importer.insert_sql, params)
+                imported += 1
+            except sqlite3.IntegrityError as e:
+                errors.append((line, str(e)))
+    return imported
+
+
+def import_rows(db, kind, rows, chunk_size=CHUNK_SIZE):
+    # rows is an iterable of (line number, dict). returns a report dict with
+    # the number imported and a list of (line, message) for the rows that weren't
+    start = time.perf_counter()
+    importer = IMPORTERS[kind](db)
+
+    imported = 0
+    errors = []
+    chunk = []
+    # rows are checked outside the transaction, the writer is only held while
+    # a chunk goes in
+    for line, row in rows:
+        try:
+            chunk.append((line, importer.prepare(row)))
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+
+        if len(chunk) >= chunk_size:
+            imported += insert_chunk(db, importer, chunk, errors)
+            chunk = []
+
+    if chunk:
+        imported += insert_chunk(db, importer, chunk, errors)
+
+    errors.sort()
+    seconds = time.perf_counter() - start
+    print(f"DEBUG: imported {imported} {kind} in {seconds:.2f}s, {len(errors)} rows rejected")
+    return {"kind": kind, "imported": imported, "errors": errors, "seconds": seconds}
+
+
+def read_csv(file, required):
+    # (line number, row) pairs with trimmed values and lower-case headers
+    reader = csv.DictReader(file)
+    headers = [(h or "").strip().lower() for h in reader.fieldnames or []]
+    missing = [column for column in required if column not in headers]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    reader.fieldnames = headers
+
+    for row in reader:
+        yield reader.line_num, {k: (v or "").strip() for k, v in row.items() if k}
+
+
+def import_csv(db, kind, path, chunk_size=CHUNK_SIZE):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        return import_rows(db, kind, read_csv(file, IMPORTERS[kind].required), chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import salon data from a CSV file")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--db", default="salon_database.db")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    from database import Database
+
+    db = Database(args.db)
+    try:
+        report = import_csv(db, args.kind, args.path, args.chunk_size)
+    finally:
+        db.close()
+
+    for line, message in report["errors"]:
+        print(f"line {line}: {message}")
+    print(f"{report['imported']} {args.kind} imported in {report['seconds']:.2f}s, {len(report['errors'])} rejected")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
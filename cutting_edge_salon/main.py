@@ -1,18 +1,33 @@
+import importlib
+import sys
+
 import customtkinter as ctk
 from database import Database
-
-from views.welcome_view import WelcomeView
-from views.login_view import LoginView
-from views.dashboard_view import DashboardView
-from views.staff_view import StaffView
-from views.customer_view import CustomerView
-from views.booking_view import BookingView
-from views.payment_view import PaymentView
+from query_executor import QueryExecutor
+from ui_monitor import UIMonitor
+
+# page name -> module it lives in. views are only imported and built the
+# first time they are shown, so startup doesn't pay for screens nobody opens
+VIEW_MODULES = {
+    "WelcomeView": "views.welcome_view",
+    "LoginView": "views.login_view",
+    "DashboardView": "views.dashboard_view",
+    "StaffView": "views.staff_view",
+    "CustomerView": "views.customer_view",
+    "BookingView": "views.booking_view",
+    "PaymentView": "views.payment_view",
+}
 
 class MainApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, db_path="salon_database.db"):
         super().__init__()
 
+        # event loop heartbeat and callback timings, installed before any view
+        # is built so their commands are timed too
+        self.monitor = UIMonitor(self)
+        self.diagnostics = None
+        self.bind("<F12>", lambda event: self.show_diagnostics())
+
         self.current_user = None   # <-- store logged-in user
 
         self.title("Cutting Edge Hair Salon - Management System")
@@ -20,29 +35,86 @@ class MainApp(ctk.CTk):
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
 
-        self.db = Database()
+        # a database file, or the URL of a salon_service.py shared by several desks
+        if db_path.startswith("http://"):
+            from remote_database import RemoteDatabase
+            self.db = RemoteDatabase(db_path)
+        else:
+            self.db = Database(db_path)
+        # per-statement timings and the slow query log, printed when the app exits
+        self.db.query_stats.dump_at_exit()
+
+        # background workers for read queries so the window never freezes
+        self.executor = QueryExecutor(self, self.db)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.container = ctk.CTkFrame(self)
         self.container.pack(side="top", fill="both", expand=True)
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
+        # views are registered as factories and built on first show_view
         self.frames = {}
-        for ViewClass in (WelcomeView, LoginView, DashboardView, StaffView, CustomerView, BookingView, PaymentView):
-            page_name = ViewClass.__name__
-            frame = ViewClass(parent=self.container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        self.view_factories = {}
+        for page_name, module_name in VIEW_MODULES.items():
+            self.register_view(page_name, module_name)
 
         self.show_view("WelcomeView")
 
+    def register_view(self, page_name, module_name):
+        def factory():
+            module = importlib.import_module(module_name)
+            return getattr(module, page_name)(parent=self.container, controller=self)
+
+        self.view_factories[page_name] = factory
+
+    def get_view(self, page_name):
+        frame = self.frames.get(page_name)
+        if frame is None:
+            frame = self.view_factories[page_name]()
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[page_name] = frame
+        return frame
+
     def show_view(self, page_name):
-        frame = self.frames[page_name]
+        frame = self.get_view(page_name)
         if hasattr(frame, "refresh_data"):
-            frame.refresh_data()
+            if self.tables_changed(frame):
+                frame.refresh_data()
+            elif hasattr(frame, "check_access"):
+                # nothing to reload, but the access check still applies
+                frame.check_access()
         frame.tkraise()
 
+    def tables_changed(self, frame):
+        # views list the tables they show in watch_tables, if none of those
+        # changed since the view last refreshed there is nothing to reload
+        tables = getattr(frame, "watch_tables", None)
+        if not tables:
+            return True
+
+        versions = self.db.table_versions(tables)
+        if getattr(frame, "seen_versions", None) == versions:
+            return False
+
+        frame.seen_versions = versions
+        return True
+
+
+
+    def show_diagnostics(self):
+        from views.diagnostics_view import DiagnosticsPopup
+
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
+            return
+        self.diagnostics = DiagnosticsPopup(self)
 
+    def on_close(self):
+        self.monitor.stop()
+        self.executor.shutdown()
+        self.db.close()
+        self.destroy()
 
     def has_role(self, *roles):
         if not self.current_user:
@@ -55,5 +127,8 @@ class MainApp(ctk.CTk):
 
 
 if __name__ == "__main__":
-    app = MainApp()
+    # python main.py [database file or service URL]
+    app = MainApp(sys.argv[1] if len(sys.argv) > 1 else "salon_database.db")
     app.mainloop()
+    app.executor.shutdown()
+    app.db.close()
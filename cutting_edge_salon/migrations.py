@@ -0,0 +1,625 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database.sql")
+
+
+# versioned schema changes, tracked with PRAGMA user_version.
+# each migration runs once, inside its own transaction, and bumps user_version
+# when it commits. a database that is already current costs a single PRAGMA
+# read at startup instead of re-running the whole schema script.
+
+
+def split_statements(script):
+    statements = []
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                statements.append(buf.strip())
+            buf = ""
+    return statements
+
+
+def column_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+# migration steps
+
+def baseline_schema(conn):
+    # the original schema file, every statement is IF NOT EXISTS / OR IGNORE
+    # so it is safe on databases created before versioning existed
+    with open(SCHEMA_FILE, "r") as file:
+        for stmt in split_statements(file.read()):
+            conn.execute(stmt)
+
+    # add dummy values for email and names to satisfy the database constraints
+    admin_pw = hashlib.sha256("admin123".encode()).hexdigest()
+    conn.execute("""
+        INSERT OR REPLACE INTO users (user_id, username, password, email, role, status, first_name, last_name)
+        VALUES (1, 'admin', ?, 'admin@salon.com', 'admin', 'active', 'Salon', 'Manager')
+    """, (admin_pw,))
+
+
+def payment_card_columns(conn):
+    # older databases had these added by hand, so only add what is missing
+    existing = column_names(conn, "payments")
+    for col in ("card_last4", "card_expiry", "card_holder"):
+        if col not in existing:
+            conn.execute(f"ALTER TABLE payments ADD COLUMN {col} TEXT")
+
+
+FETCH_INDEXES = """
+-- appointment list, ordered and paged on (appointment_datetime, appointment_id)
+CREATE INDEX IF NOT EXISTS idx_appointments_datetime
+ON appointments(appointment_datetime);
+
+-- join / lookup columns
+CREATE INDEX IF NOT EXISTS idx_appointments_customer
+ON appointments(customer_id, appointment_datetime);
+
+CREATE INDEX IF NOT EXISTS idx_appointments_stylist
+ON appointments(stylist_id, appointment_datetime);
+
+CREATE INDEX IF NOT EXISTS idx_appointments_service
+ON appointments(service_id);
+
+CREATE INDEX IF NOT EXISTS idx_payments_appointment
+ON payments(appointment_id);
+
+-- payment list is newest first, paged on (IFNULL(payment_date, ''), payment_id)
+CREATE INDEX IF NOT EXISTS idx_payments_date
+ON payments(payment_date);
+
+CREATE INDEX IF NOT EXISTS idx_payments_date_order
+ON payments(IFNULL(payment_date, ''), payment_id);
+
+-- customer/staff lists filter on role, the dropdowns also sort by name
+CREATE INDEX IF NOT EXISTS idx_users_role
+ON users(role);
+
+CREATE INDEX IF NOT EXISTS idx_users_role_name
+ON users(role, first_name, last_name);
+"""
+
+
+SEARCH_INDEX = """
+-- people: external content table over users, so names/email/phone are not stored twice
+CREATE VIRTUAL TABLE IF NOT EXISTS people_fts USING fts5(
+    first_name, last_name, email, phone_number,
+    content='users', content_rowid='user_id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+-- names count for more than email/phone when ranking
+INSERT INTO people_fts(people_fts, rank) VALUES('rank', 'bm25(10.0, 10.0, 2.0, 2.0)');
+INSERT INTO people_fts(people_fts) VALUES('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+    INSERT INTO people_fts(rowid, first_name, last_name, email, phone_number)
+    VALUES (new.user_id, new.first_name, new.last_name, new.email, new.phone_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+    INSERT INTO people_fts(people_fts, rowid, first_name, last_name, email, phone_number)
+    VALUES ('delete', old.user_id, old.first_name, old.last_name, old.email, old.phone_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF first_name, last_name, email, phone_number ON users BEGIN
+    INSERT INTO people_fts(people_fts, rowid, first_name, last_name, email, phone_number)
+    VALUES ('delete', old.user_id, old.first_name, old.last_name, old.email, old.phone_number);
+    INSERT INTO people_fts(rowid, first_name, last_name, email, phone_number)
+    VALUES (new.user_id, new.first_name, new.last_name, new.email, new.phone_number);
+END;
+
+-- appointments: the searchable text comes from three joins, so this one keeps its own copy
+CREATE VIRTUAL TABLE IF NOT EXISTS appointments_fts USING fts5(
+    customer, stylist, service, notes,
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+INSERT INTO appointments_fts(appointments_fts, rank) VALUES('rank', 'bm25(10.0, 4.0, 4.0, 1.0)');
+
+INSERT INTO appointments_fts(rowid, customer, stylist, service, notes)
+SELECT a.appointment_id,
+       c.first_name || ' ' || c.last_name,
+       s.first_name || ' ' || s.last_name,
+       sv.service_name,
+       a.notes
+FROM appointments a
+LEFT JOIN users c ON a.customer_id = c.user_id
+LEFT JOIN users s ON a.stylist_id = s.user_id
+LEFT JOIN services sv ON a.service_id = sv.service_id;
+
+CREATE TRIGGER IF NOT EXISTS appointments_fts_insert AFTER INSERT ON appointments BEGIN
+    INSERT INTO appointments_fts(rowid, customer, stylist, service, notes)
+    VALUES (
+        new.appointment_id,
+        (SELECT first_name || ' ' || last_name FROM users WHERE user_id = new.customer_id),
+        (SELECT first_name || ' ' || last_name FROM users WHERE user_id = new.stylist_id),
+        (SELECT service_name FROM services WHERE service_id = new.service_id),
+        new.notes
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_fts_delete AFTER DELETE ON appointments BEGIN
+    DELETE FROM appointments_fts WHERE rowid = old.appointment_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_fts_update AFTER UPDATE OF customer_id, stylist_id, service_id, notes ON appointments BEGIN
+    UPDATE appointments_fts SET
+        customer = (SELECT first_name || ' ' || last_name FROM users WHERE user_id = new.customer_id),
+        stylist = (SELECT first_name || ' ' || last_name FROM users WHERE user_id = new.stylist_id),
+        service = (SELECT service_name FROM services WHERE service_id = new.service_id),
+        notes = new.notes
+    WHERE rowid = new.appointment_id;
+END;
+
+-- renames have to reach every appointment that shows the old name
+CREATE TRIGGER IF NOT EXISTS users_appointments_fts_update AFTER UPDATE OF first_name, last_name ON users BEGIN
+    UPDATE appointments_fts SET customer = new.first_name || ' ' || new.last_name
+    WHERE rowid IN (SELECT appointment_id FROM appointments WHERE customer_id = new.user_id);
+    UPDATE appointments_fts SET stylist = new.first_name || ' ' || new.last_name
+    WHERE rowid IN (SELECT appointment_id FROM appointments WHERE stylist_id = new.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS services_appointments_fts_update AFTER UPDATE OF service_name ON services BEGIN
+    UPDATE appointments_fts SET service = new.service_name
+    WHERE rowid IN (SELECT appointment_id FROM appointments WHERE service_id = new.service_id);
+END;
+"""
+
+
+CHANGE_TRACKING = """
+-- one counter per table, bumped by every write from any connection, so a view
+-- can tell whether the tables it shows changed since it last rendered them
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (table_name) VALUES
+    ('users'), ('services'), ('appointments'), ('payments');
+
+CREATE TRIGGER IF NOT EXISTS users_version_insert AFTER INSERT ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_version_update AFTER UPDATE ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_version_delete AFTER DELETE ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS services_version_insert AFTER INSERT ON services BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'services';
+END;
+
+CREATE TRIGGER IF NOT EXISTS services_version_update AFTER UPDATE ON services BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'services';
+END;
+
+CREATE TRIGGER IF NOT EXISTS services_version_delete AFTER DELETE ON services BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'services';
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_version_insert AFTER INSERT ON appointments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_version_update AFTER UPDATE ON appointments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_version_delete AFTER DELETE ON appointments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_version_insert AFTER INSERT ON payments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'payments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_version_update AFTER UPDATE ON payments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'payments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_version_delete AFTER DELETE ON payments BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'payments';
+END;
+"""
+
+
+# how the overlap check moves a time by some minutes and compares it, for
+# text times and for epoch seconds (see timestamps.py)
+TEXT_TIME_SQL = {
+    "minus": "strftime('%Y-%m-%d %H:%M', {time},\n                '-' || {minutes} || ' minutes')",
+    "plus": "strftime('%Y-%m-%d %H:%M', {time},\n                '+' || {minutes} || ' minutes')",
+    "end_after": "julianday({time}, '+' || {minutes} || ' minutes')\n                > julianday({other})",
+}
+
+EPOCH_TIME_SQL = {
+    "minus": "{time} - 60 * {minutes}",
+    "plus": "{time} + 60 * {minutes}",
+    "end_after": "{time} + 60 * {minutes} > {other}",
+}
+
+
+# an update only needs the check when it gives a live booking a new slot or
+# brings a cancelled / no-show one back. marking a booking Completed mustn't
+# fail because it overlaps a pair that was already in the data.
+SLOT_CHANGED = """
+  AND (new.stylist_id IS NOT old.stylist_id
+       OR new.service_id IS NOT old.service_id
+       OR new.appointment_datetime IS NOT old.appointment_datetime
+       OR lower(old.status) IN ('cancelled', 'no-show'))"""
+
+
+def no_double_booking_trigger(event, exclude_self, time_sql=TEXT_TIME_SQL, when=""):
+    # a stylist can't have two live appointments overlapping. the range on
+    # appointment_datetime (widened by the longest service) keeps this an index
+    # search on (stylist_id, appointment_datetime) instead of a scan.
+    exclude = "\n          AND a.appointment_id != new.appointment_id" if exclude_self else ""
+    lower = time_sql["minus"].format(
+        time="new.appointment_datetime",
+        minutes="(SELECT IFNULL(MAX(duration_minutes), 0) FROM services)")
+    upper = time_sql["plus"].format(
+        time="new.appointment_datetime",
+        minutes="(SELECT duration_minutes FROM services WHERE service_id = new.service_id)")
+    ends_after = time_sql["end_after"].format(
+        time="a.appointment_datetime", minutes="s.duration_minutes", other="new.appointment_datetime")
+    return f"""
+CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_{event.split()[0].lower()} BEFORE {event} ON appointments
+WHEN lower(new.status) NOT IN ('cancelled', 'no-show'){when}
+BEGIN
+    SELECT RAISE(ABORT, 'Stylist is already booked at that time')
+    WHERE EXISTS (
+        SELECT 1
+        FROM appointments a
+        JOIN services s ON s.service_id = a.service_id
+        WHERE a.stylist_id = new.stylist_id{exclude}
+          AND lower(a.status) NOT IN ('cancelled', 'no-show')
+          AND a.appointment_datetime >= {lower}
+          AND a.appointment_datetime < {upper}
+          AND {ends_after}
+    );
+END;
+"""
+
+
+def no_double_booking(time_sql=TEXT_TIME_SQL):
+    return (
+        no_double_booking_trigger("INSERT", exclude_self=False, time_sql=time_sql)
+        + no_double_booking_trigger("UPDATE OF stylist_id, service_id, appointment_datetime, status",
+                                    exclude_self=True, time_sql=time_sql)
+    )
+
+
+NO_DOUBLE_BOOKING = no_double_booking()
+
+
+def overlap_check_on_slot_change(conn):
+    conn.execute("DROP TRIGGER IF EXISTS appointments_no_overlap_update")
+    run_step(conn, no_double_booking_trigger("UPDATE OF stylist_id, service_id, appointment_datetime, status",
+                                             exclude_self=True, time_sql=EPOCH_TIME_SQL, when=SLOT_CHANGED))
+
+
+# revenue summaries kept up to date by triggers, so reports read a few
+# hundred pre-added rows instead of joining every payment. a payment counts
+# under the service and stylist of its appointment. daily_revenue keeps the
+# full breakdown for arbitrary date ranges, the other tables are much smaller
+# rollups for totals by day and for whole months and years. rows are keyed with '' instead
+# of NULL for a missing date or method (a WITHOUT ROWID key can't be NULL).
+REVENUE_SUMMARIES = {
+    "daily_revenue": ("day", "service_id", "stylist_id", "payment_method", "status"),
+    "daily_totals": ("day", "payment_method", "status"),
+    "monthly_revenue": ("month", "payment_method", "status"),
+    "monthly_service_revenue": ("month", "service_id", "status"),
+    "monthly_stylist_revenue": ("month", "stylist_id", "status"),
+}
+
+# how each key column is worked out from p (a payment) and a (its appointment)
+REVENUE_KEY_SQL = {
+    "day": "IFNULL(date(p.payment_date), '')",
+    "month": "IFNULL(strftime('%Y-%m', p.payment_date), '')",
+    "service_id": "a.service_id",
+    "stylist_id": "a.stylist_id",
+    "payment_method": "IFNULL(p.payment_method, '')",
+    "status": "p.status",
+}
+
+
+def revenue_tables(key_sql=REVENUE_KEY_SQL):
+    statements = []
+    for table, keys in REVENUE_SUMMARIES.items():
+        columns = "".join(
+            f"    {key} {'INTEGER' if key.endswith('_id') else 'TEXT'} NOT NULL,\n" for key in keys
+        )
+        statements.append(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+{columns}    payment_count INTEGER NOT NULL,
+    amount_total REAL NOT NULL,
+    PRIMARY KEY ({", ".join(keys)})
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_{table}_empty ON {table}(payment_count) WHERE payment_count = 0;
+
+INSERT INTO {table}
+SELECT {", ".join(key_sql[key] for key in keys)}, COUNT(*), SUM(p.amount)
+FROM payments p
+JOIN appointments a ON a.appointment_id = p.appointment_id
+GROUP BY {", ".join(str(i + 1) for i in range(len(keys)))};
+""")
+    return "".join(statements)
+
+
+def revenue_change(sign, source, key_sql=REVENUE_KEY_SQL):
+    # adds (sign "+") or takes away (sign "-") the payments that source
+    # selects. source is a FROM ... clause exposing p (the payment) and
+    # a (its appointment's service_id and stylist_id).
+    statements = []
+    for table, keys in REVENUE_SUMMARIES.items():
+        columns = ", ".join(keys)
+        values = ", ".join(key_sql[key] for key in keys)
+        statements.append(f"""
+    INSERT INTO {table} ({columns}, payment_count, amount_total)
+    SELECT {values}, {sign}1, {sign}p.amount
+    {source}
+    ON CONFLICT ({columns}) DO UPDATE SET
+        payment_count = payment_count + excluded.payment_count,
+        amount_total = amount_total + excluded.amount_total;""")
+    for table in REVENUE_SUMMARIES:
+        # uses the partial index, so this only ever touches emptied rows
+        statements.append(f"""
+    DELETE FROM {table} WHERE payment_count = 0;""")
+    return "".join(statements)
+
+
+def payment_row(row):
+    return (f"FROM (SELECT {row}.payment_date AS payment_date, {row}.payment_method AS payment_method, "
+            f"{row}.status AS status, {row}.amount AS amount) p\n"
+            f"    JOIN appointments a ON a.appointment_id = {row}.appointment_id\n"
+            f"    WHERE true")
+
+
+def appointment_payments(row):
+    return (f"FROM payments p\n"
+            f"    JOIN (SELECT {row}.service_id AS service_id, {row}.stylist_id AS stylist_id) a\n"
+            f"    WHERE p.appointment_id = {row}.appointment_id")
+
+
+def revenue_triggers(key_sql=REVENUE_KEY_SQL):
+    return f"""
+CREATE TRIGGER IF NOT EXISTS payments_revenue_insert AFTER INSERT ON payments BEGIN{revenue_change("+", payment_row("new"), key_sql)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_revenue_delete AFTER DELETE ON payments BEGIN{revenue_change("-", payment_row("old"), key_sql)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_revenue_update
+AFTER UPDATE OF appointment_id, amount, payment_date, payment_method, status ON payments BEGIN{revenue_change("-", payment_row("old"), key_sql)}{revenue_change("+", payment_row("new"), key_sql)}
+END;
+
+-- a payment moves with its appointment, and stops counting once the appointment is gone
+CREATE TRIGGER IF NOT EXISTS appointments_revenue_update AFTER UPDATE OF service_id, stylist_id ON appointments
+WHEN old.service_id IS NOT new.service_id OR old.stylist_id IS NOT new.stylist_id
+BEGIN{revenue_change("-", appointment_payments("old"), key_sql)}{revenue_change("+", appointment_payments("new"), key_sql)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS appointments_revenue_delete AFTER DELETE ON appointments BEGIN{revenue_change("-", appointment_payments("old"), key_sql)}
+END;
+"""
+
+
+REVENUE_SUMMARY = revenue_tables() + revenue_triggers()
+
+# type-ahead pickers look names up by lower-case prefix, "first last" or
+# "last first", as an index range with a LIMIT (see repositories.UserRepository.lookup)
+NAME_LOOKUP_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_users_role_first_last ON users(role, lower(first_name || ' ' || last_name));
+CREATE INDEX IF NOT EXISTS idx_users_role_last_first ON users(role, lower(last_name || ' ' || first_name));
+CREATE INDEX IF NOT EXISTS idx_services_lower_name ON services(lower(service_name));
+"""
+
+
+# appointment and payment times as integer epoch seconds (see timestamps.py).
+# the column type can't be altered in place, so both tables are rebuilt.
+EPOCH_TABLES = """
+CREATE TABLE appointments_epoch (
+    "appointment_id" INTEGER PRIMARY KEY AUTOINCREMENT,
+    "customer_id" INTEGER NOT NULL,
+    "stylist_id" INTEGER NOT NULL,
+    "service_id" INTEGER NOT NULL,
+    "appointment_datetime" UNIXTIME INTEGER NOT NULL CHECK (typeof("appointment_datetime") = 'integer'),
+    "notes" TEXT,
+    "status" TEXT NOT NULL DEFAULT 'booked', -- 'booked', 'completed', 'cancelled', 'no-show'
+
+    FOREIGN KEY("customer_id") REFERENCES "users"("user_id"),
+    FOREIGN KEY("stylist_id") REFERENCES "users"("user_id"),
+    FOREIGN KEY("service_id") REFERENCES "services"("service_id")
+);
+
+CREATE TABLE payments_epoch (
+    "payment_id" INTEGER PRIMARY KEY AUTOINCREMENT,
+    "appointment_id" INTEGER NOT NULL,
+    "amount" REAL NOT NULL,
+    "payment_date" UNIXTIME INTEGER DEFAULT (CAST(strftime('%s', 'now', 'localtime') AS INTEGER))
+        CHECK ("payment_date" IS NULL OR typeof("payment_date") = 'integer'),
+    "payment_method" TEXT, -- 'card', 'cash', 'gift_voucher'
+    "status" TEXT NOT NULL DEFAULT 'pending',
+    "card_last4" TEXT,
+    "card_expiry" TEXT,
+    "card_holder" TEXT,
+
+    FOREIGN KEY("appointment_id") REFERENCES "appointments"("appointment_id")
+);
+
+-- text that doesn't parse as a date leaves NULL, which the appointments
+-- NOT NULL refuses, so the migration stops rather than lose a booking's time
+INSERT INTO appointments_epoch
+SELECT appointment_id, customer_id, stylist_id, service_id,
+       CASE typeof(appointment_datetime) WHEN 'integer' THEN appointment_datetime
+            ELSE CAST(strftime('%s', appointment_datetime) AS INTEGER) END,
+       notes, status
+FROM appointments;
+
+INSERT INTO payments_epoch
+SELECT payment_id, appointment_id, amount,
+       CASE typeof(payment_date) WHEN 'integer' THEN payment_date
+            ELSE CAST(strftime('%s', payment_date) AS INTEGER) END,
+       payment_method, status, card_last4, card_expiry, card_holder
+FROM payments;
+
+DROP TABLE appointments;
+DROP TABLE payments;
+ALTER TABLE appointments_epoch RENAME TO appointments;
+ALTER TABLE payments_epoch RENAME TO payments;
+
+-- the same indexes as before, all plain integer ranges now
+CREATE INDEX idx_appointments_datetime ON appointments(appointment_datetime);
+CREATE INDEX idx_appointments_customer ON appointments(customer_id, appointment_datetime);
+CREATE INDEX idx_appointments_stylist ON appointments(stylist_id, appointment_datetime);
+CREATE INDEX idx_appointments_service ON appointments(service_id);
+CREATE INDEX idx_payments_appointment ON payments(appointment_id);
+CREATE INDEX idx_payments_date ON payments(payment_date);
+
+-- payment list is newest first, paged on (IFNULL(payment_date, 0), payment_id)
+CREATE INDEX idx_payments_date_order ON payments(IFNULL(payment_date, 0), payment_id);
+"""
+
+# revenue summary keys from epoch seconds, the stored days / months don't change
+EPOCH_REVENUE_KEY_SQL = dict(
+    REVENUE_KEY_SQL,
+    day="IFNULL(date(p.payment_date, 'unixepoch'), '')",
+    month="IFNULL(strftime('%Y-%m', p.payment_date, 'unixepoch'), '')",
+)
+
+
+def trigger_statements(script):
+    # statements can start with their comment lines, so look for it anywhere
+    return [stmt for stmt in split_statements(script) if "CREATE TRIGGER" in stmt.upper()]
+
+
+def epoch_timestamps(conn):
+    # triggers on other tables that name appointments would fail the rename
+    # check while it doesn't exist, they are put back below
+    conn.execute("DROP TRIGGER IF EXISTS users_appointments_fts_update")
+    conn.execute("DROP TRIGGER IF EXISTS services_appointments_fts_update")
+
+    # dropping the old tables took their triggers with them
+    run_step(conn, EPOCH_TABLES)
+    for stmt in trigger_statements(SEARCH_INDEX) + trigger_statements(CHANGE_TRACKING):
+        conn.execute(stmt)
+    run_step(conn, no_double_booking(EPOCH_TIME_SQL))
+    run_step(conn, revenue_triggers(EPOCH_REVENUE_KEY_SQL))
+
+
+# the baseline's payment_date default was CURRENT_TIMESTAMP, which is UTC, and
+# migration 9 converted those values as stored while its own default (like
+# every other time here) is the salon's wall clock. the payments that were
+# there when migration 9 ran are moved onto the wall clock. one taken since then
+# is already local and, with the clock at or ahead of UTC, can't date from
+# before migration 9 ran. the revenue triggers re-key the moved payments.
+LOCAL_PAYMENT_DATES = """
+UPDATE payments
+SET payment_date = CAST(strftime('%s', payment_date, 'unixepoch', 'localtime') AS INTEGER)
+WHERE payment_date <= (SELECT CAST(strftime('%s', applied_at) AS INTEGER)
+                       FROM schema_migrations WHERE version = 9);
+"""
+
+
+# (version, description, step) - a step is a function taking the connection
+# or a string of SQL statements. never edit a released step, add a new one.
+MIGRATIONS = [
+    (1, "baseline schema and admin account", baseline_schema),
+    (2, "payment card columns", payment_card_columns),
+    (3, "indexes for the fetch queries", FETCH_INDEXES),
+    (4, "full-text search index", SEARCH_INDEX),
+    (5, "per-table change counters", CHANGE_TRACKING),
+    (6, "reject overlapping stylist bookings", NO_DOUBLE_BOOKING),
+    (7, "revenue summary tables", REVENUE_SUMMARY),
+    (8, "name lookup indexes", NAME_LOOKUP_INDEXES),
+    (9, "epoch timestamps for appointments and payments", epoch_timestamps),
+    (10, "overlap check only when a booking's slot changes", overlap_check_on_slot_change),
+    (11, "baseline payment dates on the salon's wall clock", LOCAL_PAYMENT_DATES),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_step(conn, step):
+    if callable(step):
+        step(conn)
+    else:
+        for stmt in split_statements(step):
+            conn.execute(stmt)
+
+
+def migrate(conn):
+    # returns the list of (version, description, seconds) that were applied
+    applied = []
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return applied
+
+    # manage the transactions by hand so each step commits atomically with its version bump
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                duration_ms REAL NOT NULL
+            )
+        """)
+
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # another process may have migrated while we waited for the lock
+                if current_version(conn) >= step_version:
+                    conn.execute("ROLLBACK")
+                    continue
+
+                run_step(conn, step)
+                duration = time.perf_counter() - start
+                conn.execute(
+                    "INSERT OR REPLACE INTO schema_migrations (version, description, duration_ms) VALUES (?, ?, ?)",
+                    (step_version, description, duration * 1000)
+                )
+                conn.execute(f"PRAGMA user_version = {step_version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            applied.append((step_version, description, duration))
+    finally:
+        conn.isolation_level = isolation_level
+
+    return applied
+
+
+def migration_cost_ms(conn):
+    # total time the recorded migrations took, i.e. what re-running the schema
+    # on every start would cost
+    try:
+        row = conn.execute("SELECT SUM(duration_ms) FROM schema_migrations").fetchone()
+    except sqlite3.OperationalError:
+        return 0.0
+    return row[0] or 0.0
@@ -0,0 +1,148 @@
+import datetime
+from enum import Enum
+from typing import NamedTuple, Optional
+
+
+# row types handed out by Database and the repositories (see repositories.py).
+# list rows are NamedTuples: still plain tuples underneath, so the Treeviews
+# and the query executor take them as they are, but read by field name and
+# with no per-row __dict__. appointment and payment times are datetimes.
+
+
+# enums
+class UserRole(Enum):
+    customer = "customer"
+    staff = "staff"
+    stylist = "stylist"
+    admin = "admin"
+
+class UserStatus(Enum):
+    active = "active"
+    inactive = "inactive"
+
+class AppointmentStatus(Enum):
+    booked = "booked"
+    completed = "completed"
+    cancelled = "cancelled"
+
+
+# the logged in user
+class User:
+    __slots__ = ("user_id", "username", "password", "email", "birth_date", "joined_date", "last_login",
+                 "role", "status", "first_name", "last_name", "phone_number")
+
+    def __init__(self, user_id, username, password, email, birth_date,
+                 joined_date, last_login, role: UserRole, status: UserStatus,
+                 first_name=None, last_name=None, phone_number=None):
+        self.user_id = user_id
+        self.username = username
+        self.password = password
+        self.email = email
+        self.birth_date = birth_date
+        self.joined_date = joined_date
+        self.last_login = last_login
+        self.role = role
+        self.status = status
+        #  specific fields
+        self.first_name = first_name
+        self.last_name = last_name
+        self.phone_number = phone_number
+
+    def __repr__(self):
+        return f"User({self.user_id}, {self.username!r}, {self.role.value})"
+
+
+# users
+
+class Person(NamedTuple):
+    # a row of the customer / staff tables
+    user_id: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+    email: str
+    phone_number: Optional[str]
+
+    @property
+    def full_name(self):
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
+
+
+class PersonMatch(NamedTuple):
+    # type-ahead result and the customer / stylist lists, with the email to tell namesakes apart
+    user_id: int
+    full_name: str
+    email: Optional[str] = None
+
+
+# services
+
+class Service(NamedTuple):
+    service_id: int
+    service_name: str
+    price: float
+    duration_minutes: int
+    description: Optional[str] = None
+
+
+# appointments
+
+class AppointmentRow(NamedTuple):
+    # a row of the bookings table
+    appointment_id: int
+    appointment_datetime: datetime.datetime
+    notes: Optional[str]
+    status: str
+    customer_name: str
+    stylist_name: str
+    service_name: str
+
+
+class Appointment(NamedTuple):
+    # one appointment with the ids and names of who and what it's for
+    appointment_id: int
+    appointment_datetime: datetime.datetime
+    notes: Optional[str]
+    status: str
+    customer_id: int
+    customer_name: str
+    stylist_id: int
+    stylist_name: str
+    service_id: int
+    service_name: str
+
+
+class PayableAppointment(NamedTuple):
+    # offered by the payment form, amount_paid is the total of its paid payments
+    appointment_id: int
+    customer_name: str
+    appointment_datetime: datetime.datetime
+    service_name: str
+    price: float
+    amount_paid: float
+
+
+# payments
+
+class PaymentRow(NamedTuple):
+    # a row of the payments table
+    payment_id: int
+    appointment_id: int
+    customer_name: str
+    amount: float
+    payment_date: Optional[datetime.datetime]
+    payment_method: Optional[str]
+    status: str
+
+
+class PaymentDetails(NamedTuple):
+    payment_id: int
+    appointment_id: int
+    customer_name: str
+    service_name: str
+    amount: float
+    payment_date: Optional[datetime.datetime]
+    payment_method: Optional[str]
+    status: str
+    card_last4: Optional[str]
+    card_expiry: Optional[str]
+    card_holder: Optional[str]
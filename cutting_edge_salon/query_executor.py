@@ -0,0 +1,157 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+# runs Database calls on a small pool of worker threads so the Tk event loop
+# never blocks on sqlite. Database hands every thread its own read connection,
+# so workers never share a connection or cursor with the UI. results are
+# handed back to the UI thread through a queue that is drained with after().
+# a superseded request that is already running has its query interrupted
+# (Connection.interrupt on the worker's own read connection), so a slow
+# search never holds up the one that replaced it.
+class QueryExecutor:
+    def __init__(self, root, db, workers=2, poll_ms=25):
+        self.root = root
+        self.db = db
+        self.poll_ms = poll_ms
+
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+
+        # finished work waiting to be delivered on the Tk thread
+        self.results = queue.Queue()
+
+        # key -> newest ticket / future, anything older is stale
+        self.latest = {}
+        self.futures = {}
+        self.next_ticket = 0
+
+        # key -> (ticket, read connection) of requests running on a worker
+        self.running = {}
+        self.running_lock = threading.Lock()
+
+        self.closed = False
+        self.poll_id = self.root.after(self.poll_ms, self._poll)
+
+    # worker side
+
+    def _run(self, key, ticket, method, args, on_done, on_error, on_progress):
+        # superseded while it was still queued, don't bother running it
+        if self.latest.get(key) != ticket:
+            return
+
+        # long jobs that take on_progress are given a progress(value) function.
+        # it forwards to the UI thread and raises CancelledError once the request
+        # has been cancelled or superseded, so the job can stop early.
+        kwargs = {}
+        if on_progress is not None:
+            def progress(value):
+                if self.latest.get(key) != ticket:
+                    raise CancelledError()
+                self.results.put((key, ticket, on_progress, value, False))
+            kwargs["progress"] = progress
+
+        # registered before the second staleness check, so a cancel() in
+        # between either sees it running or stops it here
+        with self.running_lock:
+            self.running[key] = (ticket, self.db.connections.reader())
+        try:
+            if self.latest.get(key) != ticket:
+                return
+            if callable(method):
+                result = method(self.db, *args, **kwargs)
+            else:
+                result = getattr(self.db, method)(*args, **kwargs)
+        except CancelledError:
+            return
+        except Exception as e:
+            # an interrupted query surfaces as OperationalError("interrupted")
+            if isinstance(e, sqlite3.OperationalError) and self.latest.get(key) != ticket:
+                print(f"DEBUG: Interrupted superseded query '{key}'")
+                return
+            self.results.put((key, ticket, on_error, e, True))
+            return
+        finally:
+            with self.running_lock:
+                if self.running.get(key, (None,))[0] == ticket:
+                    del self.running[key]
+
+        self.results.put((key, ticket, on_done, result, True))
+
+    # UI side
+
+    def submit(self, key, method, *args, on_done=None, on_error=None, on_progress=None):
+        # method is either a Database method name or a callable taking the
+        # Database as its first argument. a new request with the same
+        # key cancels the previous one, so only the newest result is delivered.
+        if self.closed:
+            return None
+
+        self.cancel(key)
+
+        self.next_ticket += 1
+        ticket = self.next_ticket
+        self.latest[key] = ticket
+        self.futures[key] = self.pool.submit(self._run, key, ticket, method, args, on_done, on_error, on_progress)
+        return ticket
+
+    def cancel(self, key):
+        future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+        self.latest.pop(key, None)
+
+        # stop a query that is already running. interrupt only affects
+        # statements in progress, and the entry is removed (under the same
+        # lock) before the worker moves on, so the next job is never hit.
+        with self.running_lock:
+            running = self.running.get(key)
+            if running is not None:
+                running[1].interrupt()
+
+    def is_pending(self, key):
+        return key in self.latest
+
+    def is_idle(self):
+        return not self.latest
+
+    def _poll(self):
+        while True:
+            try:
+                key, ticket, callback, value, final = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            # stale result from a cancelled or superseded request
+            if self.latest.get(key) != ticket:
+                continue
+
+            # progress updates leave the request pending
+            if final:
+                del self.latest[key]
+                self.futures.pop(key, None)
+
+            if callback is not None:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"DEBUG: Query callback for '{key}' failed: {e}")
+
+        if not self.closed:
+            self.poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        for key in list(self.futures):
+            self.cancel(key)
+
+        try:
+            self.root.after_cancel(self.poll_id)
+        except Exception:
+            pass
+
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,313 @@
+import atexit
+import bisect
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+
+# timings for every statement run on a ConnectionManager connection: the
+# Database methods and repositories, migrations, the importer and anything
+# using db.conn directly alike, since the connections themselves are
+# instrumented. per distinct statement it keeps a call count, a latency
+# histogram of execute() (which runs the plan up to the first row, so nearly
+# all of a sort or aggregate), the time and rows of the fetches that follow,
+# and where it was first called from. statements slower than slow_ms go to a
+# bounded slow log along with their EXPLAIN QUERY PLAN.
+#
+# the cost is a few microseconds per statement (timers and a locked counter
+# update), so it stays on. rows read by iterating a cursor (for row in
+# cursor) aren't counted, only those from fetch*().
+
+# histogram bucket upper bounds in ms, anything slower lands in a last bucket
+BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+SLOW_MS = 50
+SLOW_LOG_SIZE = 100
+
+# distinct statements tracked, past this everything else is counted as "(other)"
+MAX_STATEMENTS = 500
+
+# frames between a caller and sqlite, skipped when working out who ran a statement
+PLUMBING_FILES = ("query_stats.py", "connection_manager.py", "remote_database.py", "contextlib.py")
+PLUMBING_FUNCTIONS = {"read", "write", "rows", "row", "fetch_page"}
+
+# looked up once, they run on every statement
+perf_counter = time.perf_counter
+cursor_execute = sqlite3.Cursor.execute
+cursor_fetchone = sqlite3.Cursor.fetchone
+cursor_fetchall = sqlite3.Cursor.fetchall
+
+EXPLAINABLE = re.compile(r"^\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def one_line(sql, width=None):
+    text = " ".join(sql.split())
+    if width and len(text) > width:
+        text = text[:width - 3] + "..."
+    return text
+
+
+def caller():
+    # "file.py:function" of the first frame outside the database plumbing
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if not code.co_filename.endswith(PLUMBING_FILES) and code.co_name not in PLUMBING_FUNCTIONS:
+            return f"{code.co_filename.replace(chr(92), '/').rsplit('/', 1)[-1]}:{code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def explain(conn, sql, parameters):
+    # the plan as indented lines, or None for statements EXPLAIN can't take.
+    # runs on a plain cursor so it isn't counted itself.
+    if parameters is None or not EXPLAINABLE.match(sql):
+        return None
+    try:
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class StatementStats:
+    __slots__ = ("sql", "origin", "calls", "errors", "total", "max", "buckets", "rows", "fetch_total")
+
+    def __init__(self, sql, origin):
+        self.sql = sql
+        self.origin = origin
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0        # seconds spent in execute
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.rows = 0           # fetched, or changed for INSERT / UPDATE / DELETE
+        self.fetch_total = 0.0  # seconds spent in fetch*()
+
+    def percentile(self, fraction):
+        # upper bound of the bucket the given fraction of calls falls in
+        wanted = self.calls * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return bound
+        return self.max * 1000
+
+
+class QueryStats:
+    def __init__(self, slow_ms=SLOW_MS, slow_log_size=SLOW_LOG_SIZE):
+        self.slow_ms = slow_ms
+        self.slow_seconds = slow_ms / 1000
+        self.statements = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.plans = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.exit_registered = False
+
+    # recording, called by InstrumentedCursor
+
+    def record(self, sql, seconds, rows, failed):
+        entry = self.statements.get(sql)
+        if entry is None:
+            origin = caller()
+            with self.lock:
+                if len(self.statements) >= MAX_STATEMENTS:
+                    sql = "(other)"
+                entry = self.statements.setdefault(sql, StatementStats(sql, origin))
+        ms = seconds * 1000
+        with self.lock:
+            entry.calls += 1
+            entry.errors += failed
+            entry.total += seconds
+            entry.rows += rows
+            if seconds > entry.max:
+                entry.max = seconds
+            entry.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        return entry
+
+    def record_slow(self, conn, sql, parameters, seconds):
+        plan = self.plans.get(sql)
+        if plan is None:
+            plan = self.plans[sql] = explain(conn, sql, parameters)
+        self.slow_log.append({
+            "at": time.time(),
+            "ms": seconds * 1000,
+            "sql": sql,
+            "parameters": None if parameters is None else repr(parameters)[:200],
+            "origin": caller(),
+            "thread": threading.current_thread().name,
+            "plan": plan,
+        })
+
+    # reading
+
+    def snapshot(self):
+        # one dict per statement, most total time first
+        with self.lock:
+            entries = list(self.statements.values())
+            result = [{
+                "sql": e.sql,
+                "origin": e.origin,
+                "calls": e.calls,
+                "errors": e.errors,
+                "rows": e.rows,
+                "total_ms": e.total * 1000,
+                "fetch_ms": e.fetch_total * 1000,
+                "mean_ms": e.total * 1000 / e.calls if e.calls else 0.0,
+                "p50_ms": e.percentile(0.5),
+                "p95_ms": e.percentile(0.95),
+                "p99_ms": e.percentile(0.99),
+                "max_ms": e.max * 1000,
+                "histogram": dict(zip(BUCKETS_MS + (float("inf"),), e.buckets)),
+            } for e in entries]
+        result.sort(key=lambda s: s["total_ms"] + s["fetch_ms"], reverse=True)
+        return result
+
+    def summary(self, top=20):
+        stats = self.snapshot()
+        calls = sum(s["calls"] for s in stats)
+        total_ms = sum(s["total_ms"] + s["fetch_ms"] for s in stats)
+        lines = [f"DEBUG: Query stats: {calls} statements ({len(stats)} distinct), {total_ms:.1f} ms in sqlite "
+                 f"over {time.time() - self.started:.0f} s"]
+        if stats:
+            lines.append(f"{'calls':>7} {'rows':>8} {'exec ms':>9} {'fetch ms':>9} {'p50':>6} {'p95':>6} "
+                         f"{'max ms':>8}  origin / statement")
+        for s in stats[:top]:
+            lines.append(f"{s['calls']:>7} {s['rows']:>8} {s['total_ms']:>9.1f} {s['fetch_ms']:>9.1f} "
+                         f"{s['p50_ms']:>6g} {s['p95_ms']:>6g} {s['max_ms']:>8.1f}  {s['origin']}  {one_line(s['sql'], 90)}")
+        if len(stats) > top:
+            lines.append(f"... {len(stats) - top} more")
+
+        slow = list(self.slow_log)
+        if slow:
+            lines.append(f"DEBUG: {len(slow)} slow queries (>= {self.slow_ms} ms), latest last:")
+        for entry in slow:
+            lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(entry['at']))} {entry['ms']:.1f} ms "
+                         f"{entry['origin']} [{entry['thread']}] {one_line(entry['sql'], 120)}")
+            if entry["parameters"] is not None:
+                lines.append(f"      parameters: {entry['parameters']}")
+            for step in entry["plan"] or ():
+                lines.append(f"      {step}")
+        return "\n".join(lines)
+
+    def dump(self, top=20):
+        print(self.summary(top))
+
+    def dump_at_exit(self, top=20):
+        if not self.exit_registered:
+            self.exit_registered = True
+            atexit.register(self.dump, top)
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.slow_log.clear()
+            self.started = time.time()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    stats_entry = None   # StatementStats of the last execute
+    elapsed = 0.0        # execute + fetch time of the last execute, for the slow log
+    logged = True        # already in the slow log (or nothing to log)
+    last = None          # (sql, parameters) of the last execute
+
+    def track(self, sql, parameters, seconds, rows, failed):
+        stats = self.connection.stats
+        self.stats_entry = stats.record(sql, seconds, rows, failed)
+        self.elapsed = seconds
+        self.last = (sql, parameters)
+        self.logged = seconds >= stats.slow_seconds
+        if self.logged:
+            stats.record_slow(self.connection, sql, parameters, seconds)
+
+    def execute(self, sql, parameters=()):
+        start = perf_counter()
+        failed = True
+        try:
+            cursor_execute(self, sql, parameters)
+            failed = False
+            return self
+        finally:
+            self.track(sql, parameters, perf_counter() - start, max(self.rowcount, 0), failed)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = perf_counter()
+        failed = True
+        try:
+            sqlite3.Cursor.executemany(self, sql, seq_of_parameters)
+            failed = False
+            return self
+        finally:
+            self.track(sql, None, perf_counter() - start, max(self.rowcount, 0), failed)
+
+    def executescript(self, sql_script):
+        start = perf_counter()
+        failed = True
+        try:
+            sqlite3.Cursor.executescript(self, sql_script)
+            failed = False
+            return self
+        finally:
+            self.track(sql_script, None, perf_counter() - start, 0, failed)
+
+    # fetches add their time and rows to the statement that produced them
+
+    def fetched(self, seconds, rows):
+        entry = self.stats_entry
+        if entry is None:
+            return
+        stats = self.connection.stats
+        with stats.lock:
+            entry.fetch_total += seconds
+            entry.rows += rows
+        self.elapsed += seconds
+        # fast to execute but slow to read out still counts as slow, logged once
+        if not self.logged and self.elapsed >= stats.slow_seconds:
+            self.logged = True
+            stats.record_slow(self.connection, *self.last, self.elapsed)
+
+    def fetchone(self):
+        start = perf_counter()
+        row = cursor_fetchone(self)
+        self.fetched(perf_counter() - start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = sqlite3.Cursor.fetchmany(self, self.arraysize if size is None else size)
+        self.fetched(perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = cursor_fetchall(self)
+        self.fetched(perf_counter() - start, len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # set by ConnectionManager.connect right after opening
+    stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    # the Connection shortcuts don't go through cursor(), so route them here
+    def execute(self, sql, parameters=()):
+        return InstrumentedCursor(self).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return InstrumentedCursor(self).executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return InstrumentedCursor(self).executescript(sql_script)
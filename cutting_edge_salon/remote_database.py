@@ -0,0 +1,201 @@
+import functools
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from aggregate_cache import AggregateCache
+from database import Database
+from query_stats import QueryStats
+from salon_service import IDLE_TIMEOUT, METHODS, PORT, decode, encode, error_from
+
+
+# client side of salon_service.py: answers Database's interface by calling
+# the service, so MainApp, the views and the QueryExecutor work the same
+# whichever they're given. each thread talks to the service over its own
+# keep-alive connection, which also stands in for the thread's read
+# connection (the QueryExecutor interrupts a superseded search through it).
+# there's no raw SQL (read, write, transaction()) through the service, so the
+# views leave out the CSV import and export when db.remote is set, and calls
+# that have to go in together are sent with batch().
+
+# seconds to wait for a reply, a year of free slots on a busy stylist takes a while
+TIMEOUT = 60
+
+
+class ServiceConnection:
+    def __init__(self, host, port, headers, timeout=TIMEOUT):
+        self.http = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.headers = headers
+        self.last_used = 0.0
+        self.interrupted = False
+
+    def request(self, method, path, payload=None):
+        # an idle connection may have been dropped by the service, start a fresh one
+        if self.interrupted or time.monotonic() - self.last_used > IDLE_TIMEOUT / 2:
+            self.http.close()
+            self.interrupted = False
+
+        body = None if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+        try:
+            self.http.request(method, path, body, self.headers)
+            reply = json.loads(self.http.getresponse().read())
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.http.close()
+            if self.interrupted:
+                raise sqlite3.OperationalError("interrupted") from e
+            raise sqlite3.OperationalError(
+                f"Salon service unavailable at {self.http.host}:{self.http.port}: {e}"
+            ) from e
+        self.last_used = time.monotonic()
+
+        if "error" in reply:
+            raise error_from(reply["error"])
+        return decode(reply["result"])
+
+    def interrupt(self):
+        # like sqlite3.Connection.interrupt(), from another thread: the request
+        # in progress fails with OperationalError("interrupted")
+        self.interrupted = True
+        sock = self.http.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.http.close()
+
+
+class RemoteConnections:
+    # stands in for ConnectionManager: a ServiceConnection per thread
+    def __init__(self, host, port, headers, timeout=TIMEOUT):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.all = []
+        self.closed = False
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            conn = ServiceConnection(self.host, self.port, self.headers, self.timeout)
+            self.local.conn = conn
+            with self.lock:
+                self.all.append(conn)
+        return conn
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            for conn in self.all:
+                conn.close()
+            self.all.clear()
+
+
+class ServiceStats(QueryStats):
+    # the round trip of every call from this desk, by method, followed in the
+    # summary by the service's own query stats
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    def summary(self, top=20):
+        try:
+            service = self.db.connections.reader().request("GET", "/stats")
+        except sqlite3.Error as e:
+            service = f"DEBUG: Could not fetch the service's query stats: {e}"
+        return f"{super().summary(top)}\n\nService at {self.db.path}:\n{service}"
+
+
+class RemoteRepository:
+    # db.users, db.services, ... calling "users.get" and so on
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def __getattr__(self, method):
+        name = f"{self.name}.{method}"
+        if name in METHODS:
+            return functools.partial(self.db.call, name)
+        raise AttributeError(f"{name} isn't available through the salon service")
+
+
+class RemoteDatabase:
+    remote = True
+
+    # worked out locally, the same as Database
+    hash_password = Database.hash_password
+
+    def __init__(self, url, token=None, timeout=TIMEOUT):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Not a salon service URL: {url}")
+        token = token or os.environ.get("SALON_SERVICE_TOKEN")
+
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        self.path = url
+        self.connections = RemoteConnections(parts.hostname, parts.port or PORT, headers, timeout)
+        self.query_stats = ServiceStats(self)
+
+        # dashboard figures, checked against the service's table versions
+        # like Database checks its own
+        self.aggregates = AggregateCache(self)
+
+        self.users = RemoteRepository(self, "users")
+        self.services = RemoteRepository(self, "services")
+        self.appointments = RemoteRepository(self, "appointments")
+        self.payments = RemoteRepository(self, "payments")
+
+        # fails here rather than at the first click if nothing is listening
+        self.health = self.connections.reader().request("GET", "/health")
+        print(f"DEBUG: Using the salon service at {url} ({self.health['path']}, v{self.health['schema_version']})")
+
+    def call(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        result, failed = None, True
+        try:
+            result = self.connections.reader().request("POST", "/call", {
+                "method": method, "args": encode(list(args)), "kwargs": encode(kwargs)
+            })
+            failed = False
+            return result
+        finally:
+            rows = len(result) if isinstance(result, list) else 0
+            self.query_stats.record(f"{method}()", time.perf_counter() - start, rows, failed)
+
+    def __getattr__(self, name):
+        if name in METHODS:
+            return functools.partial(self.call, name)
+        raise AttributeError(f"{name} isn't available through the salon service")
+
+    def batch(self, calls):
+        # [(method, args), (method, args, kwargs), ...] run in order in one
+        # transaction on the service, all or none. returns their results
+        start = time.perf_counter()
+        failed = True
+        try:
+            results = self.connections.reader().request("POST", "/call_batch", {"calls": [
+                {"method": call[0], "args": encode(list(call[1])), "kwargs": encode(call[2] if len(call) > 2 else {})}
+                for call in calls
+            ]})
+            failed = False
+            return results
+        finally:
+            self.query_stats.record(f"batch({len(calls)})", time.perf_counter() - start, 0, failed)
+
+    def close(self):
+        self.connections.close()
@@ -0,0 +1,236 @@
+import datetime
+from functools import lru_cache
+
+from models import (User, UserRole, UserStatus, Person, PersonMatch, Service, Appointment,
+                    PayableAppointment, PaymentDetails)
+
+
+# typed reads for users, services, appointments and payments. each repository
+# wraps a Database (db.users, db.services, ...) and runs on the calling
+# thread's read connection, so they're safe to call from executor jobs.
+# the SQL is fixed text (built once per shape and cached where it varies), so
+# every call hits sqlite3's prepared statement cache instead of re-parsing.
+
+# the payment form offers appointments from this many days back (older ones only while unpaid)
+PAYABLE_DAYS = 14
+
+# the two name orders type-ahead lookups search, each backed by an expression
+# index in migrations.NAME_LOOKUP_INDEXES
+NAME_KEYS = ("lower(first_name || ' ' || last_name)", "lower(last_name || ' ' || first_name)")
+
+
+# [low, high) bounds of every string starting with prefix, for index range scans
+def prefix_range(prefix):
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def normalise(text):
+    return " ".join((text or "").lower().split())
+
+
+def row_factory(model):
+    # cursor.row_factory that builds a NamedTuple row straight from the fetch
+    return lambda cursor, row: model._make(row)
+
+
+class Repository:
+    def __init__(self, db):
+        self.db = db
+
+    def rows(self, model, q, params=()):
+        cursor = self.db.read(q, params)
+        cursor.row_factory = row_factory(model)
+        return cursor.fetchall()
+
+    def row(self, model, q, params=()):
+        cursor = self.db.read(q, params)
+        cursor.row_factory = row_factory(model)
+        return cursor.fetchone()
+
+
+@lru_cache(maxsize=None)
+def people_lookup_sql(role_count, has_prefix):
+    # each name order is an index range stopped by its own LIMIT, so the
+    # cost doesn't depend on how many people there are
+    marks = ", ".join("?" for _ in range(role_count))
+    parts = []
+    for key in NAME_KEYS:
+        condition = f"role IN ({marks})"
+        if has_prefix:
+            condition += f" AND {key} >= ? AND {key} < ?"
+        parts.append(f"""
+            SELECT * FROM (
+                SELECT user_id, first_name || ' ' || last_name AS full_name, email, {key} AS k
+                FROM users WHERE {condition}
+                ORDER BY k LIMIT ?
+            )""")
+    return f"""
+        SELECT user_id, full_name, email FROM ({" UNION ".join(parts)})
+        GROUP BY user_id
+        ORDER BY lower(full_name), user_id
+        LIMIT ?
+    """
+
+
+class UserRepository(Repository):
+    GET = "SELECT user_id, first_name, last_name, email, phone_number FROM users WHERE user_id = ?"
+    BY_USERNAME = """
+        SELECT user_id, username, password, email, birth_date, joined_date, last_login, role, status,
+               first_name, last_name, phone_number
+        FROM users WHERE username = ?
+    """
+    CUSTOMERS = """
+        SELECT user_id, first_name || ' ' || last_name AS full_name, email
+        FROM users
+        WHERE role = 'customer'
+        ORDER BY first_name
+    """
+    STYLISTS = """
+        SELECT user_id, first_name || ' ' || last_name AS full_name, email
+        FROM users
+        WHERE role IN ('staff', 'stylist')
+        ORDER BY first_name
+    """
+
+    def get(self, user_id):
+        return self.row(Person, self.GET, (user_id,))
+
+    def by_username(self, username):
+        row = self.db.read(self.BY_USERNAME, (username,)).fetchone()
+        if row is None:
+            return None
+        return User(*row[:7], UserRole(row[7]), UserStatus(row[8]), *row[9:])
+
+    def customers(self):
+        return self.rows(PersonMatch, self.CUSTOMERS)
+
+    def stylists(self):
+        return self.rows(PersonMatch, self.STYLISTS)
+
+    # type-ahead lookups, lower-case prefix of "first last" or "last first"
+    def lookup(self, roles, text, limit=10):
+        prefix = normalise(text)
+        params = []
+        for _ in NAME_KEYS:
+            params.extend(roles)
+            if prefix:
+                params.extend(prefix_range(prefix))
+            params.append(limit)
+        params.append(limit)
+        return self.rows(PersonMatch, people_lookup_sql(len(roles), bool(prefix)), params)
+
+    def lookup_customers(self, text, limit=10):
+        return self.lookup(("customer",), text, limit)
+
+    def lookup_stylists(self, text, limit=10):
+        return self.lookup(("staff", "stylist"), text, limit)
+
+
+class ServiceRepository(Repository):
+    COLUMNS = "service_id, service_name, price, duration_minutes, description"
+    GET = f"SELECT {COLUMNS} FROM services WHERE service_id = ?"
+    ALL = f"SELECT {COLUMNS} FROM services ORDER BY service_name"
+    LOOKUP = f"SELECT {COLUMNS} FROM services ORDER BY lower(service_name) LIMIT ?"
+    LOOKUP_PREFIX = f"""
+        SELECT {COLUMNS} FROM services
+        WHERE lower(service_name) >= ? AND lower(service_name) < ?
+        ORDER BY lower(service_name) LIMIT ?
+    """
+
+    def get(self, service_id):
+        return self.row(Service, self.GET, (service_id,))
+
+    def all(self):
+        return self.rows(Service, self.ALL)
+
+    def lookup(self, text, limit=10):
+        prefix = normalise(text)
+        if prefix:
+            return self.rows(Service, self.LOOKUP_PREFIX, (*prefix_range(prefix), limit))
+        return self.rows(Service, self.LOOKUP, (limit,))
+
+
+@lru_cache(maxsize=None)
+def payable_sql(search):
+    # search is None, "id" or "name"
+    if search == "id":
+        # asked for by number, so shown whatever its date or payments
+        conditions = ["a.appointment_id = ?"]
+    else:
+        conditions = [
+            "a.appointment_datetime < ?",
+            "lower(a.status) != 'cancelled'",
+            "(a.appointment_datetime >= ? OR NOT EXISTS (SELECT 1 FROM payments p WHERE p.appointment_id = a.appointment_id))",
+        ]
+    if search == "name":
+        # the two name orders each range-scan their expression index
+        names = " UNION ".join(
+            f"SELECT user_id FROM users WHERE role = 'customer' AND {key} >= ? AND {key} < ?" for key in NAME_KEYS
+        )
+        conditions.append(f"a.customer_id IN ({names})")
+
+    # paid per appointment, found through idx_payments_appointment
+    return f"""
+        SELECT a.appointment_id, u.first_name || ' ' || u.last_name, a.appointment_datetime,
+               s.service_name, IFNULL(s.price, 0),
+               IFNULL((SELECT SUM(p.amount) FROM payments p WHERE p.appointment_id = a.appointment_id AND p.status = 'paid'), 0)
+        FROM appointments a
+        LEFT JOIN users u ON u.user_id = a.customer_id
+        LEFT JOIN services s ON s.service_id = a.service_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY a.appointment_datetime DESC
+        LIMIT ?
+    """
+
+
+class AppointmentRepository(Repository):
+    GET = """
+        SELECT a.appointment_id, a.appointment_datetime, a.notes, a.status,
+               a.customer_id, c.first_name || ' ' || c.last_name,
+               a.stylist_id, st.first_name || ' ' || st.last_name,
+               a.service_id, sv.service_name
+        FROM appointments a
+        LEFT JOIN users c ON c.user_id = a.customer_id
+        LEFT JOIN users st ON st.user_id = a.stylist_id
+        LEFT JOIN services sv ON sv.service_id = a.service_id
+        WHERE a.appointment_id = ?
+    """
+
+    def get(self, appointment_id):
+        return self.row(Appointment, self.GET, (appointment_id,))
+
+    def payable(self, text, limit=10, days=PAYABLE_DAYS, now=None):
+        # appointments for the payment form, newest first: those up to the end
+        # of today that are unpaid or from the last `days` days, cancelled ones
+        # left out. text is an appointment id ("123" / "#123") or the start of
+        # a customer name.
+        text = (text or "").strip()
+        if text.lstrip("#").isdigit():
+            return self.rows(PayableAppointment, payable_sql("id"), (int(text.lstrip("#")), limit))
+
+        now = now or datetime.datetime.now()
+        today = datetime.datetime.combine(now.date(), datetime.time())
+        until = today + datetime.timedelta(days=1)
+        since = today - datetime.timedelta(days=days)
+
+        prefix = normalise(text)
+        if prefix:
+            return self.rows(PayableAppointment, payable_sql("name"),
+                            (until, since, *prefix_range(prefix), *prefix_range(prefix), limit))
+        return self.rows(PayableAppointment, payable_sql(None), (until, since, limit))
+
+
+class PaymentRepository(Repository):
+    DETAILS = """
+        SELECT p.payment_id, p.appointment_id, c.first_name || ' ' || c.last_name, sv.service_name,
+               p.amount, p.payment_date, p.payment_method, p.status,
+               p.card_last4, p.card_expiry, p.card_holder
+        FROM payments p
+        LEFT JOIN appointments a ON a.appointment_id = p.appointment_id
+        LEFT JOIN users c ON c.user_id = a.customer_id
+        LEFT JOIN services sv ON sv.service_id = a.service_id
+        WHERE p.payment_id = ?
+    """
+
+    def details(self, payment_id):
+        return self.row(PaymentDetails, self.DETAILS, (payment_id,))
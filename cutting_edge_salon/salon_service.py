@@ -0,0 +1,334 @@
+import argparse
+import datetime
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import migrations
+import models
+from database import Database
+
+
+# headless mode: one process owns the database and serves it to every front
+# desk as a small JSON API over HTTP, so the desks share its single writer,
+# its read connections and its caches (the dashboard figures, table versions)
+# instead of each opening the file. remote_database.py is the client side,
+# a stand-in for Database that MainApp uses when given the service's URL.
+#
+#   python salon_service.py --db salon_database.db --port 8765
+#   python main.py http://127.0.0.1:8765
+#
+# every client connection gets its own server thread (with its own pooled
+# read connection) for as long as it stays open. a transaction never outlives
+# the request it came in with, so one desk can't hold the writer while it
+# waits on its user: calls that have to go in together are sent as one batch.
+#
+#   GET  /health                  database path, schema version, journal mode
+#   GET  /stats                   query_stats summary of the service
+#   POST /call                    {"method": "fetch_customers_page", "args": [...], "kwargs": {...}}
+#   POST /call_batch              {"calls": [{"method": ..., "args": ..., "kwargs": ...}, ...]}
+#                                 run in order in one transaction, all or none
+#
+# replies are {"result": ...} or {"error": {"type": ..., "message": ...}},
+# a batch's result is the list of its calls' results.
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# seconds a client connection may sit idle before it's dropped
+IDLE_TIMEOUT = 30
+
+# largest request body accepted
+MAX_BODY = 16 * 1024 * 1024
+
+# what clients may call: Database methods and "repository.method" names.
+# raw SQL (read, write, fetch_page) and anything returning password hashes
+# (users.by_username) stay on this side.
+METHODS = {
+    "login", "table_versions", "unique_username",
+    "fetch_staff_page", "fetch_customers_page", "fetch_appointments_page", "fetch_payments_page",
+    "fetch_all_staff", "fetch_all_customers", "fetch_all_appointments", "fetch_all_payments",
+    "add_user", "create_user", "update_user", "delete_user",
+    "revenue_summary", "revenue_year_over_year",
+    "bookings_on", "takings_on", "stylist_load_on",
+    "stylist_bookings", "service_duration", "find_conflict", "next_free_slots",
+    "add_appointment", "update_appointment", "set_appointment_statuses", "delete_appointment",
+    "insert_payment", "update_payment", "delete_payment",
+    "users.get", "users.customers", "users.stylists",
+    "users.lookup", "users.lookup_customers", "users.lookup_stylists",
+    "services.get", "services.all", "services.lookup",
+    "appointments.get", "appointments.payable",
+    "payments.details",
+}
+
+
+class ServiceError(Exception):
+    # an error on the service the client has no matching type for
+    pass
+
+
+class NotFound(LookupError):
+    # no such path or method, answered with a 404
+    pass
+
+
+# errors raised again under the same type on the client, anything else is a ServiceError
+ERRORS = {
+    cls.__name__: cls for cls in (
+        sqlite3.IntegrityError, sqlite3.OperationalError, sqlite3.ProgrammingError,
+        sqlite3.DatabaseError, ValueError, KeyError, TypeError, LookupError, NotImplementedError,
+        PermissionError, NotFound,
+    )
+}
+
+
+# row types rebuilt by name on the client
+ROW_TYPES = {
+    name: cls for name, cls in vars(models).items()
+    if isinstance(cls, type) and issubclass(cls, tuple) and hasattr(cls, "_fields")
+}
+ENUM_TYPES = {
+    name: cls for name, cls in vars(models).items()
+    if isinstance(cls, type) and issubclass(cls, Enum) and cls is not Enum
+}
+
+
+# JSON encoding
+# JSON has no tuples, datetimes or rows, so those go as {"$": type, "v": value}.
+# tuples have to survive the trip: page keys are passed back as they came and
+# the tables use them as dict keys.
+
+def encode(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return {"$": "datetime", "v": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$": "date", "v": value.isoformat()}
+    if isinstance(value, Enum):
+        return {"$": "enum", "t": type(value).__name__, "v": value.value}
+    if isinstance(value, tuple):
+        name = type(value).__name__ if type(value).__name__ in ROW_TYPES else "tuple"
+        return {"$": name, "v": [encode(v) for v in value]}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        return {"$": "dict", "v": [[encode(k), encode(v)] for k, v in value.items()]}
+    if isinstance(value, models.User):
+        # the password hash never leaves the service
+        return {"$": "User", "v": {slot: encode(getattr(value, slot)) for slot in models.User.__slots__
+                                   if slot != "password"}}
+    raise TypeError(f"Cannot send a {type(value).__name__} through the salon service")
+
+
+def decode(value):
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    kind, inner = value["$"], value["v"]
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(inner)
+    if kind == "date":
+        return datetime.date.fromisoformat(inner)
+    if kind == "enum":
+        return ENUM_TYPES[value["t"]](inner)
+    if kind == "tuple":
+        return tuple(decode(v) for v in inner)
+    if kind == "dict":
+        return {decode(k): decode(v) for k, v in inner}
+    if kind == "User":
+        fields = {name: decode(v) for name, v in inner.items()}
+        return models.User(password=None, **fields)
+    return ROW_TYPES[kind](*(decode(v) for v in inner))
+
+
+def error_from(error):
+    # the exception to raise on the client for an {"error": ...} reply
+    return ERRORS.get(error["type"], ServiceError)(error["message"])
+
+
+# server
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    # keep-alive, so a client connection keeps its thread (and its read connection) between calls
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    # the headers and body go out as two writes, with Nagle on the body waits
+    # for the client's delayed ACK of the headers, ~40 ms per call
+    disable_nagle_algorithm = True
+
+    def finish(self):
+        # the client hung up or timed out: give this thread's read connection
+        # back for the next client
+        self.server.service.db.release_thread()
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def do_GET(self):
+        self.respond(self.server.service.get, self.path)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.send_json(413, {"error": {"type": "ValueError", "message": "Request too large"}})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length) if length else b"{}"
+        self.respond(self.server.service.post, self.path, body)
+
+    def respond(self, handler, *args):
+        service = self.server.service
+        if not service.authorised(self.headers.get("Authorization")):
+            self.send_json(401, {"error": {"type": "PermissionError", "message": "Bad or missing service token"}})
+            return
+        start = time.perf_counter()
+        try:
+            status, reply = 200, {"result": encode(handler(*args))}
+        except NotFound as e:
+            status, reply = 404, {"error": {"type": type(e).__name__, "message": str(e)}}
+        except Exception as e:
+            # errors the client raises again under their own type (a double
+            # booking, a bad argument) are 400s, anything else is our fault
+            status = 400 if type(e).__name__ in ERRORS else 500
+            reply = {"error": {"type": type(e).__name__, "message": str(e)}}
+        service.requests += 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= service.db.query_stats.slow_ms:
+            print(f"DEBUG: Slow service request {self.path} took {elapsed_ms:.0f} ms")
+        self.send_json(status, reply)
+
+    def send_json(self, status, reply):
+        data = json.dumps(reply, separators=(",", ":")).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            # the client gave up waiting (an interrupted search), nothing to tell it
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.service.verbose:
+            print(f"DEBUG: {self.client_address[0]} {format % args}")
+
+
+class SalonService:
+    def __init__(self, db, host=HOST, port=PORT, token=None, verbose=False):
+        self.db = db
+        self.token = token
+        self.verbose = verbose
+        self.requests = 0
+        self.started = time.time()
+
+        self.server = ThreadingHTTPServer((host, port), ServiceHandler)
+        self.server.service = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def authorised(self, header):
+        if not self.token:
+            return True
+        return hmac.compare_digest(header or "", f"Bearer {self.token}")
+
+    # requests
+
+    def get(self, path):
+        if path == "/health":
+            return {
+                "path": os.path.abspath(self.db.path),
+                "schema_version": migrations.current_version(self.db.connections.reader()),
+                "journal_mode": self.db.connections.journal_mode,
+                "requests": self.requests,
+                "uptime_s": round(time.time() - self.started),
+            }
+        if path == "/stats":
+            return self.db.query_stats.summary()
+        raise NotFound(f"No such path: {path}")
+
+    def post(self, path, body):
+        request = json.loads(body)
+        if path == "/call":
+            return self.call(*self.unpack(request))
+        if path == "/call_batch":
+            # all checked before the transaction starts, so a typo doesn't take the writer
+            calls = [self.unpack(call) for call in request["calls"]]
+            return self.db.batch(calls)
+        raise NotFound(f"No such path: {path}")
+
+    def unpack(self, request):
+        # (method, args, kwargs) of a call, 404 unless it's one clients may make
+        if request["method"] not in METHODS:
+            raise NotFound(f"No such method: {request['method']}")
+        return (request["method"], decode(request.get("args", [])),
+                decode(request["kwargs"]) if "kwargs" in request else {})
+
+    def call(self, method, args, kwargs):
+        target = self.db
+        for name in method.split("."):
+            target = getattr(target, name)
+        return target(*args, **kwargs)
+
+    # running
+
+    def serve_forever(self):
+        print(f"DEBUG: Salon service for {os.path.abspath(self.db.path)} listening on {self.url}")
+        self.server.serve_forever()
+
+    def start(self):
+        # serves on a background thread, for tests and embedding. returns the url
+        self.thread = threading.Thread(target=self.server.serve_forever, name="salon-service", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the salon database to the front desks")
+    parser.add_argument("--db", default="salon_database.db")
+    parser.add_argument("--host", default=HOST, help="127.0.0.1 (this machine only) unless the desks are elsewhere")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--token", default=os.environ.get("SALON_SERVICE_TOKEN"),
+                        help="shared secret the desks must send, default $SALON_SERVICE_TOKEN")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if args.host not in ("127.0.0.1", "localhost", "::1") and not args.token:
+        print("DEBUG: Serving beyond this machine without a --token, anyone on the network can use it")
+
+    db = Database(args.db)
+    service = SalonService(db, args.host, args.port, args.token, args.verbose)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server.server_close()
+        db.query_stats.dump()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import datetime
+
+# appointment and payment times are stored as INTEGER seconds since
+# 1970-01-01 00:00 of the salon's wall clock (no time zone, like the rest of
+# the app). integers compare and index as plain numbers, and turning one back
+# into a datetime is an addition instead of a strptime. SQLite reads them with
+# the 'unixepoch' modifier, e.g. date(appointment_datetime, 'unixepoch').
+# payments default to the wall clock too, never UTC (see migration 11).
+#
+# columns are declared "UNIXTIME INTEGER": INTEGER affinity, and the first
+# word picks the converter below when read with PARSE_DECLTYPES.
+
+EPOCH = datetime.datetime(1970, 1, 1)
+SECOND = datetime.timedelta(seconds=1)
+
+
+def to_epoch(value):
+    # datetime, date, 'YYYY-MM-DD[ HH:MM[:SS]]' text or seconds -> seconds, None stays None
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.strip())
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return (value.replace(tzinfo=None) - EPOCH) // SECOND
+
+
+def from_epoch(seconds):
+    return None if seconds is None else EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def convert_unixtime(val):
+    # sqlite3 converter, val is the stored integer as bytes
+    return EPOCH + datetime.timedelta(seconds=int(val))
@@ -0,0 +1,270 @@
+import os
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import deque
+
+
+# watches the Tk event loop for hangs. a heartbeat scheduled with after()
+# measures how late the loop gets round to it, and every Tk callback (button
+# commands, bindings, after() jobs) is timed by swapping in our own
+# tkinter.CallWrapper, so callbacks registered once the monitor is installed
+# are covered without touching the views. a watchdog thread grabs the main
+# thread's stack while the loop is stalled, so a slow callback is logged with
+# where it was stuck, not just its name. slow callbacks and stalls go to a
+# bounded in-memory log (see views/diagnostics_view.py) and to a log file.
+
+HEARTBEAT_MS = 100
+SLOW_MS = 100
+SLOW_LOG_SIZE = 100
+LOG_PATH = "ui_responsiveness.log"
+
+# heartbeat lag histogram bucket upper bounds in ms, the last bucket is everything later
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# customtkinter widgets call their command from one of these handlers
+COMMAND_HANDLERS = ("_clicked", "toggle", "invoke", "_dropdown_callback")
+
+STACK_LIMIT = 30
+
+
+def describe(func):
+    # readable name of a Tk callback
+    code = getattr(func, "__code__", None)
+    if code is not None and code.co_name == "callit" and "func" in code.co_freevars:
+        # after() wraps the real job in a callit closure
+        func = func.__closure__[code.co_freevars.index("func")].cell_contents
+
+    owner = getattr(func, "__self__", None)
+    name = getattr(func, "__name__", type(func).__name__)
+    if owner is not None:
+        command = getattr(owner, "_command", None)
+        if name in COMMAND_HANDLERS and callable(command):
+            return f"{type(owner).__name__} -> {describe(command)}"
+        return f"{type(owner).__name__}.{name}"
+
+    code = getattr(func, "__code__", None)
+    qualname = getattr(func, "__qualname__", name)
+    if code is not None and ("<" in qualname):
+        # lambdas and nested functions, named by where they are
+        path = code.co_filename.replace("\\", "/").split("/")
+        return f"{qualname} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+    return qualname
+
+
+class CallbackStats:
+    __slots__ = ("name", "calls", "total", "max", "slow")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+
+class UIMonitor:
+    def __init__(self, root, heartbeat_ms=HEARTBEAT_MS, slow_ms=SLOW_MS, log_path=LOG_PATH,
+                 slow_log_size=SLOW_LOG_SIZE):
+        self.root = root
+        self.heartbeat_ms = heartbeat_ms
+        self.slow_ms = slow_ms
+        self.slow_seconds = slow_ms / 1000
+        self.log_path = log_path
+        self.log_file = None
+
+        # heartbeat
+        self.beats = 0
+        self.expected = None        # perf_counter() the next beat is due
+        self.lag_buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.stalls = 0
+
+        # callbacks
+        self.callbacks = {}
+        self.running = []           # [name, start, beats at start] of the callbacks in progress, innermost last
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.lock = threading.Lock()
+
+        # stack of the main thread taken by the watchdog during the current stall
+        self.main_thread_id = threading.get_ident()
+        self.stall_stack = None
+        self.stopped = False
+
+        self.install()
+        self.heartbeat_id = self.root.after(self.heartbeat_ms, self.beat)
+        self.expected = time.perf_counter() + self.heartbeat_ms / 1000
+        self.watchdog = threading.Thread(target=self.watch, name="ui-watchdog", daemon=True)
+        self.watchdog.start()
+
+    # callback timing
+
+    def install(self):
+        monitor = self
+
+        class TimedCallWrapper(tkinter.CallWrapper):
+            name = None
+
+            def __call__(self, *args):
+                if monitor.stopped:
+                    return super().__call__(*args)
+                if self.name is None:
+                    self.name = describe(self.func)
+                frame = [self.name, time.perf_counter(), monitor.beats]
+                monitor.running.append(frame)
+                try:
+                    return super().__call__(*args)
+                finally:
+                    monitor.running.pop()
+                    monitor.finished(frame, time.perf_counter() - frame[1])
+
+        tkinter.CallWrapper = TimedCallWrapper
+
+    def finished(self, frame, seconds):
+        name, _, beats_at_start = frame
+        # a callback that ran a nested event loop (a messagebox, update())
+        # let the heartbeat through, so its time wasn't spent blocking
+        slow = seconds >= self.slow_seconds and self.beats == beats_at_start
+        with self.lock:
+            stats = self.callbacks.get(name)
+            if stats is None:
+                stats = self.callbacks[name] = CallbackStats(name)
+            stats.calls += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+            stats.slow += slow
+        if slow:
+            stack, self.stall_stack = self.stall_stack, None
+            self.record("slow callback", name, seconds, stack)
+
+    # heartbeat
+
+    def beat(self):
+        now = time.perf_counter()
+        lag = max(now - self.expected, 0.0)
+        self.beats += 1
+        lag_ms = lag * 1000
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.lag_buckets[i] += 1
+                break
+        else:
+            self.lag_buckets[-1] += 1
+        self.max_lag = max(self.max_lag, lag)
+
+        if lag >= self.slow_seconds:
+            # whichever callback caused it has already logged itself with the
+            # stack, this catches stalls outside any one callback (redraws, gc)
+            self.stalls += 1
+            stack, self.stall_stack = self.stall_stack, None
+            if stack is not None:
+                self.record("event loop stall", "heartbeat", lag, stack)
+        else:
+            # taken while a nested event loop was waiting, nothing was stuck
+            self.stall_stack = None
+
+        if not self.stopped:
+            self.heartbeat_id = self.root.after(self.heartbeat_ms, self.beat)
+            self.expected = time.perf_counter() + self.heartbeat_ms / 1000
+
+    def stuck(self, now):
+        # a callback has run for slow_ms without the heartbeat getting in, or
+        # the heartbeat itself is slow_ms overdue
+        try:
+            _, start, beats_at_start = self.running[-1]
+            if beats_at_start == self.beats and now - start >= self.slow_seconds:
+                return True
+        except IndexError:
+            pass
+        return now - self.expected >= self.slow_seconds
+
+    def watch(self):
+        # runs on its own thread: takes the main thread's stack once per stall
+        interval = max(self.slow_seconds / 4, 0.01)
+        while not self.stopped:
+            time.sleep(interval)
+            if self.stall_stack is not None:
+                continue
+            if self.stuck(time.perf_counter()):
+                frame = sys._current_frames().get(self.main_thread_id)
+                if frame is not None:
+                    self.stall_stack = traceback.format_list(traceback.extract_stack(frame, limit=STACK_LIMIT))
+
+    # slow log
+
+    def record(self, kind, name, seconds, stack):
+        entry = {
+            "at": time.time(),
+            "kind": kind,
+            "name": name,
+            "ms": seconds * 1000,
+            "stack": stack or [],
+        }
+        self.slow_log.append(entry)
+        print(f"DEBUG: {kind} {name} took {entry['ms']:.0f} ms")
+        self.write_log(entry)
+
+    def write_log(self, entry):
+        if not self.log_path:
+            return
+        try:
+            if self.log_file is None:
+                self.log_file = open(self.log_path, "a", encoding="utf-8")
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["at"]))
+            self.log_file.write(f"{stamp} {entry['kind']}: {entry['name']} {entry['ms']:.0f} ms\n")
+            for line in entry["stack"]:
+                self.log_file.write(line)
+            self.log_file.flush()
+        except OSError as e:
+            print(f"DEBUG: Could not write {self.log_path}: {e}")
+            self.log_path = None
+
+    # reading
+
+    def lag_percentile(self, fraction):
+        wanted = self.beats * fraction
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS_MS, self.lag_buckets):
+            seen += count
+            if count and seen >= wanted:
+                return bound
+        return self.max_lag * 1000
+
+    def snapshot(self):
+        with self.lock:
+            callbacks = [{
+                "name": s.name,
+                "calls": s.calls,
+                "total_ms": s.total * 1000,
+                "mean_ms": s.total * 1000 / s.calls,
+                "max_ms": s.max * 1000,
+                "slow": s.slow,
+            } for s in self.callbacks.values()]
+        callbacks.sort(key=lambda s: s["max_ms"], reverse=True)
+        return {
+            "heartbeat": {
+                "beats": self.beats,
+                "p50_ms": self.lag_percentile(0.5),
+                "p95_ms": self.lag_percentile(0.95),
+                "max_ms": self.max_lag * 1000,
+                "stalls": self.stalls,
+                "histogram": dict(zip(LAG_BUCKETS_MS + (float("inf"),), self.lag_buckets)),
+            },
+            "callbacks": callbacks,
+            "slow": list(self.slow_log),
+        }
+
+    def stop(self):
+        self.stopped = True
+        try:
+            self.root.after_cancel(self.heartbeat_id)
+        except tkinter.TclError:
+            pass
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        if self.log_path:
+            print(f"DEBUG: UI responsiveness log at {os.path.abspath(self.log_path)}")
@@ -1,8 +1,18 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 import datetime
+import sqlite3
+
+from views.csv_import import import_csv
+from views.live_search import LiveSearch
+from views.type_ahead import TypeAheadPicker
+from views.virtual_table import VirtualTable
+
 
 class BookingView(ctk.CTkFrame):
+    # show_view skips refresh_data while none of these tables have changed
+    watch_tables = ("appointments", "users", "services")
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -16,10 +26,16 @@ class BookingView(ctk.CTkFrame):
 
         self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search by customer name...")
         self.search_entry.pack(side="left", padx=10, pady=10, expand=True, fill="x")
+        # results follow the box as you type
+        self.live_search = LiveSearch(self.search_entry, self.refresh_data)
 
-        ctk.CTkButton(search_frame, text="Search", width=100, command=self.refresh_data).pack(side="left", padx=5)
+        ctk.CTkButton(search_frame, text="Search", width=100, command=lambda: self.live_search.search_now()).pack(side="left", padx=5)
         ctk.CTkButton(search_frame, text="Clear", width=100, fg_color="gray", command=self.clear_search).pack(side="left", padx=5)
 
+        # shown while a query is running in the background
+        self.loading_label = ctk.CTkLabel(search_frame, text="", width=90)
+        self.loading_label.pack(side="left", padx=5)
+
         # input form
         form_frame = ctk.CTkFrame(self)
         form_frame.pack(fill="x", padx=20, pady=10)
@@ -27,9 +43,6 @@ class BookingView(ctk.CTkFrame):
         self.datetime_var = ctk.StringVar(value="")
         self.notes_var = ctk.StringVar(value="")
         self.status_var = ctk.StringVar(value="Booked")
-        self.customer_var = ctk.StringVar()
-        self.stylist_var = ctk.StringVar()
-        self.service_var = ctk.StringVar()
 
         ctk.CTkEntry(
             form_frame,
@@ -41,15 +54,31 @@ class BookingView(ctk.CTkFrame):
 
         ctk.CTkOptionMenu(form_frame, values=["Booked", "Completed", "Cancelled", "No-Show"], variable=self.status_var).grid(row=0, column=2, padx=10, pady=10)
 
-        # dropdowns (values will be filled in refresh_data)
-        self.customer_menu = ctk.CTkOptionMenu(form_frame, values=[], variable=self.customer_var)
-        self.customer_menu.grid(row=1, column=0, padx=10, pady=10)
-
-        self.stylist_menu = ctk.CTkOptionMenu(form_frame, values=[], variable=self.stylist_var)
-        self.stylist_menu.grid(row=1, column=1, padx=10, pady=10)
-
-        self.service_menu = ctk.CTkOptionMenu(form_frame, values=[], variable=self.service_var)
-        self.service_menu.grid(row=1, column=2, padx=10, pady=10)
+        # type-ahead pickers, each keystroke pause runs one indexed prefix lookup
+        # with a LIMIT, so nothing here grows with the number of customers.
+        # a picker holds the chosen row's id, so there is no name -> id map to
+        # keep and no customer, stylist or service list to cache in memory:
+        # refresh_data only reloads the appointments page
+        self.customer_picker = TypeAheadPicker(
+            form_frame, controller, "booking.customer_lookup",
+            lambda db, text, limit: db.users.lookup_customers(text, limit),
+            placeholder="Customer", format_row=lambda c: f"{c.full_name}  <{c.email}>"
+        )
+        self.customer_picker.grid(row=1, column=0, padx=10, pady=10)
+
+        self.stylist_picker = TypeAheadPicker(
+            form_frame, controller, "booking.stylist_lookup",
+            lambda db, text, limit: db.users.lookup_stylists(text, limit),
+            placeholder="Stylist"
+        )
+        self.stylist_picker.grid(row=1, column=1, padx=10, pady=10)
+
+        self.service_picker = TypeAheadPicker(
+            form_frame, controller, "booking.service_lookup",
+            lambda db, text, limit: db.services.lookup(text, limit),
+            placeholder="Service", format_row=lambda s: f"{s.service_name}  (£{s.price:.2f})"
+        )
+        self.service_picker.grid(row=1, column=2, padx=10, pady=10)
 
         # action buttons
         btn_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -58,49 +87,46 @@ class BookingView(ctk.CTkFrame):
         ctk.CTkButton(btn_frame, text="Add Appointment", fg_color="green", command=self.add_appointment).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Update Selected", command=self.update_appointment).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Delete Selected", fg_color="red", command=self.delete_appointment).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="Next Free Slots", command=self.find_free_slots).pack(side="left", padx=5)
+        # the import writes with raw SQL, which needs the database file on this machine
+        if not self.controller.db.remote:
+            ctk.CTkButton(btn_frame, text="Import CSV", fg_color="gray", command=lambda: import_csv(self, "appointments")).pack(side="left", padx=5)
 
         # table
-        self.tree = ttk.Treeview(self, columns=("ID", "Date / Time", "Notes", "Status", "Customer", "Stylist", "Service"), show="headings")
+        # only a window of rows is materialised, more are paged in while scrolling
+        self.table = VirtualTable(
+            self, controller, "booking.appointments", "fetch_appointments_page",
+            columns=("ID", "Date / Time", "Notes", "Status", "Customer", "Stylist", "Service"),
+            on_loaded=self.show_appointments, on_error=self.show_load_error
+        )
+        self.tree = self.table.tree
         for col in ("ID", "Date / Time", "Notes", "Status", "Customer", "Stylist", "Service"):
             self.tree.heading(col, text=col)
 
-        self.tree.pack(expand=True, fill="both", padx=20, pady=10)
+        self.table.pack(expand=True, fill="both", padx=20, pady=10)
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
         ctk.CTkButton(self, text="Back to Dashboard", command=lambda: self.controller.show_view("DashboardView")).pack(pady=10)
 
-        self.refresh_data()
+        # data is loaded by refresh_data when the view is shown
 
     def refresh_data(self):
-        # reload dropdown data
-        self.customers = self.controller.db.fetch_customers()
-        self.stylists = self.controller.db.fetch_stylists()
-        self.services = self.controller.db.fetch_services()
-
-        customer_names = [c[1] for c in self.customers]
-        stylist_names = [s[1] for s in self.stylists]
-        service_names = [s[1] for s in self.services]
+        # the query runs on a worker thread and calls back on the UI thread
+        self.loading_label.configure(text="Loading...")
+        self.table.load(self.search_entry.get())
 
-        self.customer_menu.configure(values=customer_names)
-        self.stylist_menu.configure(values=stylist_names)
-        self.service_menu.configure(values=service_names)
+    def show_appointments(self, page):
+        self.update_loading()
 
-        if customer_names:
-            self.customer_var.set(customer_names[0])
-        if stylist_names:
-            self.stylist_var.set(stylist_names[0])
-        if service_names:
-            self.service_var.set(service_names[0])
+    def update_loading(self):
+        executor = self.controller.executor
+        if not executor.is_pending("booking.appointments"):
+            self.loading_label.configure(text="")
 
-        # refresh table
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        search_term = self.search_entry.get()
-        records = self.controller.db.fetch_all_appointments(search_term)
-
-        for r in records:
-            self.tree.insert("", "end", values=r)
+    def show_load_error(self, error):
+        self.seen_versions = None  # try again next time the view is shown
+        self.update_loading()
+        messagebox.showerror("DB Error", f"Could not load appointments: {error}")
 
 
 
@@ -141,22 +167,31 @@ class BookingView(ctk.CTkFrame):
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
-        self.refresh_data()
+        self.live_search.search_now()
 
     def on_tree_select(self, event):
         selected_item = self.tree.selection()
         if not selected_item:
             return
 
-        values = self.tree.item(selected_item)['values']
-        self.selected_appointment_id = values[0]
+        # items are keyed by appointment id. the form is filled from the row
+        # itself, not the Treeview's display strings
+        self.selected_appointment_id = int(selected_item[0])
+        appt = self.controller.db.appointments.get(self.selected_appointment_id)
+        if appt is None:
+            return
+
+        self.datetime_var.set(appt.appointment_datetime.strftime("%Y-%m-%d %H:%M"))
+        self.notes_var.set(appt.notes or "")
+        self.status_var.set(appt.status)
+        # names can be shared, so the pickers are set from the appointment's ids
+        self.customer_picker.set(appt.customer_id, appt.customer_name)
+        self.stylist_picker.set(appt.stylist_id, appt.stylist_name)
+        self.service_picker.set(appt.service_id, appt.service_name)
 
-        self.datetime_var.set(values[1])
-        self.notes_var.set(values[2])
-        self.status_var.set(values[3])
-        self.customer_var.set(values[4])
-        self.stylist_var.set(values[5])
-        self.service_var.set(values[6])
+    def selected_ids(self):
+        # (customer_id, stylist_id, service_id) chosen in the pickers, None where nothing is chosen
+        return self.customer_picker.get(), self.stylist_picker.get(), self.service_picker.get()
 
     def add_appointment(self):
         if not self.validate_inputs():
@@ -166,22 +201,27 @@ class BookingView(ctk.CTkFrame):
             now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
             self.datetime_var.set(now)
 
-        appointment_dt = self.datetime_var.get()
+        # bound as a datetime, stored as epoch seconds
+        appointment_dt = datetime.datetime.strptime(self.datetime_var.get().strip(), "%Y-%m-%d %H:%M")
         print("DEBUG datetime:", appointment_dt)
 
-        customer_id = next(c[0] for c in self.customers if c[1] == self.customer_var.get())
-        stylist_id = next(s[0] for s in self.stylists if s[1] == self.stylist_var.get())
-        service_id = next(s[0] for s in self.services if s[1] == self.service_var.get())
+        customer_id, stylist_id, service_id = self.selected_ids()
+        if None in (customer_id, stylist_id, service_id):
+            messagebox.showwarning("Selection", "Please choose a customer, stylist and service")
+            return
 
-        try:
-            self.controller.db.cur.execute("""
-                INSERT INTO appointments (customer_id, stylist_id, service_id, appointment_datetime, notes, status)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (customer_id, stylist_id, service_id, appointment_dt, self.notes_var.get(), self.status_var.get()))
+        # read now, the form can change while availability is checked
+        values = (customer_id, stylist_id, service_id, appointment_dt, self.notes_var.get(), self.status_var.get())
+        self.when_stylist_free(stylist_id, service_id, appointment_dt, None, lambda: self.save_new(values))
 
-            self.controller.db.conn.commit()
+    def save_new(self, values):
+        try:
+            self.controller.db.add_appointment(*values)
             self.refresh_data()
             self.clear_fields()
+        except sqlite3.IntegrityError as e:
+            # someone else took the slot between the check and the insert
+            messagebox.showwarning("Stylist Unavailable", str(e))
         except Exception as e:
             messagebox.showerror("DB Error", f"Could not add appointment: {e}")
 
@@ -193,24 +233,91 @@ class BookingView(ctk.CTkFrame):
         if not self.validate_inputs():
             return
 
-        customer_id = next(c[0] for c in self.customers if c[1] == self.customer_var.get())
-        stylist_id = next(s[0] for s in self.stylists if s[1] == self.stylist_var.get())
-        service_id = next(s[0] for s in self.services if s[1] == self.service_var.get())
+        customer_id, stylist_id, service_id = self.selected_ids()
+        if None in (customer_id, stylist_id, service_id):
+            messagebox.showwarning("Selection", "Please choose a customer, stylist and service")
+            return
+
+        appointment_dt = datetime.datetime.strptime(self.datetime_var.get().strip(), "%Y-%m-%d %H:%M")
+        appointment_id = self.selected_appointment_id
+        values = (appointment_id, customer_id, stylist_id, service_id, appointment_dt,
+                  self.notes_var.get(), self.status_var.get())
+        self.when_stylist_free(stylist_id, service_id, appointment_dt, appointment_id,
+                               lambda: self.save_update(values))
 
+    def save_update(self, values):
         try:
-            self.controller.db.cur.execute("""
-                UPDATE appointments
-                SET customer_id=?, stylist_id=?, service_id=?, appointment_datetime=?, notes=?, status=?
-                WHERE appointment_id=?
-            """, (customer_id, stylist_id, service_id, self.datetime_var.get(), self.notes_var.get(),
-                  self.status_var.get(), self.selected_appointment_id))
-
-            self.controller.db.conn.commit()
+            self.controller.db.update_appointment(*values)
             self.refresh_data()
             messagebox.showinfo("Success", "Appointment updated")
+        except sqlite3.IntegrityError as e:
+            messagebox.showwarning("Stylist Unavailable", str(e))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    # availability
+
+    def when_stylist_free(self, stylist_id, service_id, appointment_dt, exclude_id, save):
+        # the database rejects double bookings anyway, checking first lets us
+        # suggest other times. the check runs on a worker and save() is called
+        # back on the UI thread if the stylist is free
+        if self.status_var.get() in ("Cancelled", "No-Show"):
+            save()
+            return
+
+        stylist_label = self.stylist_picker.selected_label
+
+        def check(db):
+            # None when free, otherwise the next few free times
+            if db.find_conflict(stylist_id, service_id, appointment_dt, exclude_id) is None:
+                return None
+            return db.next_free_slots(stylist_id, service_id, count=3, start=appointment_dt)
+
+        def checked(slots):
+            self.update_loading()
+            if slots is None:
+                save()
+                return
+            suggestions = "\n".join(slot.strftime("%Y-%m-%d %H:%M") for slot in slots) or "none in the next year"
+            messagebox.showwarning(
+                "Stylist Unavailable",
+                f"{stylist_label} is already booked at that time.\n\nNext free times:\n{suggestions}"
+            )
+
+        def failed(error):
+            self.update_loading()
+            messagebox.showerror("DB Error", f"Could not check the stylist's availability: {error}")
+
+        self.loading_label.configure(text="Checking...")
+        self.controller.executor.submit("booking.availability", check, on_done=checked, on_error=failed)
+
+    def find_free_slots(self):
+        _, stylist, service = self.selected_ids()
+        if stylist is None or service is None:
+            messagebox.showwarning("Selection", "Please choose a stylist and a service first")
+            return
+
+        # searching a year of bookings runs off the UI thread
+        self.loading_label.configure(text="Finding free slots...")
+        self.controller.executor.submit(
+            "booking.free_slots", "next_free_slots", stylist, service, 5,
+            on_done=self.show_free_slots, on_error=self.show_slot_error
+        )
+
+    def show_free_slots(self, slots):
+        self.update_loading()
+        if not slots:
+            messagebox.showinfo("Free Slots", "No free slots in the next year")
+            return
+
+        self.datetime_var.set(slots[0].strftime("%Y-%m-%d %H:%M"))
+        times = "\n".join(slot.strftime("%a %d %b %Y %H:%M") for slot in slots)
+        messagebox.showinfo("Free Slots", f"Next free times for {self.stylist_picker.selected_label}:\n\n{times}")
+
+    def show_slot_error(self, error):
+        self.update_loading()
+        messagebox.showerror("DB Error", f"Could not search for free slots: {error}")
+
     def delete_appointment(self):
         if not self.selected_appointment_id:
             return
@@ -225,6 +332,6 @@ class BookingView(ctk.CTkFrame):
         self.datetime_var.set("")
         self.notes_var.set("")
         self.status_var.set("Booked")
-        self.customer_var.set("")
-        self.stylist_var.set("")
-        self.service_var.set("")
+        self.customer_picker.clear()
+        self.stylist_picker.clear()
+        self.service_picker.clear()
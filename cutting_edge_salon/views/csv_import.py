@@ -0,0 +1,52 @@
+from tkinter import filedialog, messagebox
+
+import importer
+
+
+# "Import CSV" button handler shared by the management views. the import runs
+# on a worker thread and the view is refreshed once it's done.
+
+MAX_ERRORS_SHOWN = 15
+
+
+def import_csv(view, kind):
+    path = filedialog.askopenfilename(
+        title=f"Import {kind} from CSV",
+        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+
+    columns = ", ".join(importer.IMPORTERS[kind].required)
+    print(f"DEBUG: importing {kind} from {path} (needs {columns})")
+
+    view.loading_label.configure(text="Importing...")
+    view.controller.executor.submit(
+        f"import.{kind}", lambda db: importer.import_csv(db, kind, path),
+        on_done=lambda report: show_report(view, report),
+        on_error=lambda error: show_error(view, kind, error)
+    )
+
+
+def show_report(view, report):
+    view.loading_label.configure(text="")
+    view.refresh_data()
+
+    errors = report["errors"]
+    summary = f"{report['imported']} {report['kind']} imported in {report['seconds']:.1f}s."
+    if not errors:
+        messagebox.showinfo("Import Complete", summary)
+        return
+
+    lines = [f"line {line}: {message}" for line, message in errors[:MAX_ERRORS_SHOWN]]
+    if len(errors) > MAX_ERRORS_SHOWN:
+        lines.append(f"...and {len(errors) - MAX_ERRORS_SHOWN} more")
+    messagebox.showwarning(
+        "Import Complete",
+        f"{summary}\n{len(errors)} rows were skipped:\n\n" + "\n".join(lines)
+    )
+
+
+def show_error(view, kind, error):
+    view.loading_label.configure(text="")
+    messagebox.showerror("Import Failed", f"Could not import {kind}: {error}")
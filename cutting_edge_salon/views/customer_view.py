@@ -2,7 +2,14 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox
 import re
 
+from views.csv_import import import_csv
+from views.live_search import LiveSearch
+from views.virtual_table import VirtualTable
+
 class CustomerView(ctk.CTkFrame):
+    # show_view skips refresh_data while none of these tables have changed
+    watch_tables = ("users",)
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -17,10 +24,16 @@ class CustomerView(ctk.CTkFrame):
         
         self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search by name...")
         self.search_entry.pack(side="left", padx=10, pady=10, expand=True, fill="x")
+        # results follow the box as you type
+        self.live_search = LiveSearch(self.search_entry, self.refresh_data)
         
-        ctk.CTkButton(search_frame, text="Search", width=100, command=self.refresh_data).pack(side="left", padx=5)
+        ctk.CTkButton(search_frame, text="Search", width=100, command=lambda: self.live_search.search_now()).pack(side="left", padx=5)
         ctk.CTkButton(search_frame, text="Clear", width=100, fg_color="gray", command=self.clear_search).pack(side="left", padx=5)
 
+        # shown while a query is running in the background
+        self.loading_label = ctk.CTkLabel(search_frame, text="", width=90)
+        self.loading_label.pack(side="left", padx=5)
+
         # input form
         form_frame = ctk.CTkFrame(self)
         form_frame.pack(fill="x", padx=20, pady=10)
@@ -40,20 +53,30 @@ class CustomerView(ctk.CTkFrame):
         ctk.CTkButton(btn_frame, text="Add Customer", fg_color="green", command=self.add_customer).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Update Selected", command=self.update_customer).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Delete Selected", fg_color="red", command=self.delete_customer).pack(side="left", padx=5)
+        # the import writes with raw SQL, which needs the database file on this machine
+        if not self.controller.db.remote:
+            ctk.CTkButton(btn_frame, text="Import CSV", fg_color="gray", command=lambda: import_csv(self, "customers")).pack(side="left", padx=5)
 
         # data table
-        self.tree = ttk.Treeview(self, columns=("ID", "First Name", "Last Name", "Email"), show="headings")
+        # only a window of rows is materialised, more are paged in while scrolling
+        self.table = VirtualTable(
+            self, controller, "customers", "fetch_customers_page",
+            columns=("ID", "First Name", "Last Name", "Email"),
+            format_row=lambda c: (c.user_id, c.first_name, c.last_name, c.email),
+            on_loaded=self.show_customers, on_error=self.show_load_error
+        )
+        self.tree = self.table.tree
         self.tree.heading("ID", text="ID", command=lambda: self.sort_column("ID", False))
         self.tree.heading("First Name", text="First Name", command=lambda: self.sort_column("First Name", False))
         self.tree.heading("Last Name", text="Last Name", command=lambda: self.sort_column("Last Name", False))
         self.tree.heading("Email", text="Email", command=lambda: self.sort_column("Email", False))
-        self.tree.pack(expand=True, fill="both", padx=20, pady=10)
+        self.table.pack(expand=True, fill="both", padx=20, pady=10)
         
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
         ctk.CTkButton(self, text="Back to Dashboard", command=lambda: self.controller.show_view("DashboardView")).pack(pady=10)
 
-        self.refresh_data()
+        # data is loaded by refresh_data when the view is shown
 
     # validation method
 
@@ -98,49 +121,41 @@ class CustomerView(ctk.CTkFrame):
         # toggle sort order next click
         self.tree.heading(col, command=lambda: self.sort_column(col, not reverse))
 
-    # username generator
-
-    def generate_unique_username(self, base_username):
-        username = base_username
-        counter = 1
-
-        self.controller.db.cur.execute("SELECT username FROM users WHERE username=?", (username,))
-        result = self.controller.db.cur.fetchone()
-
-        while result is not None:
-            username = f"{base_username}{counter}"
-            counter += 1
-            self.controller.db.cur.execute("SELECT username FROM users WHERE username=?", (username,))
-            result = self.controller.db.cur.fetchone()
-
-        return username
-
     # logic methods
 
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         search_term = self.search_entry.get()
-        customers = self.controller.db.fetch_all_customers(search_term)
-        
-        for c in customers:
-            self.tree.insert("", "end", values=(c[0], c[1], c[2], c[3]))
+
+        # pages are queried on a worker thread, show_customers is called back once the first one is in
+        self.loading_label.configure(text="Loading...")
+        self.table.load(search_term)
+
+    def show_customers(self, page):
+        self.loading_label.configure(text="")
+
+    def show_load_error(self, error):
+        self.seen_versions = None  # try again next time the view is shown
+        self.loading_label.configure(text="")
+        messagebox.showerror("DB Error", f"Could not load customers: {error}")
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
-        self.refresh_data()
+        self.live_search.search_now()
 
     def on_tree_select(self, event):
         selected_item = self.tree.selection()
         if not selected_item:
             return
         
-        values = self.tree.item(selected_item)['values']
-        self.selected_user_id = values[0]
-        self.first_name_var.set(values[1])
-        self.last_name_var.set(values[2])
-        self.email_var.set(values[3])
+        # items are keyed by user id
+        customer = self.controller.db.users.get(int(selected_item[0]))
+        if customer is None:
+            return
+
+        self.selected_user_id = customer.user_id
+        self.first_name_var.set(customer.first_name or "")
+        self.last_name_var.set(customer.last_name or "")
+        self.email_var.set(customer.email)
 
     def add_customer(self):
         if not self.validate_inputs():
@@ -149,15 +164,10 @@ class CustomerView(ctk.CTkFrame):
         fn, ln, em = self.first_name_var.get(), self.last_name_var.get(), self.email_var.get()
 
         base_username = em.split('@')[0] + "_user"
-        username = self.generate_unique_username(base_username)
         password = self.controller.db.hash_password("password123")
         
         try:
-            self.controller.db.cur.execute("""
-                INSERT INTO users (username, password, email, first_name, last_name, role)
-                VALUES (?, ?, ?, ?, ?, 'customer')
-            """, (username, password, em, fn, ln))
-            self.controller.db.conn.commit()
+            self.controller.db.create_user("customer", base_username, password, fn, ln, email=em)
             self.refresh_data()
             self.clear_fields()
         except Exception as e:
@@ -172,10 +182,8 @@ class CustomerView(ctk.CTkFrame):
             return
         
         try:
-            self.controller.db.cur.execute("""
-                UPDATE users SET first_name=?, last_name=?, email=? WHERE user_id=?
-            """, (self.first_name_var.get(), self.last_name_var.get(), self.email_var.get(), self.selected_user_id))
-            self.controller.db.conn.commit()
+            self.controller.db.update_user(self.selected_user_id, first_name=self.first_name_var.get(),
+                                           last_name=self.last_name_var.get(), email=self.email_var.get())
             self.refresh_data()
             messagebox.showinfo("Success", "Customer updated")
         except Exception as e:
@@ -1,20 +1,46 @@
 import customtkinter as ctk
 from tkinter import messagebox
+import datetime
+
+
+# dashboard figures: aggregate cache name -> (compute, tables it reads, ttl seconds).
+# the ttl also covers the day rolling over while the app is open.
+KPIS = {
+    "today.bookings": (lambda db: db.bookings_on(datetime.date.today()), ("appointments",), 30),
+    "today.takings": (lambda db: db.takings_on(datetime.date.today()), ("payments", "appointments"), 30),
+    "today.stylist_load": (lambda db: db.stylist_load_on(datetime.date.today()),
+                           ("appointments", "users", "services"), 60),
+}
+
+# how often stale figures are looked for while the dashboard is showing
+KPI_POLL_MS = 15000
+
 
 class DashboardView(ctk.CTkFrame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        self.kpi_labels = {}
+
+        for name, (compute, tables, ttl) in KPIS.items():
+            self.controller.db.aggregates.register(name, compute, tables, ttl)
+
         self.build_ui()
+        self.after(KPI_POLL_MS, self.poll_kpis)
 
     def build_ui(self):
         for widget in self.winfo_children():
             widget.destroy()
+        self.kpi_labels = {}
 
         ctk.CTkLabel(self, text="Management Dashboard", font=("Helvetica", 20)).pack(pady=20)
 
         print("DEBUG DASHBOARD: current_user =", self.controller.current_user)
 
+        # today's figures, drawn from the last known values straight away
+        if self.controller.has_role("staff", "admin"):
+            self.build_kpis()
+
         # customer management
         if self.controller.has_role("staff", "admin"):
             ctk.CTkButton(
@@ -48,6 +74,13 @@ class DashboardView(ctk.CTkFrame):
                 command=lambda: self.controller.show_view("PaymentView")
             ).pack(pady=10)
 
+        # event loop and query timings (also on F12)
+        if self.controller.has_role("admin"):
+            ctk.CTkButton(
+                self, text="Diagnostics",
+                command=self.controller.show_diagnostics
+            ).pack(pady=10)
+
         # logout
         ctk.CTkButton(
             self, text="Logout", fg_color="red",
@@ -56,6 +89,75 @@ class DashboardView(ctk.CTkFrame):
 
     def refresh_data(self):
         self.build_ui()
+        self.refresh_kpis()
+
+    # KPI tiles
+
+    def build_kpis(self):
+        kpi_frame = ctk.CTkFrame(self)
+        kpi_frame.pack(fill="x", padx=20, pady=(0, 10))
+
+        tiles = [("bookings", "Bookings Today"), ("no_shows", "No-Shows Today")]
+        if self.controller.has_role("admin"):
+            tiles.append(("takings", "Takings Today"))
+
+        self.kpi_labels = {}
+        for column, (key, title) in enumerate(tiles):
+            tile = ctk.CTkFrame(kpi_frame)
+            tile.grid(row=0, column=column, padx=10, pady=10, sticky="nsew")
+            kpi_frame.grid_columnconfigure(column, weight=1)
+
+            ctk.CTkLabel(tile, text=title, font=("Helvetica", 12)).pack(pady=(8, 0))
+            self.kpi_labels[key] = ctk.CTkLabel(tile, text="...", font=("Helvetica", 22, "bold"))
+            self.kpi_labels[key].pack(pady=(0, 8))
+
+        self.kpi_labels["load"] = ctk.CTkLabel(kpi_frame, text="", justify="left", anchor="w")
+        self.kpi_labels["load"].grid(row=1, column=0, columnspan=len(tiles), padx=10, pady=(0, 10), sticky="w")
+
+        for name in KPIS:
+            self.show_kpi(name)
+
+    def show_kpi(self, name, value=None):
+        # draws one cached figure, called again once a background refresh lands
+        value = value if value is not None else self.controller.db.aggregates.peek(name)
+        if value is None or not self.kpi_labels:
+            return
+
+        try:
+            if name == "today.bookings":
+                live = sum(n for status, n in value.items() if status not in ("cancelled", "no-show"))
+                self.kpi_labels["bookings"].configure(text=str(live))
+                self.kpi_labels["no_shows"].configure(text=str(value.get("no-show", 0)))
+            elif name == "today.takings" and "takings" in self.kpi_labels:
+                count, total = value
+                self.kpi_labels["takings"].configure(text=f"£{total:,.2f} ({count})")
+            elif name == "today.stylist_load":
+                lines = [f"{stylist}: {count} appts, {minutes // 60}h {minutes % 60:02d}m"
+                         for stylist, count, minutes in value[:5]]
+                self.kpi_labels["load"].configure(
+                    text="Stylist load today\n" + "\n".join(lines) if lines else "No stylist bookings today"
+                )
+        except Exception as e:
+            # the tiles were rebuilt (or destroyed) while the refresh was running
+            print(f"DEBUG: Could not show {name}: {e}")
+
+    def refresh_kpis(self):
+        # only figures whose TTL ran out or whose tables changed are recomputed. the
+        # freshness check reads table_versions (an HTTP call on a remote desk), so it
+        # runs in the job too, never on the UI thread
+        if not self.kpi_labels:
+            return
+        for name in KPIS:
+            self.controller.executor.submit(
+                f"dashboard.{name}", lambda db, name=name: db.aggregates.get(name),
+                on_done=lambda value, name=name: self.show_kpi(name, value),
+                on_error=lambda e, name=name: print(f"DEBUG: KPI {name} failed: {e}")
+            )
+
+    def poll_kpis(self):
+        if self.winfo_ismapped():
+            self.refresh_kpis()
+        self.after(KPI_POLL_MS, self.poll_kpis)
 
     def open_create_staff_popup(self):
         CreateStaffPopup(self.controller)
@@ -130,12 +232,8 @@ class CreateStaffPopup(ctk.CTkToplevel):
         hashed_pw = self.controller.db.hash_password(password)
 
         try:
-            self.controller.db.cur.execute("""
-                INSERT INTO users (username, password, first_name, last_name, email, phone_number, role)
-                VALUES (?, ?, ?, ?, ?, ?, 'staff')
-            """, (username, hashed_pw, first, last, email, phone))
+            self.controller.db.add_user("staff", username, hashed_pw, email, first, last, phone)
 
-            self.controller.db.conn.commit()
             messagebox.showinfo("Success", "Staff account created successfully.")
             self.destroy()
 
@@ -0,0 +1,114 @@
+import time
+import customtkinter as ctk
+from tkinter import ttk
+
+
+# how often the open window re-reads the figures
+REFRESH_MS = 2000
+
+
+# popup with what ui_monitor.py and query_stats.py have seen: event loop lag,
+# slow callbacks with their stacks, the slowest callbacks overall, and the
+# query summary. opened with F12 or from the dashboard.
+class DiagnosticsPopup(ctk.CTkToplevel):
+    def __init__(self, controller):
+        super().__init__()
+
+        self.controller = controller
+        self.title("Diagnostics")
+        self.geometry("900x600")
+        self.slow_entries = []
+
+        ctk.CTkLabel(self, text="Diagnostics", font=("Helvetica", 18, "bold")).pack(pady=(10, 0))
+        self.summary_label = ctk.CTkLabel(self, text="", justify="left")
+        self.summary_label.pack(pady=5)
+
+        tabs = ctk.CTkTabview(self)
+        tabs.pack(fill="both", expand=True, padx=10, pady=5)
+
+        # slow callbacks and stalls, newest first, with the stack of the selected one
+        slow_tab = tabs.add("Slow callbacks")
+        self.slow_tree = ttk.Treeview(slow_tab, columns=("time", "kind", "name", "ms"), show="headings", height=8)
+        for column, width in (("time", 80), ("kind", 120), ("name", 480), ("ms", 80)):
+            self.slow_tree.heading(column, text=column.title())
+            self.slow_tree.column(column, width=width, stretch=column == "name")
+        self.slow_tree.pack(fill="x")
+        self.slow_tree.bind("<<TreeviewSelect>>", self.on_slow_select)
+        self.stack_text = ctk.CTkTextbox(slow_tab, font=("Courier", 11))
+        self.stack_text.pack(fill="both", expand=True, pady=(5, 0))
+
+        # every callback seen, slowest first
+        callbacks_tab = tabs.add("Callbacks")
+        self.callback_tree = ttk.Treeview(callbacks_tab, columns=("name", "calls", "mean", "max", "slow"),
+                                          show="headings")
+        for column, width in (("name", 480), ("calls", 70), ("mean", 80), ("max", 80), ("slow", 60)):
+            self.callback_tree.heading(column, text=column.title())
+            self.callback_tree.column(column, width=width, stretch=column == "name")
+        self.callback_tree.pack(fill="both", expand=True)
+
+        queries_tab = tabs.add("Queries")
+        self.query_text = ctk.CTkTextbox(queries_tab, font=("Courier", 11), wrap="none")
+        self.query_text.pack(fill="both", expand=True)
+
+        ctk.CTkButton(self, text="Refresh", command=self.refresh).pack(pady=(0, 10))
+
+        self.refresh_id = None
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self):
+        if self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)
+
+        monitor = self.controller.monitor.snapshot()
+        beat = monitor["heartbeat"]
+        query_stats = self.controller.db.query_stats
+        self.summary_label.configure(
+            text=f"Event loop lag: p50 {beat['p50_ms']:g} ms, p95 {beat['p95_ms']:g} ms, "
+                 f"max {beat['max_ms']:.0f} ms over {beat['beats']} heartbeats, {beat['stalls']} stalls"
+                 f"\nSlow threshold {self.controller.monitor.slow_ms} ms (callbacks), "
+                 f"{query_stats.slow_ms} ms (queries)"
+        )
+
+        # only redrawn when something new was logged, so a selection stays put
+        slow = monitor["slow"][::-1]
+        if [entry["at"] for entry in slow] != [entry["at"] for entry in self.slow_entries]:
+            self.slow_entries = slow
+            self.slow_tree.delete(*self.slow_tree.get_children())
+            for i, entry in enumerate(slow):
+                stamp = time.strftime("%H:%M:%S", time.localtime(entry["at"]))
+                self.slow_tree.insert("", "end", iid=str(i),
+                                      values=(stamp, entry["kind"], entry["name"], f"{entry['ms']:.0f}"))
+
+        self.callback_tree.delete(*self.callback_tree.get_children())
+        for callback in monitor["callbacks"]:
+            self.callback_tree.insert("", "end", values=(
+                callback["name"], callback["calls"], f"{callback['mean_ms']:.1f}",
+                f"{callback['max_ms']:.1f}", callback["slow"]
+            ))
+
+        # a remote desk fetches the service's half of the summary over HTTP
+        self.controller.executor.submit(
+            "diagnostics.queries", lambda db: db.query_stats.summary(),
+            on_done=self.show_queries, on_error=lambda e: print(f"DEBUG: Query stats failed: {e}")
+        )
+
+        self.refresh_id = self.after(REFRESH_MS, self.refresh)
+
+    def show_queries(self, summary):
+        self.query_text.delete("1.0", "end")
+        self.query_text.insert("1.0", summary)
+
+    def on_slow_select(self, event=None):
+        selection = self.slow_tree.selection()
+        if not selection:
+            return
+        entry = self.slow_entries[int(selection[0])]
+        self.stack_text.delete("1.0", "end")
+        self.stack_text.insert("1.0", "".join(entry["stack"]) or "(no stack captured, it finished between samples)")
+
+    def close(self):
+        if self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)
+        self.controller.executor.cancel("diagnostics.queries")
+        self.destroy()
@@ -0,0 +1,32 @@
+# search-as-you-type for a view's search box. on_search() runs once typing
+# pauses for delay_ms (or straight away on Return); the view's search goes
+# through the query executor under one key, so a newer search interrupts the
+# one still running and stale results are never shown.
+class LiveSearch:
+    def __init__(self, entry, on_search, delay_ms=300):
+        self.entry = entry
+        self.on_search = on_search
+        self.delay_ms = delay_ms
+
+        self.pending = None    # after() id of the debounced search
+        self.searched = ""     # text of the last search that ran
+
+        entry.bind("<KeyRelease>", self.on_key)
+        entry.bind("<Return>", lambda e: self.search_now())
+
+    def on_key(self, event):
+        if event.keysym == "Return":
+            return
+        if self.pending is not None:
+            self.entry.after_cancel(self.pending)
+            self.pending = None
+        # arrows, shift and the like don't change the text
+        if self.entry.get() != self.searched:
+            self.pending = self.entry.after(self.delay_ms, self.search_now)
+
+    def search_now(self):
+        if self.pending is not None:
+            self.entry.after_cancel(self.pending)
+            self.pending = None
+        self.searched = self.entry.get()
+        self.on_search()
@@ -1,8 +1,17 @@
 import customtkinter as ctk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import datetime
 
+import exporter
+
+from views.live_search import LiveSearch
+from views.type_ahead import TypeAheadPicker
+from views.virtual_table import VirtualTable
+
 class PaymentView(ctk.CTkFrame):
+    # show_view skips refresh_data while none of these tables have changed
+    watch_tables = ("payments", "appointments", "users", "services")
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -20,34 +29,36 @@ class PaymentView(ctk.CTkFrame):
 
         self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search by customer name...")
         self.search_entry.pack(side="left", padx=10, pady=10, expand=True, fill="x")
+        # results follow the box as you type
+        self.live_search = LiveSearch(self.search_entry, self.refresh_payments)
 
-        ctk.CTkButton(search_frame, text="Search", width=100, command=self.refresh_payments).pack(side="left", padx=5)
+        ctk.CTkButton(search_frame, text="Search", width=100, command=lambda: self.live_search.search_now()).pack(side="left", padx=5)
         ctk.CTkButton(search_frame, text="Clear", width=100, fg_color="gray", command=self.clear_search).pack(side="left", padx=5)
 
-        # load appointments
-        self.appointments = self.controller.db.fetch_appointments_with_prices()
-        appointment_labels = []
-        self.appointment_map = {}
-
-        for appt in self.appointments:
-            appt_id, dt, customer, service, price = appt
-            label = f"#{appt_id} – {dt} – {customer} – {service}"
-            appointment_labels.append(label)
-            self.appointment_map[label] = appt
+        # shown while a query is running in the background
+        self.loading_label = ctk.CTkLabel(search_frame, text="", width=90)
+        self.loading_label.pack(side="left", padx=5)
 
         # input form
         form_frame = ctk.CTkFrame(self)
         form_frame.pack(fill="x", padx=20, pady=10)
 
-        self.appointment_var = ctk.StringVar()
         self.customer_var = ctk.StringVar()
         self.service_var = ctk.StringVar()
         self.amount_var = ctk.StringVar()
         self.method_var = ctk.StringVar(value="Cash")
         self.status_var = ctk.StringVar(value="pending")
 
-        ctk.CTkOptionMenu(form_frame, values=appointment_labels, variable=self.appointment_var,
-                          command=self.on_appointment_selected).grid(row=0, column=0, padx=10, pady=10)
+        # only unpaid or recent appointments are offered, searched by customer
+        # or "#id" while typing, see AppointmentRepository.payable
+        self.appointment_picker = TypeAheadPicker(
+            form_frame, controller, "payments.appointment_lookup",
+            lambda db, text, limit: db.appointments.payable(text, limit),
+            placeholder="Appointment (customer or #id)", format_row=self.appointment_label,
+            width=260, on_select=self.on_appointment_selected,
+            watch_tables=("appointments", "payments")
+        )
+        self.appointment_picker.grid(row=0, column=0, padx=10, pady=10)
 
         ctk.CTkEntry(form_frame, textvariable=self.customer_var, state="readonly").grid(row=0, column=1, padx=10, pady=10)
         ctk.CTkEntry(form_frame, textvariable=self.service_var, state="readonly").grid(row=0, column=2, padx=10, pady=10)
@@ -82,44 +93,69 @@ class PaymentView(ctk.CTkFrame):
         ctk.CTkButton(btn_frame, text="Add Payment", fg_color="green", command=self.add_payment).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Update Selected", command=self.update_payment).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Delete Selected", fg_color="red", command=self.delete_payment).pack(side="left", padx=5)
+        # the exports read with raw SQL, which needs the database file on this machine
+        if not self.controller.db.remote:
+            ctk.CTkButton(btn_frame, text="Export...", fg_color="gray", command=lambda: ExportPopup(self.controller)).pack(side="right", padx=5)
 
         # table
-        self.tree = ttk.Treeview(
-            self,
+        # only a window of rows is materialised, more are paged in while scrolling
+        self.table = VirtualTable(
+            self, self.controller, "payments", "fetch_payments_page",
             columns=("ID", "ApptID", "Customer", "Amount", "Card", "Method", "Status"),
-            show="headings"
+            on_loaded=self.show_payments, on_error=self.show_load_error
         )
+        self.tree = self.table.tree
 
         for col in ("ID", "ApptID", "Customer", "Amount", "Card", "Method", "Status"):
             self.tree.heading(col, text=col)
 
-        self.tree.pack(expand=True, fill="both", padx=20, pady=10)
+        self.table.pack(expand=True, fill="both", padx=20, pady=10)
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
         ctk.CTkButton(self, text="Back to Dashboard",
                       command=lambda: self.controller.show_view("DashboardView")).pack(pady=10)
 
-    def refresh_data(self):
+    def check_access(self):
         # access check (admin)
         if not self.controller.has_role("admin"):
             messagebox.showerror("Access Denied", "Only admins can access Payment Management.")
+            self.seen_versions = None  # make sure it loads once an admin gets here
             self.controller.show_view("DashboardView")
+            return False
+        return True
+
+    def refresh_data(self):
+        if not self.check_access():
             return
 
-        # reload table
+        # reload table, and the appointment list if it's open
+        self.appointment_picker.refresh()
         self.refresh_payments()
 
-
     # logic
 
-    def on_appointment_selected(self, label):
-        appt_id, dt, customer, service, price = self.appointment_map[label]
+    def appointment_label(self, appt):
+        label = f"#{appt.appointment_id} – {appt.appointment_datetime:%Y-%m-%d %H:%M} – {appt.customer_name} – {appt.service_name}"
+        if appt.amount_paid:
+            label += f" (£{appt.amount_paid:.2f} paid)"
+        return label
+
+    def on_appointment_selected(self, appt):
+        self.appointment_picker.set(appt.appointment_id,
+                                    f"#{appt.appointment_id} – {appt.appointment_datetime:%Y-%m-%d %H:%M} – {appt.customer_name}")
+
+        self.customer_var.set(appt.customer_name)
+        self.service_var.set(appt.service_name)
 
-        self.customer_var.set(customer)
-        self.service_var.set(service)
+        # auto-fill amount with what's still owed, or the service price
+        due = appt.price - appt.amount_paid
+        self.amount_var.set(str(round(due, 2) if due > 0 else appt.price))
 
-        # auto-fill amount with the service price
-        self.amount_var.set(str(price))
+    def clear_appointment(self):
+        self.appointment_picker.clear()
+        self.customer_var.set("")
+        self.service_var.set("")
+        self.amount_var.set("")
 
 
     def toggle_card_details(self):
@@ -129,53 +165,57 @@ class PaymentView(ctk.CTkFrame):
             self.card_frame.pack_forget()
 
     def refresh_payments(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         search = self.search_entry.get()
-        records = self.controller.db.fetch_all_payments(search)
 
-        for r in records:
-            self.tree.insert("", "end", values=r)
+        # pages are queried on a worker thread, show_payments is called back once the first one is in
+        self.loading_label.configure(text="Loading...")
+        self.table.load(search)
+
+    def show_payments(self, page):
+        self.loading_label.configure(text="")
+
+    def show_load_error(self, error):
+        self.seen_versions = None  # try again next time the view is shown
+        self.loading_label.configure(text="")
+        messagebox.showerror("DB Error", f"Could not load payments: {error}")
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
-        self.refresh_payments()
+        self.live_search.search_now()
 
     def on_tree_select(self, event):
         selected = self.tree.selection()
         if not selected:
             return
 
-        values = self.tree.item(selected)['values']
-        self.selected_payment_id = values[0]
+        # items are keyed by payment id
+        self.selected_payment_id = int(selected[0])
 
         # load payment details
-        details = self.controller.db.fetch_payment_details(self.selected_payment_id)
+        details = self.controller.db.payments.details(self.selected_payment_id)
         if not details:
             return
 
-        (pid, customer, service, amount, date, method, last4, expiry, holder) = details
-
-        self.amount_var.set(amount)
-        self.method_var.set(method)
-        self.status_var.set(values[5])
+        self.customer_var.set(details.customer_name or "")
+        self.service_var.set(details.service_name or "")
+        self.amount_var.set(details.amount)
+        self.method_var.set(details.payment_method or "Cash")
+        self.status_var.set(details.status)
 
-        if method == "Card":
+        if details.payment_method == "Card":
             self.toggle_card_details()
-            self.card_number_var.set("**** **** **** " + (last4 or ""))
-            self.card_expiry_var.set(expiry or "")
-            self.card_holder_var.set(holder or "")
+            self.card_number_var.set("**** **** **** " + (details.card_last4 or ""))
+            self.card_expiry_var.set(details.card_expiry or "")
+            self.card_holder_var.set(details.card_holder or "")
         else:
             self.toggle_card_details()
 
     def add_payment(self):
-        if not self.appointment_var.get():
+        appt_id = self.appointment_picker.get()
+        if appt_id is None:
             messagebox.showwarning("Missing", "Select an appointment first")
             return
 
-        appt_id = self.appointment_map[self.appointment_var.get()][0]
-
         try:
             amount = float(self.amount_var.get())
         except:
@@ -214,6 +254,7 @@ class PaymentView(ctk.CTkFrame):
             card_last4, card_expiry, card_holder
         )
 
+        self.clear_appointment()
         self.refresh_payments()
         messagebox.showinfo("Success", "Payment added")
 
@@ -267,3 +308,92 @@ class PaymentView(ctk.CTkFrame):
         if messagebox.askyesno("Confirm", "Delete this payment?"):
             self.controller.db.delete_payment(self.selected_payment_id)
             self.refresh_payments()
+
+
+# popup for accounting exports, written in the background with a progress bar
+class ExportPopup(ctk.CTkToplevel):
+    PERIODS = ["This month", "Last month", "This year", "Last year", "All time"]
+
+    def __init__(self, controller):
+        super().__init__()
+
+        self.controller = controller
+        self.title("Export")
+        self.geometry("360x360")
+
+        ctk.CTkLabel(self, text="Export", font=("Helvetica", 18, "bold")).pack(pady=10)
+
+        self.kind_var = ctk.StringVar(value="payments")
+        self.period_var = ctk.StringVar(value="This month")
+        self.format_var = ctk.StringVar(value="CSV")
+        self.gzip_var = ctk.BooleanVar(value=False)
+
+        ctk.CTkOptionMenu(self, values=sorted(exporter.EXPORTS), variable=self.kind_var).pack(pady=5)
+        ctk.CTkOptionMenu(self, values=self.PERIODS, variable=self.period_var).pack(pady=5)
+        ctk.CTkOptionMenu(self, values=["CSV", "JSON Lines"], variable=self.format_var).pack(pady=5)
+        ctk.CTkCheckBox(self, text="Compress (.gz)", variable=self.gzip_var).pack(pady=5)
+
+        self.progress_bar = ctk.CTkProgressBar(self)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=20, pady=10)
+        self.progress_label = ctk.CTkLabel(self, text="")
+        self.progress_label.pack()
+
+        self.export_button = ctk.CTkButton(self, text="Export", fg_color="green", command=self.start_export)
+        self.export_button.pack(pady=10)
+
+        # closing the popup cancels an export that's still running
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def period(self):
+        today = datetime.date.today()
+        period = self.period_var.get()
+        if period == "This month":
+            return exporter.month_range(today.year, today.month)
+        if period == "Last month":
+            last = today.replace(day=1) - datetime.timedelta(days=1)
+            return exporter.month_range(last.year, last.month)
+        if period == "This year":
+            return exporter.year_range(today.year)
+        if period == "Last year":
+            return exporter.year_range(today.year - 1)
+        return None, None
+
+    def start_export(self):
+        kind = self.kind_var.get()
+        start, end = self.period()
+        extension = ".jsonl" if self.format_var.get() == "JSON Lines" else ".csv"
+        if self.gzip_var.get():
+            extension += ".gz"
+
+        name = f"{kind}-{start[:7] if start else 'all'}{extension}"
+        path = filedialog.asksaveasfilename(parent=self, initialfile=name, defaultextension=extension)
+        if not path:
+            return
+
+        self.export_button.configure(state="disabled")
+        self.progress_label.configure(text="Starting...")
+        self.controller.executor.submit(
+            "export", lambda db, progress: exporter.export(db, kind, path, start, end, progress=progress),
+            on_done=self.show_done, on_error=self.show_error, on_progress=self.show_progress
+        )
+
+    def show_progress(self, value):
+        written, total = value
+        self.progress_bar.set(written / total if total else 1)
+        self.progress_label.configure(text=f"{written:,} of {total:,} rows")
+
+    def show_done(self, report):
+        self.progress_bar.set(1)
+        self.progress_label.configure(text=f"{report['rows']:,} rows in {report['seconds']:.1f}s")
+        self.export_button.configure(state="normal")
+        messagebox.showinfo("Export Complete", f"{report['rows']:,} {report['kind']} written to {report['path']}", parent=self)
+
+    def show_error(self, error):
+        self.progress_label.configure(text="")
+        self.export_button.configure(state="normal")
+        messagebox.showerror("Export Failed", f"Could not export: {error}", parent=self)
+
+    def close(self):
+        self.controller.executor.cancel("export")
+        self.destroy()
@@ -2,7 +2,14 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox
 import re
 
+from views.csv_import import import_csv
+from views.live_search import LiveSearch
+from views.virtual_table import VirtualTable
+
 class StaffView(ctk.CTkFrame):
+    # show_view skips refresh_data while none of these tables have changed
+    watch_tables = ("users",)
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -20,10 +27,16 @@ class StaffView(ctk.CTkFrame):
 
         self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search by name...")
         self.search_entry.pack(side="left", padx=10, pady=10, expand=True, fill="x")
+        # results follow the box as you type
+        self.live_search = LiveSearch(self.search_entry, self.refresh_data)
 
-        ctk.CTkButton(search_frame, text="Search", width=100, command=self.refresh_data).pack(side="left", padx=5)
+        ctk.CTkButton(search_frame, text="Search", width=100, command=lambda: self.live_search.search_now()).pack(side="left", padx=5)
         ctk.CTkButton(search_frame, text="Clear", width=100, fg_color="gray", command=self.clear_search).pack(side="left", padx=5)
 
+        # shown while a query is running in the background
+        self.loading_label = ctk.CTkLabel(search_frame, text="", width=90)
+        self.loading_label.pack(side="left", padx=5)
+
         # input form
         form_frame = ctk.CTkFrame(self)
         form_frame.pack(fill="x", padx=20, pady=10)
@@ -43,38 +56,38 @@ class StaffView(ctk.CTkFrame):
         ctk.CTkButton(btn_frame, text="Add Staff", fg_color="green", command=self.add_staff).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Update Selected", command=self.update_staff).pack(side="left", padx=5)
         ctk.CTkButton(btn_frame, text="Delete Selected", fg_color="red", command=self.delete_staff).pack(side="left", padx=5)
+        # the import writes with raw SQL, which needs the database file on this machine
+        if not self.controller.db.remote:
+            ctk.CTkButton(btn_frame, text="Import CSV", fg_color="gray", command=lambda: import_csv(self, "staff")).pack(side="left", padx=5)
 
         # table
-        self.tree = ttk.Treeview(self, columns=("ID", "Name", "Email Address", "Phone"), show="headings")
+        # only a window of rows is materialised, more are paged in while scrolling
+        self.table = VirtualTable(
+            self, self.controller, "staff", "fetch_staff_page",
+            columns=("ID", "Name", "Email Address", "Phone"),
+            format_row=lambda s: (s.user_id, s.full_name, s.email, s.phone_number or ""),
+            on_loaded=self.show_staff, on_error=self.show_load_error
+        )
+        self.tree = self.table.tree
         self.tree.heading("ID", text="ID")
         self.tree.heading("Name", text="Full Name")
         self.tree.heading("Email Address", text="Email Address")
         self.tree.heading("Phone", text="Phone")
-        self.tree.pack(expand=True, fill="both", padx=20, pady=10)
+        self.table.pack(expand=True, fill="both", padx=20, pady=10)
 
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
         ctk.CTkButton(self, text="Back to Dashboard",
                       command=lambda: self.controller.show_view("DashboardView")).pack(pady=10)
 
-    def refresh_data(self):
+    def check_access(self):
         # access check (admin role)
         if not self.controller.has_role("admin"):
             messagebox.showerror("Access Denied", "Only admins can access Staff Management.")
+            self.seen_versions = None  # make sure it loads once an admin gets here
             self.controller.show_view("DashboardView")
-            return
-
-        # clear table
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        search_term = self.search_entry.get()
-        staff_members = self.controller.db.fetch_all_staff(search_term)
-
-        for s in staff_members:
-            full_name = f"{s[1]} {s[2]}"
-            self.tree.insert("", "end", values=(s[0], full_name, s[3], s[4]))
-
+            return False
+        return True
 
     # validation
 
@@ -104,19 +117,26 @@ class StaffView(ctk.CTkFrame):
     # refresh table
 
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if not self.check_access():
+            return
 
         search_term = self.search_entry.get()
-        staff_members = self.controller.db.fetch_all_staff(search_term)
 
-        for s in staff_members:
-            full_name = f"{s[1]} {s[2]}"
-            self.tree.insert("", "end", values=(s[0], full_name, s[3], s[4]))
+        # pages are queried on a worker thread, show_staff is called back once the first one is in
+        self.loading_label.configure(text="Loading...")
+        self.table.load(search_term)
+
+    def show_staff(self, page):
+        self.loading_label.configure(text="")
+
+    def show_load_error(self, error):
+        self.seen_versions = None  # try again next time the view is shown
+        self.loading_label.configure(text="")
+        messagebox.showerror("DB Error", f"Could not load staff: {error}")
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
-        self.refresh_data()
+        self.live_search.search_now()
 
     # row selection
 
@@ -125,13 +145,16 @@ class StaffView(ctk.CTkFrame):
         if not selected:
             return
 
-        values = self.tree.item(selected)['values']
-        self.selected_staff_id = values[0]
+        # items are keyed by user id. names and phone numbers come from the
+        # row, the Treeview would split "Mary Ann" and drop a phone's leading 0
+        staff = self.controller.db.users.get(int(selected[0]))
+        if staff is None:
+            return
 
-        name = values[1].split(" ")
-        self.first_name_var.set(name[0])
-        self.last_name_var.set(name[1] if len(name) > 1 else "")
-        self.phone_var.set(values[3])
+        self.selected_staff_id = staff.user_id
+        self.first_name_var.set(staff.first_name or "")
+        self.last_name_var.set(staff.last_name or "")
+        self.phone_var.set(staff.phone_number or "")
 
     # add staff
 
@@ -143,25 +166,12 @@ class StaffView(ctk.CTkFrame):
 
         # generate a username from first+last
         base_username = (fn + ln).lower()
-        username = base_username
-        counter = 1
-
-        # ensure unique username
-        self.controller.db.cur.execute("SELECT username FROM users WHERE username=?", (username,))
-        while self.controller.db.cur.fetchone():
-            username = f"{base_username}{counter}"
-            counter += 1
-            self.controller.db.cur.execute("SELECT username FROM users WHERE username=?", (username,))
 
         password = self.controller.db.hash_password("password123")
 
         try:
-            self.controller.db.cur.execute("""
-                INSERT INTO users (username, password, email, first_name, last_name, phone_number, role, status)
-                VALUES (?, ?, ?, ?, ?, ?, 'staff', 'active')
-            """, (username, password, f"{username}@salon.com", fn, ln, ph))
+            self.controller.db.create_user("staff", base_username, password, fn, ln, phone_number=ph)
 
-            self.controller.db.conn.commit()
             self.refresh_data()
             self.clear_fields()
 
@@ -180,18 +190,13 @@ class StaffView(ctk.CTkFrame):
             return
 
         try:
-            self.controller.db.cur.execute("""
-                UPDATE users 
-                SET first_name=?, last_name=?, phone_number=?
-                WHERE user_id=?
-            """, (
-                self.first_name_var.get(),
-                self.last_name_var.get(),
-                self.phone_var.get(),
-                self.selected_staff_id
-            ))
-
-            self.controller.db.conn.commit()
+            self.controller.db.update_user(
+                self.selected_staff_id,
+                first_name=self.first_name_var.get(),
+                last_name=self.last_name_var.get(),
+                phone_number=self.phone_var.get()
+            )
+
             self.refresh_data()
             messagebox.showinfo("Success", "Staff updated.")
 
@@ -207,8 +212,7 @@ class StaffView(ctk.CTkFrame):
 
         if messagebox.askyesno("Confirm", "Delete this staff member?"):
             try:
-                self.controller.db.cur.execute("DELETE FROM users WHERE user_id=?", (self.selected_staff_id,))
-                self.controller.db.conn.commit()
+                self.controller.db.delete_user(self.selected_staff_id)
 
                 self.refresh_data()
                 self.clear_fields()
@@ -223,8 +227,3 @@ class StaffView(ctk.CTkFrame):
         self.first_name_var.set("")
         self.last_name_var.set("")
         self.phone_var.set("")
-
-def refresh_data(self):
-    if not self.controller.has_role("admin"):
-        self.controller.show_view("DashboardView")
-        return
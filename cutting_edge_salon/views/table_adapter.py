@@ -0,0 +1,149 @@
+# keeps a ttk.Treeview in step with query results by primary key. instead of
+# deleting every item and inserting them all again, each refresh is diffed
+# against what the tree already shows and only the inserts, updates, deletes
+# and moves are applied. items keep their iid (the primary key), so the
+# selection and scroll position survive a refresh.
+
+
+def stable_items(survivors, new_position):
+    # longest run of surviving items that are already in the right relative
+    # order (longest increasing subsequence of their new positions). those stay
+    # where they are, everything else has to move.
+    tails = []       # tails[k] = index into survivors ending the best run of length k+1
+    previous = [-1] * len(survivors)
+
+    for i, iid in enumerate(survivors):
+        pos = new_position[iid]
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if new_position[survivors[tails[mid]]] < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            previous[i] = tails[lo - 1]
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+
+    stable = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        stable.add(survivors[i])
+        i = previous[i]
+    return stable
+
+
+class TableAdapter:
+    def __init__(self, tree, row_id=None, format_row=None):
+        self.tree = tree
+        self.row_id = row_id or (lambda row: row[0])
+        self.format_row = format_row
+
+        # iid -> seek key / displayed values for every item in the tree
+        self.keys = {}
+        self.values = {}
+
+    def prepare(self, page):
+        # (iid, key, values) for a page of (key, row) pairs
+        prepared = []
+        for key, row in page:
+            values = tuple(self.format_row(row) if self.format_row else row)
+            prepared.append((str(self.row_id(row)), key, values))
+        return prepared
+
+    # whole-window refresh
+
+    def reconcile(self, page):
+        prepared = self.prepare(page)
+        new_ids = [iid for iid, _, _ in prepared]
+        new_position = {iid: i for i, iid in enumerate(new_ids)}
+
+        current = self.tree.get_children()
+        removed = [iid for iid in current if iid not in new_position]
+        survivors = [iid for iid in current if iid in new_position]
+
+        if removed:
+            self.tree.delete(*removed)
+            for iid in removed:
+                del self.keys[iid]
+                del self.values[iid]
+
+        stable = stable_items(survivors, new_position)
+        movers = [iid for iid in survivors if iid not in stable]
+        if movers:
+            # detached items keep their values, they are re-attached in place below
+            self.tree.detach(*movers)
+
+        inserted = updated = 0
+        previous = None
+        for iid, key, values in prepared:
+            if iid not in stable:
+                # everything already in the tree is in the right order, so the
+                # right place is straight after the previous row of the new order
+                index = self.tree.index(previous) + 1 if previous is not None else 0
+                if iid in self.values:
+                    self.tree.move(iid, "", index)
+                else:
+                    self.tree.insert("", index, iid=iid, values=values)
+                    inserted += 1
+
+            if iid in self.values and self.values[iid] != values:
+                self.tree.item(iid, values=values)
+                updated += 1
+
+            self.keys[iid] = key
+            self.values[iid] = values
+            previous = iid
+
+        return {"inserted": inserted, "updated": updated, "deleted": len(removed), "moved": len(movers)}
+
+    # paging at either end
+
+    def add_page(self, page, at_top=False):
+        prepared = self.prepare(page)
+        if at_top:
+            prepared.reverse()
+
+        for iid, key, values in prepared:
+            if iid in self.values:
+                # the row moved between page loads, drop the stale copy
+                self.tree.delete(iid)
+            self.tree.insert("", 0 if at_top else "end", iid=iid, values=values)
+            self.keys[iid] = key
+            self.values[iid] = values
+
+    def trim(self, count, from_top):
+        # removes count rows from one end, returns the seek key of the row
+        # closest to the rows that are kept
+        ids = self.tree.get_children()
+        removed = ids[:count] if from_top else ids[len(ids) - count:]
+        if not removed:
+            return None
+
+        edge_key = self.keys[removed[-1] if from_top else removed[0]]
+        self.tree.delete(*removed)
+        for iid in removed:
+            del self.keys[iid]
+            del self.values[iid]
+        return edge_key
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.keys.clear()
+        self.values.clear()
+
+    # lookups
+
+    def __len__(self):
+        return len(self.keys)
+
+    def first_key(self):
+        ids = self.tree.get_children()
+        return self.keys[ids[0]] if ids else None
+
+    def last_key(self):
+        ids = self.tree.get_children()
+        return self.keys[ids[-1]] if ids else None
@@ -0,0 +1,179 @@
+import customtkinter as ctk
+import tkinter as tk
+
+
+# an entry with a drop-down list of matches, in place of an option menu that
+# would have to hold every customer. typing waits for a short pause, then runs
+# search(db, text, limit) through the query executor; a newer keystroke
+# supersedes the query still running. the picker holds the chosen id, the text
+# in the box is only for show. given watch_tables, the open list is searched
+# again whenever one of those tables changes. the version counters are read
+# by executor jobs too, a remote desk fetches them over HTTP.
+class TypeAheadPicker(ctk.CTkFrame):
+    def __init__(self, parent, controller, name, search, placeholder="",
+                 format_row=None, limit=10, delay_ms=200, width=200, on_select=None,
+                 watch_tables=None, watch_ms=1000):
+        super().__init__(parent, fg_color="transparent")
+        self.controller = controller
+        self.name = name              # executor key
+        self.search = search          # search(db, text, limit) -> [(id, label, ...)]
+        self.format_row = format_row or (lambda row: row[1])
+        self.limit = limit
+        self.delay_ms = delay_ms
+        self.on_select = on_select
+        self.watch_tables = watch_tables
+        self.watch_ms = watch_ms
+
+        self.selected_id = None
+        self.selected_label = ""
+        self.results = []
+        self.pending = None          # after() id of the debounced search
+        self.watching = None         # after() id of the table version check
+        self.searched_versions = None
+
+        self.text_var = tk.StringVar()
+        self.entry = ctk.CTkEntry(self, placeholder_text=placeholder, textvariable=self.text_var, width=width)
+        self.entry.pack(fill="x")
+
+        # the list floats under the entry in its own borderless window
+        self.popup = tk.Toplevel(self)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.listbox = tk.Listbox(self.popup, height=limit, activestyle="dotbox", exportselection=False)
+        self.listbox.pack(fill="both", expand=True)
+
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<Down>", self.focus_list)
+        self.entry.bind("<Return>", lambda e: self.choose(0))
+        self.entry.bind("<Escape>", lambda e: self.hide())
+        self.entry.bind("<FocusOut>", lambda e: self.after(150, self.hide_if_unfocused))
+        self.entry.bind("<FocusIn>", lambda e: self.schedule_search())
+
+        self.listbox.bind("<ButtonRelease-1>", lambda e: self.choose(self.current_index()))
+        self.listbox.bind("<Return>", lambda e: self.choose(self.current_index()))
+        self.listbox.bind("<Escape>", lambda e: (self.hide(), self.entry.focus_set()))
+        self.listbox.bind("<FocusOut>", lambda e: self.after(150, self.hide_if_unfocused))
+
+    # value
+
+    def get(self):
+        return self.selected_id
+
+    def set(self, row_id, label):
+        self.selected_id = row_id
+        self.selected_label = label
+        self.text_var.set(label)
+        self.hide()
+
+    def clear(self):
+        self.set(None, "")
+
+    # searching
+
+    def on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        # editing the text drops the previous choice
+        if self.text_var.get() != self.selected_label:
+            self.selected_id = None
+        self.schedule_search()
+
+    def schedule_search(self):
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(self.delay_ms, self.run_search)
+
+    def refresh(self):
+        # search again if the list is open, e.g. after the view saw a change
+        if self.popup.winfo_ismapped():
+            self.run_search()
+
+    def run_search(self):
+        self.pending = None
+        text = "" if self.selected_id is not None else self.text_var.get().strip()
+        search, limit, tables = self.search, self.limit, self.watch_tables
+
+        def lookup(db):
+            # versions first, a write during the search shows up as a change
+            versions = db.table_versions(tables) if tables else None
+            return versions, search(db, text, limit)
+
+        self.controller.executor.submit(
+            self.name, lookup,
+            on_done=self.show_results, on_error=lambda e: print(f"DEBUG: {self.name} lookup failed: {e}")
+        )
+
+    def show_results(self, result):
+        self.searched_versions, rows = result
+        self.results = rows
+        self.listbox.delete(0, "end")
+        for row in rows:
+            self.listbox.insert("end", self.format_row(row))
+
+        if rows and self.has_focus():
+            self.show()
+        else:
+            self.hide()
+
+    # drop-down list
+
+    def show(self):
+        self.popup.geometry(f"{self.entry.winfo_width()}x{min(len(self.results), self.limit) * 18 + 4}"
+                            f"+{self.entry.winfo_rootx()}+{self.entry.winfo_rooty() + self.entry.winfo_height()}")
+        self.popup.deiconify()
+        self.popup.lift()
+        if self.watch_tables and self.watching is None:
+            self.watching = self.after(self.watch_ms, self.check_tables)
+
+    def hide(self):
+        self.popup.withdraw()
+        if self.watching is not None:
+            self.after_cancel(self.watching)
+            self.watching = None
+
+    def check_tables(self):
+        # while the list is open, a write to a watched table (from here or
+        # another connection) brings in fresh results
+        self.watching = self.after(self.watch_ms, self.check_tables)
+        tables = self.watch_tables
+        self.controller.executor.submit(
+            f"{self.name}.watch", lambda db: db.table_versions(tables),
+            on_done=self.tables_checked,
+            on_error=lambda e: print(f"DEBUG: {self.name} version check failed: {e}")
+        )
+
+    def tables_checked(self, versions):
+        if self.watching is not None and self.pending is None and versions != self.searched_versions:
+            self.run_search()
+
+    def has_focus(self):
+        # the entry's inner tk widget or the list
+        focus = self.focus_get()
+        return focus is not None and (str(focus).startswith(str(self.entry)) or focus == self.listbox)
+
+    def hide_if_unfocused(self):
+        if not self.has_focus():
+            self.hide()
+
+    def focus_list(self, event):
+        if self.results:
+            self.show()
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, "end")
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def current_index(self):
+        selection = self.listbox.curselection()
+        return selection[0] if selection else 0
+
+    def choose(self, index):
+        if index >= len(self.results):
+            return "break"
+        row = self.results[index]
+        self.set(row[0], row[1])
+        self.entry.focus_set()
+        if self.on_select:
+            self.on_select(row)
+        return "break"
@@ -0,0 +1,151 @@
+import customtkinter as ctk
+from tkinter import ttk
+
+from views.table_adapter import TableAdapter
+
+
+# a Treeview that only ever holds a sliding window of rows. pages are pulled
+# through the query executor with the Database keyset page methods as the user
+# scrolls towards either edge, and rows that scroll far out of view are dropped,
+# so memory and redraw cost stay flat however big the table gets.
+# reloading the same search re-reads the current window and reconciles it by
+# primary key, so only the rows that changed are redrawn.
+class VirtualTable(ctk.CTkFrame):
+    def __init__(self, parent, controller, name, page_method, columns,
+                 page_size=100, max_pages=3, edge=0.15,
+                 row_id=None, format_row=None, on_loaded=None, on_error=None):
+        super().__init__(parent, fg_color="transparent")
+        self.controller = controller
+        self.name = name                # executor key, a new load supersedes the old one
+        self.page_method = page_method  # Database.fetch_*_page method name
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.edge = edge                # how close to an edge (as a fraction) before prefetching
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+
+        self.search_term = None
+        self.start_after = None  # seek key of the row just above the window, None at the top
+        self.at_start = True
+        self.at_end = True
+        self.loading = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scrolled)
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+
+        # rows are keyed by primary key (the first column unless row_id says otherwise)
+        self.rows = TableAdapter(self.tree, row_id=row_id, format_row=format_row)
+
+    # loading
+
+    def load(self, search_term=""):
+        # any page still in flight is cancelled by the new request
+        self.loading = True
+
+        if search_term == self.search_term and len(self.rows):
+            # same search, re-read the window the user is looking at
+            limit = max(len(self.rows), self.page_size)
+            self.request(self.start_after, None, limit,
+                         lambda page: self.show_window(page, limit, keep_view=True))
+        else:
+            # new search, start again from the top
+            self.search_term = search_term
+            self.start_after = None
+            self.request(None, None, self.page_size,
+                         lambda page: self.show_window(page, self.page_size, keep_view=False))
+
+    def request(self, after, before, limit, callback):
+        search_term = self.search_term
+        method = self.page_method
+
+        self.controller.executor.submit(
+            self.name,
+            lambda db: getattr(db, method)(search_term, after, before, limit),
+            on_done=callback, on_error=self.show_error
+        )
+
+    def show_window(self, page, limit, keep_view):
+        self.loading = False
+        self.at_start = self.start_after is None
+        self.at_end = len(page) < limit
+
+        top = self.first_visible()
+        self.rows.reconcile(page)
+
+        if keep_view and len(self.rows):
+            self.tree.yview_moveto(min(top, len(self.rows)) / len(self.rows))
+        else:
+            self.tree.yview_moveto(0)
+
+        if self.on_loaded:
+            self.on_loaded(page)
+
+    def show_error(self, error):
+        self.loading = False
+        if self.on_error:
+            self.on_error(error)
+
+    # scrolling
+
+    def on_tree_scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+
+        if self.loading or not len(self.rows):
+            return
+
+        first, last = float(first), float(last)
+        if last >= 1 - self.edge and not self.at_end:
+            self.loading = True
+            self.request(self.rows.last_key(), None, self.page_size, self.show_next_page)
+        elif first <= self.edge and not self.at_start:
+            # one extra row, it becomes the new start_after if there is more above
+            self.loading = True
+            self.request(None, self.rows.first_key(), self.page_size + 1, self.show_previous_page)
+
+    def first_visible(self):
+        return int(round(self.tree.yview()[0] * len(self.rows)))
+
+    def show_next_page(self, page):
+        self.loading = False
+        if len(page) < self.page_size:
+            self.at_end = True
+        if not page:
+            return
+
+        top = self.first_visible()
+        self.rows.add_page(page)
+
+        # drop rows from the top once the window is full
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.start_after = self.rows.trim(excess, from_top=True)
+            self.at_start = False
+            top -= excess
+
+        self.tree.yview_moveto(max(top, 0) / len(self.rows))
+
+    def show_previous_page(self, page):
+        self.loading = False
+        if len(page) > self.page_size:
+            self.start_after = page[0][0]
+            page = page[1:]
+        else:
+            self.start_after = None
+            self.at_start = True
+        if not page:
+            return
+
+        top = self.first_visible() + len(page)
+        self.rows.add_page(page, at_top=True)
+
+        # drop rows from the bottom once the window is full
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.rows.trim(excess, from_top=False)
+            self.at_end = False
+
+        self.tree.yview_moveto(top / len(self.rows))
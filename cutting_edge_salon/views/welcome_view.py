@@ -1,27 +1,15 @@
 import customtkinter as ctk
 import os
-from PIL import Image
 
 class WelcomeView(ctk.CTkFrame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
 
-        # load logo
-        try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            logo_path = os.path.join(base_dir, "assets", "logo.png") #looks in folder of system 
-
-            self.logo_img = ctk.CTkImage(
-                light_image=Image.open(logo_path),
-                dark_image=Image.open(logo_path),
-                size=(250, 250)  # slightly larger for the welcome screen
-            )
-
-            self.logo_label = ctk.CTkLabel(self, image=self.logo_img, text="")
-            self.logo_label.pack(pady=(30, 10))
-        except Exception as e:
-            print(f"DEBUG: Welcome logo error: {e}")
+        # logo placeholder, the image itself is decoded once the first frame is up
+        self.logo_label = ctk.CTkLabel(self, text="", width=250, height=250)
+        self.logo_label.pack(pady=(30, 10))
+        self.after_idle(self.load_logo)
 
         # GUI
         self.label = ctk.CTkLabel(
@@ -49,4 +37,22 @@ class WelcomeView(ctk.CTkFrame):
             width=200,
             command=self.quit
         )
-        self.exit_btn.pack(pady=10)
\ No newline at end of file
+        self.exit_btn.pack(pady=10)
+
+    def load_logo(self):
+        try:
+            # PIL is only imported here so it stays off the startup path
+            from PIL import Image
+
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            logo_path = os.path.join(base_dir, "assets", "logo.png") #looks in folder of system 
+
+            self.logo_img = ctk.CTkImage(
+                light_image=Image.open(logo_path),
+                dark_image=Image.open(logo_path),
+                size=(250, 250)  # slightly larger for the welcome screen
+            )
+
+            self.logo_label.configure(image=self.logo_img)
+        except Exception as e:
+            print(f"DEBUG: Welcome logo error: {e}")
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# the app is run from cutting_edge_salon/ (python main.py): its modules import
+# each other by bare name (import models) and it opens its files from there
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cutting_edge_salon")
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture(autouse=True)
+def in_app_dir(monkeypatch):
+    monkeypatch.chdir(APP_DIR)
@@ -0,0 +1,40 @@
+import datetime
+
+from availability import free_slots, overlaps, round_up
+
+
+def at(day, hour, minute=0):
+    return datetime.datetime(2026, 10, day, hour, minute)
+
+
+def test_free_day_starts_at_opening():
+    assert free_slots([], at(19, 7), 60, 3) == [at(19, 9), at(19, 9, 15), at(19, 9, 30)]
+
+
+def test_start_is_rounded_up_to_a_slot():
+    assert round_up(at(19, 10, 7), 15) == at(19, 10, 15)
+    assert round_up(at(19, 10, 15), 15) == at(19, 10, 15)
+    assert free_slots([], at(19, 10, 7), 30, 1) == [at(19, 10, 15)]
+
+
+def test_skips_busy_intervals():
+    busy = [(at(19, 9), at(19, 9, 50), "cut"), (at(19, 10, 30), at(19, 11), "colour")]
+    # 09:50 rounds up to 10:00, 10:00-10:30 fits, 10:15 would run into the colour
+    assert free_slots(busy, at(19, 9), 30, 3) == [at(19, 10), at(19, 11), at(19, 11, 15)]
+
+
+def test_slot_must_end_by_closing():
+    assert free_slots([], at(19, 17, 30), 60, 1) == [at(20, 9)]
+    assert free_slots([], at(19, 17), 60, 1) == [at(19, 17)]
+
+
+def test_nothing_free_within_horizon():
+    busy = [(at(19, 9), at(19, 18)), (at(20, 9), at(20, 18))]
+    assert free_slots(busy, at(19, 9), 30, 1, horizon_days=1) == []
+    assert free_slots(busy, at(19, 9), 30, 1, horizon_days=2) == [at(21, 9)]
+
+
+def test_overlaps_is_half_open():
+    busy = [(at(19, 9), at(19, 10))]
+    assert overlaps(busy, at(19, 10), at(19, 11)) is None
+    assert overlaps(busy, at(19, 9, 30), at(19, 10, 30)) == busy[0]
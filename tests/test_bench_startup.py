@@ -0,0 +1,34 @@
+import bench_startup
+import main
+
+
+def report(**metrics):
+    return {"imports": {"import:database": 20.0}, "sizes": {"1000": metrics}}
+
+
+def test_unbudgeted_phase_fails():
+    budgets = {"import:database": 40.0, "db_init": 8.0}
+    assert bench_startup.check_budgets(report(db_init=2.0), budgets) == []
+
+    regressions = bench_startup.check_budgets(report(db_init=2.0, **{"view_build:StaffView": 30.0}), budgets)
+    assert len(regressions) == 1 and "view_build:StaffView" in regressions[0] and "no budget" in regressions[0]
+
+
+def test_over_budget_fails():
+    regressions = bench_startup.check_budgets(report(db_init=9.0), {"import:database": 40.0, "db_init": 8.0})
+    assert regressions == ["db_init @ 1000 appointments: 9.0 ms > budget 8.0 ms"]
+
+
+def test_skipped_phases_are_listed():
+    budgets = {"import:database": 40.0, "db_init": 8.0, "startup:welcome": 200.0}
+    assert bench_startup.unmeasured(report(db_init=2.0), budgets) == ["startup:welcome"]
+
+
+def test_every_measured_phase_is_budgeted():
+    budgets = bench_startup.load_budgets()
+    # WelcomeView is built by startup itself, LoginView has nothing to refresh
+    views = [name for name in main.VIEW_MODULES if name != "WelcomeView"]
+    expected = {"db_init", "startup:welcome"} | {f"import:{m}" for m in bench_startup.IMPORT_MODULES}
+    expected |= {f"view_build:{name}" for name in views}
+    expected |= {f"first_refresh:{name}" for name in views if name != "LoginView"}
+    assert expected <= set(budgets)
@@ -0,0 +1,85 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import migrations
+from database import Database
+
+MONDAY = datetime.datetime(2030, 1, 7, 10, 0)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "salon.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def booking(db):
+    service_id = db.write("INSERT INTO services (service_name, price, duration_minutes) VALUES ('Cut', 30, 60)").lastrowid
+    stylist_id = db.add_user("stylist", "sam", "x", "sam@salon.com", "Sam", "Cole")
+    customer_id = db.add_user("customer", "ann_user", "x", "ann@example.com", "Ann", "Lee")
+
+    def book(when, status="Booked"):
+        return db.add_appointment(customer_id, stylist_id, service_id, when, "", status)
+    book.args = (customer_id, stylist_id, service_id)
+    return book
+
+
+def overlapping_pair(db, book):
+    # two live bookings on top of each other, as data from before the check
+    # (or typed straight into the file) can have
+    first = book(MONDAY)
+    conn = sqlite3.connect(db.path)
+    try:
+        conn.execute("DROP TRIGGER appointments_no_overlap_insert")
+        conn.commit()
+        second = book(MONDAY + datetime.timedelta(minutes=30))
+        conn.execute(migrations.no_double_booking_trigger("INSERT", False, migrations.EPOCH_TIME_SQL))
+        conn.commit()
+    finally:
+        conn.close()
+    return first, second
+
+
+def status(db, appointment_id):
+    return db.read("SELECT status FROM appointments WHERE appointment_id = ?", (appointment_id,)).fetchone()[0]
+
+
+def test_new_overlap_is_refused(db, booking):
+    booking(MONDAY)
+    with pytest.raises(sqlite3.IntegrityError, match="already booked"):
+        booking(MONDAY + datetime.timedelta(minutes=30))
+    booking(MONDAY + datetime.timedelta(minutes=60))
+
+
+def test_status_change_on_existing_overlap(db, booking):
+    first, second = overlapping_pair(db, booking)
+    customer_id, stylist_id, service_id = booking.args
+
+    # finishing either booking doesn't touch the slot
+    db.update_appointment(first, customer_id, stylist_id, service_id, MONDAY, "done", "Completed")
+    db.set_appointment_statuses([second], "Completed")
+    assert status(db, first) == status(db, second) == "Completed"
+
+
+def test_slot_change_and_rebooking_are_checked(db, booking):
+    first, second = overlapping_pair(db, booking)
+    customer_id, stylist_id, service_id = booking.args
+
+    # moving it to another time that still overlaps
+    with pytest.raises(sqlite3.IntegrityError):
+        db.update_appointment(second, customer_id, stylist_id, service_id,
+                              MONDAY + datetime.timedelta(minutes=15), "", "Booked")
+
+    # a cancelled booking can't come back into a taken slot
+    db.set_appointment_statuses([second], "Cancelled")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.set_appointment_statuses([second], "Booked")
+    assert status(db, second) == "Cancelled"
+
+    # but it can be moved somewhere free
+    db.update_appointment(second, customer_id, stylist_id, service_id,
+                          MONDAY + datetime.timedelta(hours=2), "", "Booked")
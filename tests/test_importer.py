@@ -0,0 +1,111 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import importer
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "salon.db"))
+    yield db
+    db.close()
+
+
+def user(db, username, *columns):
+    conn = sqlite3.connect(db.path)
+    try:
+        return conn.execute(f"SELECT {', '.join(columns)} FROM users WHERE username = ?", (username,)).fetchone()
+    finally:
+        conn.close()
+
+
+def import_text(db, tmp_path, kind, text, chunk_size=importer.CHUNK_SIZE):
+    path = tmp_path / f"{kind}.csv"
+    path.write_text(text, encoding="utf-8")
+    return importer.import_csv(db, kind, str(path), chunk_size)
+
+
+def test_customers_rejects_bad_rows_by_line(db, tmp_path):
+    report = import_text(db, tmp_path, "customers", "\n".join([
+        "First_Name,Last_Name,Email",
+        "Ann,Lee,ann@example.com",
+        "Bob,Ray,not-an-email",
+        "Cy,,cy@example.com",
+        "Dee,Moss,ANN@example.com",
+        "Eve,Hart,eve@example.com",
+    ]) + "\n")
+
+    assert report["imported"] == 2
+    assert [line for line, _ in report["errors"]] == [3, 4, 5]
+    assert "valid email" in report["errors"][0][1]
+    assert "already registered" in report["errors"][2][1]
+
+    assert user(db, "ann_user", "first_name", "password") == ("Ann", db.hash_password(importer.DEFAULT_PASSWORD))
+    # the search index is kept up to date by its trigger
+    assert [row[3] for _, row in db.fetch_customers_page("Hart")] == ["eve@example.com"]
+
+
+def test_missing_column_stops_before_any_row(db, tmp_path):
+    with pytest.raises(ValueError, match="last_name"):
+        import_text(db, tmp_path, "customers", "first_name,email\nAnn,ann@example.com\n")
+    assert db.fetch_all_customers() == []
+
+
+def test_staff_usernames_and_emails_are_unique(db, tmp_path):
+    report = import_text(db, tmp_path, "staff", "\n".join([
+        "first_name,last_name,phone_number,role",
+        "Sam,Cole,07123456789,stylist",
+        "Sam,Cole,07123456780,stylist",
+        "Kim,Lo,123,stylist",
+        "Jo,Park,07123456781,manager",
+    ]) + "\n")
+
+    assert report["imported"] == 2
+    assert [line for line, _ in report["errors"]] == [4, 5]
+    assert user(db, "samcole", "email") == ("samcole@salon.com",)
+    assert user(db, "samcole1", "email") == ("samcole1@salon.com",)
+
+
+def test_double_booking_is_reported_and_the_rest_imported(db, tmp_path):
+    import_text(db, tmp_path, "services", "service_name,price,duration_minutes\nCut,30,60\n")
+    import_text(db, tmp_path, "staff", "first_name,last_name,phone_number\nSam,Cole,07123456789\n")
+    import_text(db, tmp_path, "customers", "first_name,last_name,email\nAnn,Lee,ann@example.com\n")
+
+    day = (datetime.date.today() + datetime.timedelta(days=7)).isoformat()
+    report = import_text(db, tmp_path, "appointments", "\n".join([
+        "customer,stylist,service,appointment_datetime",
+        f"ann_user,samcole,Cut,{day} 10:00",
+        f"ann_user,samcole,Cut,{day} 10:30",
+        f"Ann Lee,Sam Cole,Cut,{day} 11:00",
+        f"ann_user,samcole,Perm,{day} 12:00",
+        f"ann_user,samcole,Cut,{day} 9am",
+    ]) + "\n", chunk_size=2)
+
+    assert report["imported"] == 2
+    assert report["errors"] == [
+        (3, "Stylist is already booked at that time"),
+        (5, "Unknown service 'Perm'."),
+        (6, "Please use YYYY-MM-DD HH:MM format."),
+    ]
+    assert len(db.fetch_all_appointments()) == 2
+
+
+def test_each_chunk_commits_on_its_own(db, tmp_path, monkeypatch):
+    # the writer is let go between chunks, so the desks' writes aren't held up by the whole file
+    held = []
+    transaction = db.transaction
+
+    def counted():
+        held.append(db.connections.writing())
+        return transaction()
+    monkeypatch.setattr(db, "transaction", counted)
+
+    rows = [f"Cust,Omer{chr(97 + i)},c{i}@example.com" for i in range(5)]
+    report = import_text(db, tmp_path, "customers", "first_name,last_name,email\n" + "\n".join(rows) + "\n",
+                         chunk_size=2)
+
+    assert report["imported"] == 5
+    assert held == [False, False, False]
@@ -0,0 +1,117 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import time
+
+import pytest
+
+import migrations
+import timestamps
+from database import Database
+
+COMMITTED_DB = os.path.join(os.path.dirname(os.path.abspath(migrations.__file__)), "salon_database.db")
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    # the committed database predates versioning (user_version 0)
+    path = str(tmp_path / "salon.db")
+    shutil.copy(COMMITTED_DB, path)
+    return path
+
+
+def counts(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "services", "appointments", "payments")}
+
+
+def test_migrates_committed_db_to_latest(old_db):
+    conn = sqlite3.connect(old_db)
+    try:
+        assert migrations.current_version(conn) == 0
+        before = counts(conn)
+
+        applied = migrations.migrate(conn)
+
+        latest = list(range(1, migrations.LATEST_VERSION + 1))
+        assert [version for version, _, _ in applied] == latest
+        assert migrations.current_version(conn) == migrations.LATEST_VERSION
+        assert [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")] == latest
+        # every row survives (the admin account is already there)
+        assert counts(conn) == before
+
+        # running it again does nothing
+        assert migrations.migrate(conn) == []
+    finally:
+        conn.close()
+
+
+def test_migrated_db_works(old_db):
+    conn = sqlite3.connect(old_db)
+    booked = dict(conn.execute("SELECT appointment_id, appointment_datetime FROM appointments"))
+    # the lists join customer, stylist and service, one row points at a service that's gone
+    listed = {row[0] for row in conn.execute("""
+        SELECT a.appointment_id FROM appointments a
+        JOIN users c ON a.customer_id = c.user_id
+        JOIN users s ON a.stylist_id = s.user_id
+        JOIN services sv ON a.service_id = sv.service_id
+    """)}
+    conn.close()
+
+    db = Database(old_db)
+    try:
+        appointments = {row[0]: row[1] for row in db.fetch_all_appointments()}
+        assert set(appointments) == listed
+        for appointment_id, when in appointments.items():
+            assert when.strftime("%Y-%m-%d %H:%M") == booked[appointment_id]
+
+        customers = db.fetch_all_customers()
+        assert customers
+        user_id, last_name = customers[0][0], customers[0][2]
+        assert user_id in [row[0] for _, row in db.fetch_customers_page(last_name)]
+        assert db.login("admin", "admin123") is not None
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def salon_clock(monkeypatch):
+    # ahead of UTC in spring, so a UTC value left as stored would be an hour out
+    monkeypatch.setenv("TZ", "Europe/London")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def wall_clock(utc_text):
+    utc = datetime.datetime.fromisoformat(utc_text).replace(tzinfo=datetime.timezone.utc)
+    return utc.astimezone().replace(tzinfo=None)
+
+
+def test_baseline_payment_dates_move_to_wall_clock(old_db, salon_clock, monkeypatch):
+    conn = sqlite3.connect(old_db)
+    try:
+        stored = dict(conn.execute("SELECT payment_id, payment_date FROM payments WHERE payment_date IS NOT NULL"))
+        assert stored
+
+        # stop at 10 and take a payment on the new default, as a desk would have
+        with monkeypatch.context() as patch:
+            patch.setattr(migrations, "MIGRATIONS", [m for m in migrations.MIGRATIONS if m[0] <= 10])
+            patch.setattr(migrations, "LATEST_VERSION", 10)
+            migrations.migrate(conn)
+        appointment_id = conn.execute("SELECT MIN(appointment_id) FROM appointments").fetchone()[0]
+        conn.execute("INSERT INTO payments (appointment_id, amount, status) VALUES (?, 10, 'paid')",
+                     (appointment_id,))
+        conn.commit()
+        new_id, taken_at = conn.execute(
+            "SELECT payment_id, payment_date FROM payments ORDER BY payment_id DESC LIMIT 1").fetchone()
+
+        migrations.migrate(conn)
+        dates = dict(conn.execute("SELECT payment_id, payment_date FROM payments"))
+        for payment_id, text in stored.items():
+            assert timestamps.from_epoch(dates[payment_id]) == wall_clock(text)
+        assert dates[new_id] == taken_at
+    finally:
+        conn.close()
@@ -0,0 +1,94 @@
+import http.client
+import json
+import sqlite3
+
+import pytest
+
+from database import Database
+from remote_database import RemoteDatabase
+from salon_service import NotFound, SalonService
+
+
+@pytest.fixture
+def service(tmp_path):
+    db = Database(str(tmp_path / "salon.db"))
+    service = SalonService(db, port=0)
+    service.start()
+    yield service
+    service.stop()
+    db.close()
+
+
+@pytest.fixture
+def remote(service):
+    remote = RemoteDatabase(service.url)
+    yield remote
+    remote.close()
+
+
+def add_customers(db, count):
+    password = db.hash_password("password123")
+    return [db.add_user("customer", f"c{i}_user", password, f"c{i}@example.com", "Cust", f"Omer{i}")
+            for i in range(count)]
+
+
+def test_paging_round_trips_keys(service, remote):
+    add_customers(service.db, 5)
+
+    first = remote.fetch_customers_page(limit=2)
+    assert first == service.db.fetch_customers_page(limit=2)
+    key = first[-1][0]
+    assert isinstance(key, tuple)
+
+    # the key goes back as it came, so the next page carries on after it
+    second = remote.fetch_customers_page(after=key, limit=2)
+    assert second == service.db.fetch_customers_page(after=key, limit=2)
+    assert [row.user_id for _, row in first + second] == sorted(row.user_id for _, row in first + second)
+    assert remote.fetch_customers_page(before=second[0][0], limit=2) == first
+
+
+def test_login_strips_password(remote):
+    user = remote.login("admin", "admin123")
+    assert user.username == "admin"
+    assert user.password is None
+    assert remote.login("admin", "wrong") is None
+
+
+def test_integrity_error_keeps_its_type(remote):
+    password = remote.hash_password("password123")
+    remote.add_user("customer", "twin_user", password, "twin@example.com", "Twin", "One")
+    with pytest.raises(sqlite3.IntegrityError):
+        remote.add_user("customer", "twin_user", password, "twin2@example.com", "Twin", "Two")
+
+
+def test_failed_batch_rolls_back(service, remote):
+    password = remote.hash_password("password123")
+    with pytest.raises(sqlite3.IntegrityError):
+        remote.batch([
+            ("add_user", ("customer", "batch_user", password, "batch@example.com", "Bat", "Ch")),
+            ("add_user", ("customer", "batch_user", password, "batch2@example.com", "Bat", "Ch")),
+        ])
+    assert service.db.users.by_username("batch_user") is None
+
+    user_id, username = remote.batch([
+        ("add_user", ("customer", "batch_user", password, "batch@example.com", "Bat", "Ch")),
+        ("unique_username", ("batch_user",)),
+    ])
+    assert service.db.users.get(user_id).email == "batch@example.com"
+    assert username == "batch_user1"
+
+
+def test_unknown_method_is_404(service, remote):
+    conn = http.client.HTTPConnection(service.server.server_address[0], service.server.server_address[1])
+    try:
+        conn.request("POST", "/call", json.dumps({"method": "read", "args": ["SELECT * FROM users"]}),
+                     {"Content-Type": "application/json"})
+        reply = conn.getresponse()
+        assert reply.status == 404
+        assert json.loads(reply.read())["error"]["type"] == "NotFound"
+    finally:
+        conn.close()
+
+    with pytest.raises(NotFound):
+        remote.batch([("read", ("SELECT * FROM users",))])
+    assert not hasattr(remote, "read")
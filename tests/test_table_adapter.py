@@ -0,0 +1,48 @@
+import itertools
+import random
+
+from views.table_adapter import stable_items
+
+
+def positions(order):
+    return {iid: i for i, iid in enumerate(order)}
+
+
+def is_in_order(items, new_position):
+    return all(new_position[a] < new_position[b] for a, b in zip(items, items[1:]))
+
+
+def test_unchanged_order_is_all_stable():
+    order = ["1", "2", "3", "4"]
+    assert stable_items(order, positions(order)) == set(order)
+
+
+def test_single_move_leaves_the_rest():
+    # "4" moved to the front, only it has to move
+    assert stable_items(["1", "2", "3", "4"], positions(["4", "1", "2", "3"])) == {"1", "2", "3"}
+
+
+def test_reversed_keeps_one():
+    assert len(stable_items(["1", "2", "3"], positions(["3", "2", "1"]))) == 1
+
+
+def test_empty():
+    assert stable_items([], {}) == set()
+
+
+def test_longest_run_against_brute_force():
+    rng = random.Random(7)
+    for size in range(1, 8):
+        for _ in range(20):
+            survivors = [str(i) for i in range(size)]
+            new_order = survivors[:]
+            rng.shuffle(new_order)
+            new_position = positions(new_order)
+
+            stable = stable_items(survivors, new_position)
+            kept = [iid for iid in survivors if iid in stable]
+            assert is_in_order(kept, new_position)
+
+            longest = max(r for r in range(size + 1)
+                          if any(is_in_order(list(c), new_position) for c in itertools.combinations(survivors, r)))
+            assert len(stable) == longest